@@ -0,0 +1,170 @@
+"""Benchmark harness for the rolling estimators, compute_panel and metrics.
+
+Usage::
+
+    python -m hw5.benchmark --tickers 200 --weeks 400 --nan-frac 0.02 --out bench.json
+    python -m hw5.benchmark ... --compare previous.json   # exit 1 on regressions
+
+Results are written as JSON so runs from different versions can be diffed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from .config import default_config
+from .kernels import resolve_backend
+from .metrics import metrics_by_ticker, pooled_metrics, weekly_pooled_rmse
+from .pipeline import compute_panel
+from .robustness import run_robustness
+from .rolling import (
+    rolling_ols_no_intercept,
+    rolling_slope_no_intercept_boxcar,
+    rolling_slope_no_intercept_ew,
+    rolling_slope_no_intercept_ew_recursive,
+)
+
+
+def synthetic_returns(
+    n_tickers: int,
+    n_weeks: int,
+    nan_frac: float = 0.0,
+    seed: int = 0,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.Series]:
+    """Weekly CDS/equity/market returns shaped like ``run_pipeline`` output."""
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2000-01-05", periods=n_weeks, freq="W-WED")
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    m = pd.Series(rng.normal(0, 0.02, n_weeks), index=idx, name="m")
+    beta = rng.uniform(0.5, 1.5, n_tickers)
+    eq = pd.DataFrame(m.to_numpy()[:, None] * beta + rng.normal(0, 0.01, (n_weeks, n_tickers)), index=idx, columns=tickers)
+    cds = pd.DataFrame(-0.3 * eq.to_numpy() + rng.normal(0, 0.03, eq.shape), index=idx, columns=tickers)
+    if nan_frac > 0:
+        cds = cds.mask(rng.random(cds.shape) < nan_frac)
+        eq = eq.mask(rng.random(eq.shape) < nan_frac)
+    return cds, eq, m
+
+
+def time_call(fn: Callable[[], object], repeat: int) -> dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"best_s": min(times), "mean_s": float(np.mean(times)), "repeat": repeat}
+
+
+def run_benchmarks(
+    n_tickers: int = 50,
+    n_weeks: int = 400,
+    nan_frac: float = 0.02,
+    repeat: int = 3,
+    window: int = 16,
+    half_life: float = 12.0,
+    include_loop: bool = False,
+    include_robustness: bool = True,
+) -> dict[str, object]:
+    cds, eq, m = synthetic_returns(n_tickers, n_weeks, nan_frac)
+    y, x = cds.iloc[:, 0], eq.iloc[:, 0]
+    X2 = pd.DataFrame({"equity": x, "index": cds.mean(axis=1)})
+
+    cases: dict[str, Callable[[], object]] = {
+        "rolling_ols_no_intercept[recursive]": lambda: rolling_ols_no_intercept(y, X2, window),
+        "rolling_ols_no_intercept[lstsq]": lambda: rolling_ols_no_intercept(y, X2, window, engine="lstsq"),
+        "rolling_slope_no_intercept_boxcar": lambda: rolling_slope_no_intercept_boxcar(y, x, window),
+        "rolling_slope_no_intercept_ew": lambda: rolling_slope_no_intercept_ew(y, x, window, half_life),
+        "rolling_slope_no_intercept_ew_recursive": lambda: rolling_slope_no_intercept_ew_recursive(y, x, half_life, window),
+        "compute_panel[batched]": lambda: compute_panel(cds, eq, m, window, window, half_life),
+    }
+    if include_loop:
+        cases["compute_panel[loop]"] = lambda: compute_panel(cds, eq, m, window, window, half_life, batched=False)
+
+    panel = compute_panel(cds, eq, m, window, window, half_life)
+    cases["metrics_by_ticker"] = lambda: metrics_by_ticker(panel)
+    cases["pooled_metrics"] = lambda: pooled_metrics(panel)
+    cases["weekly_pooled_rmse"] = lambda: weekly_pooled_rmse(panel)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if include_robustness:
+            config = default_config(Path(tmp))
+            cases["run_robustness"] = lambda: run_robustness(config, cds, eq, m, out_dir=Path(tmp) / "robustness")
+
+        results = {name: time_call(fn, repeat) for name, fn in cases.items()}
+    return {
+        "params": {
+            "n_tickers": n_tickers,
+            "n_weeks": n_weeks,
+            "nan_frac": nan_frac,
+            "repeat": repeat,
+            "window": window,
+            "half_life": half_life,
+        },
+        "env": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "kernel_backend": resolve_backend(),
+            "machine": platform.machine(),
+        },
+        "timestamp": pd.Timestamp.now(tz="UTC").isoformat(),
+        "results": results,
+    }
+
+
+def compare_benchmarks(baseline: dict, current: dict, tolerance: float = 1.25) -> pd.DataFrame:
+    """Best-time ratios current / baseline; ``regression`` flags ratios above ``tolerance``."""
+    rows = []
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = cur["best_s"] / base["best_s"] if base["best_s"] > 0 else np.nan
+        rows.append({"case": name, "baseline_s": base["best_s"], "current_s": cur["best_s"], "ratio": ratio})
+    out = pd.DataFrame(rows, columns=["case", "baseline_s", "current_s", "ratio"])
+    out["regression"] = out["ratio"] > tolerance
+    return out
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Time hw5 estimators on a synthetic panel")
+    p.add_argument("--tickers", type=int, default=50)
+    p.add_argument("--weeks", type=int, default=400)
+    p.add_argument("--nan-frac", type=float, default=0.02)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--include-loop", action="store_true", help="also time the per-ticker compute_panel loop")
+    p.add_argument("--skip-robustness", action="store_true")
+    p.add_argument("--out", type=Path, default=Path("benchmarks.json"))
+    p.add_argument("--compare", type=Path, default=None, help="previous JSON to compare against")
+    p.add_argument("--tolerance", type=float, default=1.25)
+    args = p.parse_args()
+
+    report = run_benchmarks(
+        n_tickers=args.tickers,
+        n_weeks=args.weeks,
+        nan_frac=args.nan_frac,
+        repeat=args.repeat,
+        include_loop=args.include_loop,
+        include_robustness=not args.skip_robustness,
+    )
+    args.out.write_text(json.dumps(report, indent=2))
+    for name, r in report["results"].items():
+        print(f"{name:45s} {r['best_s'] * 1e3:10.2f} ms")
+
+    if args.compare is not None:
+        table = compare_benchmarks(json.loads(args.compare.read_text()), report, tolerance=args.tolerance)
+        print(table.to_string(index=False))
+        if table["regression"].any():
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
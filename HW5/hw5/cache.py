@@ -0,0 +1,178 @@
+"""Disk-backed memoization of pipeline stages.
+
+Each stage result is pickled under ``<stage>-<key>.pkl`` where the key hashes
+the content of the input files and the ``Config`` fields the stage depends on,
+so an unchanged run reloads the CDS matrix, weekly returns, hedge stage and
+panel instead of recomputing them. File digests are memoized by size and
+mtime; entries are evicted least-recently-used once the directory exceeds
+``max_bytes``. Every key also carries ``code_version()``, so editing a stage
+module (but not the plot code) or upgrading numpy/pandas starts fresh entries.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+import numpy as np
+import pandas as pd
+
+from .config import Config, default_config
+
+STAGES = ("cds_wide", "weekly", "hedge", "panel", "robustness")
+# modules whose code determines cached stage values; plots.py / plot_jobs.py are
+# left out so that editing a figure reuses the cached stages
+STAGE_MODULES = ("io", "transforms", "kernels", "rolling", "pipeline", "metrics", "robustness")
+_DIGESTS_FILE = "file_digests.json"
+
+T = TypeVar("T")
+
+
+def _hash_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=1)
+def code_version() -> str:
+    """Hash of the ``STAGE_MODULES`` sources and the numpy/pandas versions."""
+    h = hashlib.sha256(f"numpy={np.__version__};pandas={pd.__version__}".encode())
+    for name in STAGE_MODULES:
+        h.update(name.encode())
+        h.update((Path(__file__).with_name(f"{name}.py")).read_bytes())
+    return h.hexdigest()[:16]
+
+
+class StageCache:
+    def __init__(self, root: Path, max_bytes: int = 2 << 30) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        root.mkdir(parents=True, exist_ok=True)
+        self._digests_path = root / _DIGESTS_FILE
+        try:
+            self._digests = json.loads(self._digests_path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._digests = {}
+
+    def file_digest(self, path: Path) -> str:
+        """Content hash of a file or directory tree (e.g. a Parquet dataset); ``"missing"`` if absent."""
+        if not path.exists():
+            return "missing"
+        files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        h = hashlib.sha256()
+        dirty = False
+        for p in files:
+            st = p.stat()
+            stamp = [st.st_size, st.st_mtime_ns]
+            entry = self._digests.get(str(p.resolve()))
+            if entry is None or entry["stamp"] != stamp:
+                entry = {"stamp": stamp, "sha256": _hash_file(p)}
+                self._digests[str(p.resolve())] = entry
+                dirty = True
+            h.update(str(p.relative_to(path) if path.is_dir() else p.name).encode())
+            h.update(entry["sha256"].encode())
+        if dirty:
+            self._digests_path.write_text(json.dumps(self._digests, indent=2))
+        return h.hexdigest()
+
+    @staticmethod
+    def key(**parts: Any) -> str:
+        """Stable hash of JSON-serialisable key parts (paths and tuples are stringified) and ``code_version()``."""
+        blob = json.dumps({"_code": code_version(), **parts}, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.root / f"{stage}-{key}.pkl"
+
+    def get(self, stage: str, key: str) -> Any | None:
+        path = self._path(stage, key)
+        try:
+            with path.open("rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:  # truncated, or pickled by code that no longer matches: a miss
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # mark as recently used for eviction
+        return value
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        path = self._path(stage, key)
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+        self.evict()
+
+    def get_or_compute(self, stage: str, key: str, fn: Callable[[], T]) -> T:
+        value = self.get(stage, key)
+        if value is None:
+            value = fn()
+            self.put(stage, key, value)
+        return value
+
+    def entries(self) -> list[Path]:
+        return sorted(self.root.glob("*.pkl"), key=lambda p: p.stat().st_mtime_ns)
+
+    def evict(self) -> None:
+        """Drop least-recently-used entries until the cache fits in ``max_bytes``."""
+        entries = self.entries()
+        total = sum(p.stat().st_size for p in entries)
+        for p in entries[:-1]:  # never evict the entry just written
+            if total <= self.max_bytes:
+                break
+            total -= p.stat().st_size
+            p.unlink(missing_ok=True)
+
+    def invalidate(self, stage: str | None = None) -> int:
+        """Remove all entries, or only those of ``stage``; returns the number removed."""
+        pattern = "*.pkl" if stage is None else f"{stage}-*.pkl"
+        removed = 0
+        for p in self.root.glob(pattern):
+            p.unlink(missing_ok=True)
+            removed += 1
+        if stage is None:
+            self._digests = {}
+            self._digests_path.unlink(missing_ok=True)
+        return removed
+
+
+def open_cache(config: Config) -> StageCache | None:
+    """Stage cache for ``config``, or ``None`` when caching is disabled."""
+    if config.cache_dir is None:
+        return None
+    return StageCache(config.cache_dir, max_bytes=config.cache_max_bytes)
+
+
+def cached(cache: StageCache | None, stage: str, key: str, fn: Callable[[], T]) -> T:
+    return fn() if cache is None else cache.get_or_compute(stage, key, fn)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Inspect or clear the hw5 stage cache")
+    p.add_argument("--clear", action="store_true", help="Remove cached entries")
+    p.add_argument("--stage", choices=STAGES, default=None, help="Limit --clear to one stage")
+    args = p.parse_args()
+    cache = open_cache(default_config())
+    if cache is None:
+        print("Stage cache is disabled")
+        return
+    if args.clear:
+        print(f"Removed {cache.invalidate(args.stage)} cache entries")
+        return
+    entries = cache.entries()
+    print(f"{len(entries)} entries, {sum(p.stat().st_size for p in entries) / 1e6:.1f} MB in {cache.root}")
+
+
+if __name__ == "__main__":
+    main()
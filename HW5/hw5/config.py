@@ -12,12 +12,33 @@ class Config:
     cds_path: Path
     equity_cache_path: Path
     output_dir: Path
+    cds_parquet_dir: Path | None = None  # Parquet dataset converted from cds_path; None: <cds_path stem>_parquet
+    tickers: tuple[str, ...] | None = None  # restrict the CDS universe; None keeps every ticker
+    start_date: str | None = None  # first / last CDS date to load; None keeps the full history
+    end_date: str | None = None
     boxcar_window: int = 16
     ew_window: int = 16
     ew_half_life: float = 12.0
+    anchor: str = "W-WED"  # resampling anchor: "W-WED" | "W-FRI" | "ME" | "D" (observed days)
     robustness_windows: tuple[int, ...] = (12, 16, 26)
     robustness_half_lives: tuple[float, ...] = (8.0, 12.0, 20.0)
+    stream_panel: bool = False  # write the panel chunk by chunk instead of holding it in memory
+    panel_format: str = "csv"  # "csv" | "parquet" (used when stream_panel is set)
+    panel_chunk_size: int = 256  # tickers per streamed chunk / Parquet row group
+    compact_panel: bool = False  # in-memory panel as pipeline.CompactPanel (float32, categorical ticker)
+    robustness_executor: str = "serial"  # "serial" | "threads" | "processes"
+    robustness_workers: int | None = None
+    robustness_batch_cells: int = 4  # grid cells evaluated together (one window per batch)
+    # on-disk stage cache (see hw5.cache); None disables it. default_config turns it on under <root>/.hw5_cache
+    cache_dir: Path | None = None
+    cache_max_bytes: int = 2 << 30
+    plot_workers: int | None = None  # processes for figure rendering; 1 renders in-process
+    instrument: bool = True  # write per-stage timings.json from run_all
 
+    def cds_dataset_dir(self) -> Path:
+        if self.cds_parquet_dir is not None:
+            return self.cds_parquet_dir
+        return self.cds_path.with_name(f"{self.cds_path.stem}_parquet")
 
 
 def default_config(root: Path | None = None) -> Config:
@@ -27,4 +48,5 @@ def default_config(root: Path | None = None) -> Config:
         cds_path=hw_root / "Liq5YCDS.delim",
         equity_cache_path=hw_root / "equity_adj_close.parquet",
         output_dir=hw_root / "output",
+        cache_dir=hw_root / ".hw5_cache",
     )
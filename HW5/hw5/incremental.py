@@ -0,0 +1,337 @@
+"""Incremental weekly update of the panel from persisted rolling state.
+
+After a full ``run_all`` the tail of the aligned weekly returns and the last
+weekly price rows are saved under ``<output_dir>/rolling_state``. Every
+estimator in the panel is windowed, so re-running ``compute_panel`` over that
+tail plus the new week reproduces the full recompute for the new rows.
+
+The state only advances over complete weeks, i.e. bins whose anchor day has
+been reached by the daily data. A trailing partial bin (e.g. equity ending on
+a Tuesday) is kept as pending and merged with the next update's daily rows,
+and its panel rows are replaced once the week completes.
+
+New rows are written in the layout ``run_all`` left behind: the full CSV, the
+streamed CSV or Parquet file, or the compact CSV plus its ``_by_date`` file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+from .config import Config, default_config
+from .io import load_cds
+from .panel_store import PanelWriter, iter_panel_file
+from .pipeline import COMPACT_PANEL_COLUMNS, PANEL_COLUMNS, CompactPanel, PipelineResult, compute_panel
+from .transforms import align_weekly_returns, cds_wide_parspread, simple_returns, to_weekly_wed_last
+
+STATE_DIRNAME = "rolling_state"
+PANEL_STEM = "panel_results"
+
+
+def state_length(boxcar_window: int, ew_window: int) -> int:
+    """Weeks of history needed so the newest panel row is fully determined.
+
+    ``pred_n`` uses ``mu_{n-1}``, which regresses on ``c`` back to
+    ``n - ew_window - 2``; that ``c`` needs ``boxcar_window`` earlier weeks.
+    """
+    return boxcar_window + ew_window + 2
+
+
+@dataclass
+class RollingState:
+    cds_ret: pd.DataFrame
+    eq_ret: pd.DataFrame
+    market_ret: pd.Series
+    # weekly prices of the last emitted week, followed by any pending bins
+    cds_px_last: pd.DataFrame
+    eq_px_last: pd.DataFrame
+    boxcar_window: int
+    ew_window: int
+    ew_half_life: float
+    cds_last_day: pd.Timestamp
+    eq_last_day: pd.Timestamp
+
+    @property
+    def tickers(self) -> list[str]:
+        return list(self.cds_ret.columns)
+
+    @property
+    def last_date(self) -> pd.Timestamp:
+        return self.cds_ret.index[-1]
+
+
+def state_from_result(result: PipelineResult, config: Config) -> RollingState:
+    if result.cds_weekly_px is None or result.eq_weekly_px is None:
+        raise ValueError("Pipeline result does not carry weekly prices; rerun run_pipeline")
+    # without the daily end dates every bin is taken as complete
+    cds_last = result.cds_last_day if result.cds_last_day is not None else result.cds_weekly_px.index[-1]
+    eq_last = result.eq_last_day if result.eq_last_day is not None else result.eq_weekly_px.index[-1]
+    aligned = result.cds_weekly_ret.index
+    complete = aligned[(aligned <= cds_last) & (aligned <= eq_last)]
+    if len(complete) == 0:
+        raise ValueError("Pipeline result has no complete aligned week to start the rolling state from")
+    last = complete[-1]
+    n = state_length(config.boxcar_window, config.ew_window)
+    return RollingState(
+        cds_ret=result.cds_weekly_ret.loc[:last].iloc[-n:],
+        eq_ret=result.eq_weekly_ret.loc[:last].iloc[-n:],
+        market_ret=result.market_weekly_ret.loc[:last].iloc[-n:],
+        cds_px_last=result.cds_weekly_px.loc[last:],
+        eq_px_last=result.eq_weekly_px.loc[last:],
+        boxcar_window=config.boxcar_window,
+        ew_window=config.ew_window,
+        ew_half_life=config.ew_half_life,
+        cds_last_day=cds_last,
+        eq_last_day=eq_last,
+    )
+
+
+def save_state(state: RollingState, state_dir: Path) -> None:
+    state_dir.mkdir(parents=True, exist_ok=True)
+    state.cds_ret.to_parquet(state_dir / "cds_ret.parquet")
+    state.eq_ret.to_parquet(state_dir / "eq_ret.parquet")
+    state.market_ret.to_frame("m").to_parquet(state_dir / "market_ret.parquet")
+    state.cds_px_last.to_parquet(state_dir / "cds_px_last.parquet")
+    state.eq_px_last.to_parquet(state_dir / "eq_px_last.parquet")
+    meta = {
+        "boxcar_window": state.boxcar_window,
+        "ew_window": state.ew_window,
+        "ew_half_life": state.ew_half_life,
+        "last_date": state.last_date.isoformat(),
+        "cds_last_day": state.cds_last_day.isoformat(),
+        "eq_last_day": state.eq_last_day.isoformat(),
+    }
+    (state_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+
+
+def load_state(state_dir: Path) -> RollingState:
+    meta = json.loads((state_dir / "meta.json").read_text())
+    cds_px_last = pd.read_parquet(state_dir / "cds_px_last.parquet")
+    eq_px_last = pd.read_parquet(state_dir / "eq_px_last.parquet")
+    return RollingState(
+        cds_ret=pd.read_parquet(state_dir / "cds_ret.parquet"),
+        eq_ret=pd.read_parquet(state_dir / "eq_ret.parquet"),
+        market_ret=pd.read_parquet(state_dir / "market_ret.parquet")["m"],
+        cds_px_last=cds_px_last,
+        eq_px_last=eq_px_last,
+        boxcar_window=int(meta["boxcar_window"]),
+        ew_window=int(meta["ew_window"]),
+        ew_half_life=float(meta["ew_half_life"]),
+        # states saved before the end dates were recorded hold a single, complete bin
+        cds_last_day=pd.Timestamp(meta.get("cds_last_day", cds_px_last.index[-1])),
+        eq_last_day=pd.Timestamp(meta.get("eq_last_day", eq_px_last.index[-1])),
+    )
+
+
+def _advance_bins(
+    px_last: pd.DataFrame, last_day: pd.Timestamp, daily: pd.DataFrame
+) -> tuple[pd.DataFrame, pd.DatetimeIndex, pd.Timestamp]:
+    """Merge ``daily`` into the pending bins after ``px_last``'s first (emitted) row.
+
+    Returns the bins after that row, the leading run of them that is complete
+    and the new last daily date. A bin's last price comes from the newest rows
+    that observe it, so a partial week is completed rather than duplicated.
+    """
+    base = px_last.index[0]
+    bins = px_last.iloc[1:]
+    if not daily.empty:
+        weekly = to_weekly_wed_last(daily[list(px_last.columns)])
+        bins = weekly.loc[weekly.index > base].combine_first(bins)
+        last_day = max(last_day, daily.index.max())
+    complete = bins.index[bins.index <= last_day]
+    expected = pd.date_range(base + pd.Timedelta(weeks=1), periods=len(complete), freq="7D")
+    if not complete.equals(expected):
+        raise ValueError(
+            f"Incremental update expects consecutive weeks from {expected[0].date()}, "
+            f"got {[d.date() for d in complete]}"
+        )
+    return bins, complete, last_day
+
+
+def _weekly_returns(px_last: pd.DataFrame, bins: pd.DataFrame, weeks: pd.DatetimeIndex) -> pd.DataFrame:
+    return simple_returns(pd.concat([px_last.iloc[:1], bins.loc[weeks]])).iloc[1:]
+
+
+def _next_px_last(px_last: pd.DataFrame, bins: pd.DataFrame, weeks: pd.DatetimeIndex) -> pd.DataFrame:
+    if len(weeks) == 0:
+        return pd.concat([px_last.iloc[:1], bins])
+    return bins.loc[weeks[-1] :]
+
+
+def update_state(
+    state: RollingState,
+    cds_daily: pd.DataFrame,
+    eq_daily: pd.DataFrame,
+) -> tuple[pd.DataFrame, RollingState]:
+    """Append the weeks completed by the new daily rows and return their panel rows.
+
+    ``cds_daily`` is a wide parspread matrix and ``eq_daily`` a wide adjusted
+    close matrix including SPY, both holding only the new daily rows. Tickers
+    outside the stored universe are ignored. Weeks complete in both sources
+    are emitted; raises ``ValueError`` if one source completes weeks the other
+    does not reach at all, or if weeks are missing.
+    """
+    cds_daily = cds_daily.reindex(columns=state.cds_px_last.columns)
+    eq_daily = eq_daily.reindex(columns=state.eq_px_last.columns)
+    cds_bins, cds_done, cds_last_day = _advance_bins(state.cds_px_last, state.cds_last_day, cds_daily)
+    eq_bins, eq_done, eq_last_day = _advance_bins(state.eq_px_last, state.eq_last_day, eq_daily)
+    weeks = cds_done.intersection(eq_done)
+    if len(weeks) == 0 and (len(cds_done) or len(eq_done)):
+        raise ValueError(
+            f"New CDS weeks {[d.date() for d in cds_done]} and equity weeks "
+            f"{[d.date() for d in eq_done]} do not line up; supply both sources for the same weeks"
+        )
+
+    tickers = state.tickers
+    eq_w_ret_new = _weekly_returns(state.eq_px_last, eq_bins, weeks)
+    cds_ret_new, eq_ret_new, m_ret_new = align_weekly_returns(
+        _weekly_returns(state.cds_px_last, cds_bins, weeks), eq_w_ret_new[tickers], eq_w_ret_new["SPY"].rename("m")
+    )
+    cds_ret = pd.concat([state.cds_ret, cds_ret_new])
+    eq_ret = pd.concat([state.eq_ret, eq_ret_new])
+    m_ret = pd.concat([state.market_ret, m_ret_new]).rename("m")
+
+    panel = compute_panel(
+        cds_ret=cds_ret,
+        eq_ret=eq_ret,
+        market_ret=m_ret,
+        boxcar_window=state.boxcar_window,
+        ew_window=state.ew_window,
+        ew_half_life=state.ew_half_life,
+    )
+    new_rows = panel.loc[panel["date"].isin(cds_ret_new.index)].reset_index(drop=True)
+
+    n = state_length(state.boxcar_window, state.ew_window)
+    new_state = RollingState(
+        cds_ret=cds_ret.iloc[-n:],
+        eq_ret=eq_ret.iloc[-n:],
+        market_ret=m_ret.iloc[-n:],
+        cds_px_last=_next_px_last(state.cds_px_last, cds_bins, weeks),
+        eq_px_last=_next_px_last(state.eq_px_last, eq_bins, weeks),
+        boxcar_window=state.boxcar_window,
+        ew_window=state.ew_window,
+        ew_half_life=state.ew_half_life,
+        cds_last_day=cds_last_day,
+        eq_last_day=eq_last_day,
+    )
+    return new_rows, new_state
+
+
+def run_incremental(config: Config, cds_path: Path, equity_path: Path) -> pd.DataFrame:
+    """Apply one update from new CDS (delim) and equity (parquet/csv) files."""
+    if config.anchor != "W-WED":
+        raise ValueError("Incremental updates only support the W-WED anchor; run a full rebuild")
+    state_dir = config.output_dir / STATE_DIRNAME
+    state = load_state(state_dir)
+    if (state.boxcar_window, state.ew_window, state.ew_half_life) != (
+        config.boxcar_window,
+        config.ew_window,
+        config.ew_half_life,
+    ):
+        raise ValueError("Stored rolling state was built with different windows; run a full rebuild")
+
+    cds_daily = cds_wide_parspread(load_cds(cds_path))
+    if equity_path.suffix == ".parquet":
+        eq_daily = pd.read_parquet(equity_path)
+    else:
+        eq_daily = pd.read_csv(equity_path, index_col=0)
+    eq_daily.index = pd.to_datetime(eq_daily.index).tz_localize(None)
+
+    new_rows, new_state = update_state(state, cds_daily, eq_daily.sort_index())
+    append_panel_rows(config.output_dir, new_rows)
+    save_state(new_state, state_dir)
+    return new_rows
+
+
+def _existing_panel(output_dir: Path) -> Path | None:
+    """The most recently written ``panel_results.{csv,parquet}``, if any."""
+    found = [p for p in (output_dir / f"{PANEL_STEM}.csv", output_dir / f"{PANEL_STEM}.parquet") if p.exists()]
+    return max(found, key=lambda p: p.stat().st_mtime_ns) if found else None
+
+
+def _panel_file_columns(path: Path) -> list[str]:
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        return list(pq.ParquetFile(str(path)).schema_arrow.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _upsert_rows(path: Path, rows: pd.DataFrame) -> None:
+    """Replace the rows of ``path`` on ``rows``' dates with ``rows``, keeping its format."""
+    dates = rows["date"]
+    if path.suffix == ".parquet":
+        # rewrite row group by row group, so memory stays bounded by one group
+        tmp = path.with_name(f"{path.stem}.tmp{path.suffix}")
+        with PanelWriter(tmp, "parquet") as writer:
+            if path.exists():
+                for chunk in iter_panel_file(path):
+                    keep = chunk.loc[~chunk["date"].isin(dates)]
+                    if not keep.empty:
+                        writer.write(keep)
+            writer.write(rows)
+        tmp.replace(path)
+        return
+    if path.exists():
+        # weeks that were partial at the previous run are replaced by their completed rows
+        stale = pd.to_datetime(pd.read_csv(path, usecols=["date"])["date"]).isin(dates)
+        if stale.any():
+            pd.read_csv(path)[~stale.to_numpy()].to_csv(path, index=False)
+    rows.to_csv(path, mode="a", header=not path.exists(), index=False)
+
+
+def _upsert_by_date(path: Path, by_date: pd.DataFrame) -> None:
+    if path.suffix == ".parquet":
+        old = pd.read_parquet(path) if path.exists() else by_date.iloc[:0]
+    else:
+        old = pd.read_csv(path, index_col=0, parse_dates=True) if path.exists() else by_date.iloc[:0]
+    merged = pd.concat([old.loc[~old.index.isin(by_date.index)], by_date]).sort_index()
+    if path.suffix == ".parquet":
+        merged.to_parquet(path)
+    else:
+        merged.to_csv(path)
+
+
+def append_panel_rows(output_dir: Path, rows: pd.DataFrame) -> Path:
+    """Write new ``PANEL_COLUMNS`` rows into the panel file ``run_all`` wrote; returns its path.
+
+    The existing file's format (CSV or Parquet) and layout are kept: a
+    compact panel (``COMPACT_PANEL_COLUMNS``) gets the compact rows and its
+    ``_by_date`` file the per-date ``m`` / ``r_index``. Rows on dates already
+    present replace the old ones. Without a panel file a full CSV is started.
+    Raises ``ValueError`` for a file with any other column layout.
+    """
+    path = _existing_panel(output_dir) or output_dir / f"{PANEL_STEM}.csv"
+    if rows.empty:
+        return path
+    columns = _panel_file_columns(path) if path.exists() else PANEL_COLUMNS
+    if columns == PANEL_COLUMNS:
+        _upsert_rows(path, rows[PANEL_COLUMNS])
+    elif columns == COMPACT_PANEL_COLUMNS:
+        compact = CompactPanel.from_long(rows)
+        by_date_path = path.with_name(f"{path.stem}_by_date{path.suffix}")
+        if not by_date_path.exists():
+            raise ValueError(f"Compact panel {path} has no {by_date_path.name}; run a full rebuild")
+        _upsert_rows(path, compact.panel)
+        _upsert_by_date(by_date_path, compact.by_date)
+    else:
+        raise ValueError(f"{path} has an unrecognised panel layout {columns}; run a full rebuild")
+    return path
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Append new weeks to the run_all panel file from saved rolling state")
+    p.add_argument("--cds", type=Path, required=True, help="Delimited CDS rows for the new week(s)")
+    p.add_argument("--equity", type=Path, required=True, help="Wide adjusted closes (incl. SPY) for the new week(s)")
+    args = p.parse_args()
+    rows = run_incremental(default_config(), args.cds, args.equity)
+    print(f"Appended {len(rows)} panel rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Per-stage wall time, CPU time, peak RSS and row counts.
+
+``StageTimer.stage(name)`` is a context manager yielding a record whose
+``rows`` can be set inside the block; ``StageTimer.wrap(name)`` does the same
+as a decorator. ``NULL_TIMER`` has the same interface and records nothing, so
+instrumented code costs nothing when instrumentation is off. CPU time is
+``time.process_time`` of this process (worker processes are not included).
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Iterator, TypeVar
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+F = TypeVar("F", bound=Callable)
+
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_rss_delta_mb: float = 0.0
+    rows: int | None = None
+    parent: str | None = None  # enclosing stage, for nested stages
+
+
+class StageTimer:
+    enabled = True
+
+    def __init__(self) -> None:
+        self.records: list[StageRecord] = []
+        self._open: list[str] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageRecord]:
+        record = StageRecord(name, parent=self._open[-1] if self._open else None)
+        self._open.append(name)
+        rss0 = _peak_rss_mb()
+        cpu0 = time.process_time()
+        wall0 = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.wall_s = time.perf_counter() - wall0
+            record.cpu_s = time.process_time() - cpu0
+            record.peak_rss_delta_mb = _peak_rss_mb() - rss0
+            self._open.pop()
+            self.records.append(record)
+
+    def wrap(self, name: str) -> Callable[[F], F]:
+        def deco(fn: F) -> F:
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+
+            return inner  # type: ignore[return-value]
+
+        return deco
+
+    def to_dict(self) -> dict:
+        return {
+            "total_wall_s": sum(r.wall_s for r in self.records if r.parent is None),
+            "peak_rss_mb": _peak_rss_mb(),
+            "stages": [asdict(r) for r in self.records],
+        }
+
+    def write_json(self, path: Path) -> None:
+        path.write_text(json.dumps(self.to_dict(), indent=2))
+
+
+class _NullRecord:
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value) -> None:
+        pass
+
+
+class _NullStage:
+    __slots__ = ()
+    _record = _NullRecord()
+
+    def __enter__(self) -> _NullRecord:
+        return self._record
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+class NullTimer:
+    enabled = False
+    _stage = _NullStage()
+
+    def stage(self, name: str) -> _NullStage:
+        return self._stage
+
+    def wrap(self, name: str) -> Callable[[F], F]:
+        return lambda fn: fn
+
+    def write_json(self, path: Path) -> None:
+        pass
+
+
+NULL_TIMER = NullTimer()
+Timer = StageTimer | NullTimer
+
+
+def make_timer(enabled: bool) -> Timer:
+    return StageTimer() if enabled else NULL_TIMER
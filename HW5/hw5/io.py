@@ -1,30 +1,150 @@
 from __future__ import annotations
 
+import json
+import warnings
 from pathlib import Path
+from typing import Callable, Iterable
 
+import numpy as np
 import pandas as pd
 
 
+def _validate_cds_rows(df: pd.DataFrame) -> None:
+    if not (df["tenor"].nunique() == 1 and df["tenor"].iloc[0] == "5Y"):
+        raise ValueError("Expected only 5Y tenor")
+    if not (df["currency"].nunique() == 1 and df["currency"].iloc[0] == "USD"):
+        raise ValueError("Expected only USD currency")
+
+
 def load_cds(path: Path) -> pd.DataFrame:
     df = pd.read_csv(path, sep="\t")
     if "Unnamed: 0" in df.columns:
         df = df.drop(columns=["Unnamed: 0"])
     df["date"] = pd.to_datetime(df["date"], utc=False)
-    if not (df["tenor"].nunique() == 1 and df["tenor"].iloc[0] == "5Y"):
-        raise ValueError("Expected only 5Y tenor")
-    if not (df["currency"].nunique() == 1 and df["currency"].iloc[0] == "USD"):
-        raise ValueError("Expected only USD currency")
+    _validate_cds_rows(df)
     return df.sort_values(["date", "ticker"]).reset_index(drop=True)
 
 
-def _download_equities(tickers: list[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+def convert_cds_to_parquet(
+    delim_path: Path,
+    dataset_dir: Path,
+    chunksize: int = 1_000_000,
+    overwrite: bool = False,
+) -> Path:
+    """One-time conversion of the CDS delim file to a Parquet dataset.
+
+    The dataset is hive-partitioned by ``year`` and ``ticker``. The delim file
+    is streamed in chunks and tenor/currency are validated here, so
+    ``load_cds_wide_parquet`` does not need to re-check them. The size and
+    mtime of the delim file are recorded in ``_source.json`` (ignored by the
+    dataset reader) once every chunk is written; see ``cds_dataset_is_current``.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if dataset_dir.exists() and any(dataset_dir.iterdir()):
+        if not overwrite:
+            raise FileExistsError(f"CDS dataset already exists at {dataset_dir}")
+        import shutil
+
+        shutil.rmtree(dataset_dir)
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+
+    for chunk in pd.read_csv(delim_path, sep="\t", chunksize=chunksize):
+        if "Unnamed: 0" in chunk.columns:
+            chunk = chunk.drop(columns=["Unnamed: 0"])
+        chunk["date"] = pd.to_datetime(chunk["date"], utc=False)
+        _validate_cds_rows(chunk)
+        chunk["year"] = chunk["date"].dt.year
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        pq.write_to_dataset(table, root_path=str(dataset_dir), partition_cols=["year", "ticker"])
+    (dataset_dir / CDS_SOURCE_MANIFEST).write_text(json.dumps(_source_stamp(delim_path), indent=2))
+    return dataset_dir
+
+
+CDS_SOURCE_MANIFEST = "_source.json"
+
+
+def _source_stamp(path: Path) -> dict:
+    st = path.stat()
+    return {"source": path.name, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def cds_dataset_is_current(dataset_dir: Path, delim_path: Path) -> bool:
+    """Whether ``dataset_dir`` was converted from the current ``delim_path``.
+
+    A dataset without a manifest (written by an older version or an
+    interrupted conversion) is stale; without a delim file the dataset is the
+    only source and counts as current.
+    """
+    if not delim_path.exists():
+        return True
+    try:
+        stamp = json.loads((dataset_dir / CDS_SOURCE_MANIFEST).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    return stamp == _source_stamp(delim_path)
+
+
+def load_cds_wide_parquet(
+    dataset_dir: Path,
+    tickers: Iterable[str] | None = None,
+    start: pd.Timestamp | None = None,
+    end: pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    """Wide date x ticker parspread matrix read from the partitioned dataset.
+
+    Only ``date``, ``ticker`` and ``parspread`` are read; the ticker list and
+    date range are pushed down as partition/row-group filters. The result
+    matches ``cds_wide_parspread(load_cds(...))`` on the selected slice.
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(str(dataset_dir), format="parquet", partitioning="hive")
+    filt = None
+
+    def _and(expr):
+        return expr if filt is None else filt & expr
+
+    if tickers is not None:
+        filt = _and(ds.field("ticker").isin(sorted(set(tickers))))
+    if start is not None:
+        start = pd.Timestamp(start)
+        filt = _and((ds.field("year") >= start.year) & (ds.field("date") >= start))
+    if end is not None:
+        end = pd.Timestamp(end)
+        filt = _and((ds.field("year") <= end.year) & (ds.field("date") <= end))
+
+    table = dataset.to_table(columns=["date", "ticker", "parspread"], filter=filt)
+    dates = pd.DatetimeIndex(table.column("date").to_pandas()).tz_localize(None)
+    d_codes, d_uniq = pd.factorize(dates, sort=True)
+    t_codes, t_uniq = pd.factorize(table.column("ticker").to_pandas().astype(str), sort=True)
+
+    flat = d_codes.astype(np.int64) * len(t_uniq) + t_codes
+    if np.unique(flat).size != flat.size:
+        raise ValueError("Index contains duplicate entries, cannot reshape")
+    values = np.full((len(d_uniq), len(t_uniq)), np.nan)
+    values[d_codes, t_codes] = table.column("parspread").to_numpy()
+    return pd.DataFrame(
+        values,
+        index=pd.DatetimeIndex(d_uniq, name="date"),
+        columns=pd.Index(t_uniq, name="ticker"),
+    )
+
+
+EquityProvider = Callable[[list[str], pd.Timestamp, pd.Timestamp], pd.DataFrame]
+"""``provider(symbols, start, end) -> wide adjusted-close frame`` (date index)."""
+
+_FETCH_PAD = pd.Timedelta(days=7)
+
+
+def yfinance_provider(symbols: list[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
     import yfinance as yf
 
-    symbols = sorted(set(tickers) | {"SPY"})
     data = yf.download(
         tickers=symbols,
-        start=(start - pd.Timedelta(days=7)).date().isoformat(),
-        end=(end + pd.Timedelta(days=7)).date().isoformat(),
+        start=start.date().isoformat(),
+        end=end.date().isoformat(),
         auto_adjust=False,
         progress=False,
         group_by="ticker",
@@ -46,43 +166,196 @@ def _download_equities(tickers: list[str], start: pd.Timestamp, end: pd.Timestam
     return px.sort_index()
 
 
+def _coverage_path(cache_path: Path) -> Path:
+    return cache_path.with_name(cache_path.name + ".coverage.json")
+
+
+def _observed_spans(cache: pd.DataFrame | None) -> dict[str, tuple[pd.Timestamp, pd.Timestamp]]:
+    """First and last non-null date of every cached column."""
+    if cache is None or cache.empty:
+        return {}
+    spans = {}
+    for col in cache.columns:
+        first, last = cache[col].first_valid_index(), cache[col].last_valid_index()
+        if first is not None:
+            spans[str(col)] = (first, last)
+    return spans
+
+
+def _read_coverage(cache_path: Path, cache: pd.DataFrame | None) -> dict[str, tuple[pd.Timestamp, pd.Timestamp]]:
+    path = _coverage_path(cache_path)
+    if path.exists():
+        raw = json.loads(path.read_text())
+        return {k: (pd.Timestamp(v[0]), pd.Timestamp(v[1])) for k, v in raw.items()}
+    if cache is None or cache.empty:
+        return {}
+    # Caches written before coverage tracking: assume each column spans the index
+    # (a column that is all NaN there, e.g. a delisted ticker, is not refetched).
+    lo, hi = cache.index.min(), cache.index.max()
+    return {str(c): (lo, hi) for c in cache.columns}
+
+
+def _write_coverage(cache_path: Path, coverage: dict[str, tuple[pd.Timestamp, pd.Timestamp]]) -> None:
+    raw = {k: [v[0].isoformat(), v[1].isoformat()] for k, v in sorted(coverage.items())}
+    _coverage_path(cache_path).write_text(json.dumps(raw, indent=2))
+
+
+def plan_equity_fetches(
+    coverage: dict[str, tuple[pd.Timestamp, pd.Timestamp]],
+    symbols: list[str],
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    chunk_size: int,
+    observed: dict[str, tuple[pd.Timestamp, pd.Timestamp]] | None = None,
+) -> list[tuple[list[str], pd.Timestamp, pd.Timestamp]]:
+    """Chunked (symbols, start, end) requests for data missing from ``coverage``.
+
+    An extension of a cached ticker starts (or ends) on its first/last
+    ``observed`` non-null date, so the new segment overlaps the cache by one
+    day and can be rebased onto the cached adjustment basis.
+    """
+    observed = observed or {}
+    gaps: dict[tuple[pd.Timestamp, pd.Timestamp], list[str]] = {}
+    for sym in sorted(set(symbols)):
+        if sym not in coverage:
+            gaps.setdefault((start - _FETCH_PAD, end + _FETCH_PAD), []).append(sym)
+            continue
+        lo, hi = coverage[sym]
+        first, last = observed.get(sym, (lo, hi))
+        if start < lo:
+            gaps.setdefault((start - _FETCH_PAD, max(lo, first)), []).append(sym)
+        if end > hi:
+            gaps.setdefault((min(hi, last), end + _FETCH_PAD), []).append(sym)
+
+    tasks = []
+    for (lo, hi), syms in sorted(gaps.items()):
+        for i in range(0, len(syms), chunk_size):
+            tasks.append((syms[i : i + chunk_size], lo, hi))
+    return tasks
+
+
+def _rebase_onto(cached: pd.Series, new: pd.Series) -> pd.Series:
+    """Scale ``new`` so it matches ``cached`` on the overlap day nearest the extension.
+
+    Adjusted closes downloaded on different dates differ by a constant
+    dividend/split factor, so returns across the seam are only right once
+    both segments share one basis. Raises ``ValueError`` without an overlap.
+    """
+    both = cached.notna() & new.reindex(cached.index).notna()
+    overlap = cached.index[both.to_numpy()]
+    if len(overlap) == 0:
+        raise ValueError(f"{new.name}: new segment does not overlap the cached prices; cannot rebase")
+    anchor = overlap[-1] if new.last_valid_index() > cached.last_valid_index() else overlap[0]
+    return new * (cached.at[anchor] / new.at[anchor])
+
+
+def _merge_chunk(cache: pd.DataFrame | None, px: pd.DataFrame) -> pd.DataFrame:
+    if cache is None:
+        return px
+    px = px.copy()
+    for sym in px.columns:
+        if sym in cache.columns and cache[sym].notna().any() and px[sym].notna().any():
+            px[sym] = _rebase_onto(cache[sym], px[sym])
+    return cache.combine_first(px)
+
+
+def fetch_equities_incremental(
+    provider: EquityProvider,
+    cache: pd.DataFrame | None,
+    coverage: dict[str, tuple[pd.Timestamp, pd.Timestamp]],
+    tasks: list[tuple[list[str], pd.Timestamp, pd.Timestamp]],
+    max_workers: int = 4,
+) -> tuple[pd.DataFrame | None, dict[str, tuple[pd.Timestamp, pd.Timestamp]], list[Exception]]:
+    """Run ``tasks`` on a bounded thread pool and merge results into ``cache``.
+
+    Successful chunks are merged and their requested span is recorded in
+    ``coverage`` even if other chunks fail (or cannot be merged), so a retry
+    only refetches what is still missing. The span is the one requested, not
+    the dates returned, so weekends and holidays at either end are not asked
+    for again on every run.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    coverage = dict(coverage)
+    errors: list[Exception] = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(provider, syms, lo, hi) for syms, lo, hi in tasks]
+        for (syms, lo, hi), fut in zip(tasks, futures):
+            try:
+                px = fut.result()
+                px.index = pd.to_datetime(px.index).tz_localize(None)
+                cache = _merge_chunk(cache, px)
+            except Exception as exc:  # keep going; completed chunks are still cached
+                errors.append(exc)
+                continue
+            for sym in syms:
+                old = coverage.get(sym)
+                coverage[sym] = (lo, hi) if old is None else (min(old[0], lo), max(old[1], hi))
+    if cache is not None:
+        cache = cache.sort_index()
+    return cache, coverage, errors
+
+
 def load_or_fetch_equity_adj_close(
     cache_path: Path,
     tickers: list[str],
     start: pd.Timestamp,
     end: pd.Timestamp,
+    provider: EquityProvider | None = None,
+    chunk_size: int = 50,
+    max_workers: int = 4,
 ) -> pd.DataFrame:
-    """Load cached equity adjusted closes, or download and cache.
+    """Load cached equity adjusted closes, fetching only what is missing.
 
     Notes
     -----
-    - Prefer local cache if available.
+    - Prefer local cache if available. Coverage per ticker is tracked in a
+      ``<cache>.coverage.json`` sidecar; tickers or date ranges outside it are
+      fetched in chunks of ``chunk_size`` on ``max_workers`` threads and merged
+      into the cache, rebased onto each ticker's cached adjustment basis.
+    - Chunks that succeeded are written to the cache. If any chunk failed,
+      the cached data is returned with a ``RuntimeWarning`` (e.g. offline);
+      ``RuntimeError`` is raised only when there is no cache to fall back on.
+    - ``provider`` defaults to yfinance; any ``EquityProvider`` can stand in.
     - If the cache is parquet but the parquet engine (pyarrow/fastparquet) is
       missing, fall back to a yfinance download (if available) rather than
       crashing.
     """
-
+    provider = provider or yfinance_provider
+    cache: pd.DataFrame | None = None
+    parquet_ok = True
     if cache_path.exists():
         try:
-            df = pd.read_parquet(cache_path)
-            df.index = pd.to_datetime(df.index).tz_localize(None)
-            return df.sort_index()
+            cache = pd.read_parquet(cache_path)
+            cache.index = pd.to_datetime(cache.index).tz_localize(None)
+            cache = cache.sort_index()
         except ImportError:
             # Parquet engine missing; attempt online fallback below.
-            pass
+            parquet_ok = False
 
-    try:
-        df = _download_equities(tickers=tickers, start=start, end=end)
-    except Exception as exc:
-        raise RuntimeError(
-            f"Could not load equity cache at {cache_path} and failed to download with yfinance."
-        ) from exc
-
-    cache_path.parent.mkdir(parents=True, exist_ok=True)
-    # Cache when possible. If parquet engine is unavailable, write CSV fallback.
-    try:
-        df.to_parquet(cache_path)
-    except ImportError:
-        csv_path = cache_path.with_suffix(".csv")
-        df.to_csv(csv_path)
-    return df
+    coverage = _read_coverage(cache_path, cache) if cache is not None else {}
+    symbols = sorted(set(tickers) | {"SPY"})
+    tasks = plan_equity_fetches(
+        coverage, symbols, pd.Timestamp(start), pd.Timestamp(end), chunk_size, observed=_observed_spans(cache)
+    )
+    if not tasks and cache is not None:
+        return cache
+
+    cache, coverage, errors = fetch_equities_incremental(provider, cache, coverage, tasks, max_workers=max_workers)
+    if cache is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Cache when possible. If parquet engine is unavailable, write CSV fallback.
+        if parquet_ok:
+            try:
+                cache.to_parquet(cache_path)
+                _write_coverage(cache_path, coverage)
+            except ImportError:
+                parquet_ok = False
+        if not parquet_ok:
+            cache.to_csv(cache_path.with_suffix(".csv"))
+    if errors:
+        message = f"{len(errors)} of {len(tasks)} equity fetch chunks for {cache_path} failed ({errors[0]!r})"
+        if cache is None:
+            raise RuntimeError(f"Could not load equity cache: {message}") from errors[0]
+        warnings.warn(f"{message}; using the cached prices", RuntimeWarning, stacklevel=2)
+    return cache
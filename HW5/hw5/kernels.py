@@ -0,0 +1,152 @@
+"""Optional compiled kernels for the per-step loops in ``hw5.rolling``.
+
+When numba is importable the kernels below are JIT-compiled (no per-step
+allocation: all scratch buffers are created once per call). Otherwise the
+NumPy implementations in ``hw5.rolling`` are used. ``backend`` arguments and
+the ``HW5_BACKEND`` environment variable force one or the other.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+
+import numpy as np
+
+try:
+    import numba
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on the environment
+    numba = None
+    NUMBA_AVAILABLE = False
+
+BACKENDS = ("auto", "numba", "python")
+_EPS = float(np.finfo(np.float64).eps)  # lstsq default rcond is eps * max(M, N)
+
+
+def resolve_backend(backend: str | None = None) -> str:
+    """Return ``"numba"`` or ``"python"`` for a requested backend."""
+    backend = backend or os.environ.get("HW5_BACKEND", "auto")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    if backend == "auto":
+        return "numba" if NUMBA_AVAILABLE else "python"
+    if backend == "numba" and not NUMBA_AVAILABLE:
+        raise RuntimeError("backend='numba' requested but numba is not installed")
+    return backend
+
+
+def _jit(fn):
+    return numba.njit(cache=True, nogil=True)(fn) if NUMBA_AVAILABLE else fn
+
+
+@_jit
+def ols_window_kernel(yv, xv, window, out, rtol):  # pragma: no cover - compiled
+    """Windowed no-intercept OLS; rows ``i >= window`` of ``out`` are filled."""
+    T, p = xv.shape
+    xtx = np.empty((p, p))
+    xty = np.empty(p)
+    L = np.empty((p, p))
+    z = np.empty(p)
+    rows = np.empty(window, dtype=np.int64)
+    for i in range(window, T):
+        xtx[:, :] = 0.0
+        xty[:] = 0.0
+        n = 0
+        for k in range(i - window, i):
+            ok = math.isfinite(yv[k])
+            for a in range(p):
+                ok = ok and math.isfinite(xv[k, a])
+            if not ok:
+                continue
+            rows[n] = k
+            n += 1
+            for a in range(p):
+                xty[a] += xv[k, a] * yv[k]
+                for b in range(a + 1):
+                    xtx[a, b] += xv[k, a] * xv[k, b]
+        if n <= p:
+            continue
+
+        good = True
+        for j in range(p):
+            d = xtx[j, j]
+            for k in range(j):
+                d -= L[j, k] * L[j, k]
+            if not d > rtol * xtx[j, j]:
+                good = False
+                break
+            L[j, j] = math.sqrt(d)
+            for r in range(j + 1, p):
+                s = xtx[r, j]
+                for k in range(j):
+                    s -= L[r, k] * L[j, k]
+                L[r, j] = s / L[j, j]
+        if good:
+            for j in range(p):
+                s = xty[j]
+                for k in range(j):
+                    s -= L[j, k] * z[k]
+                z[j] = s / L[j, j]
+            for j in range(p - 1, -1, -1):
+                s = z[j]
+                for k in range(j + 1, p):
+                    s -= L[k, j] * out[i, k]
+                out[i, j] = s / L[j, j]
+        else:
+            # rank-deficient window: minimum-norm solution, as lstsq gives
+            sel = rows[:n]
+            beta = np.linalg.lstsq(xv[sel], yv[sel], rcond=_EPS * max(n, p))[0]
+            for j in range(p):
+                out[i, j] = beta[j]
+
+
+@_jit
+def slope_window_kernel(yv, xv, w, out):  # pragma: no cover - compiled
+    """Weighted no-intercept slope over the prior ``len(w)`` rows (oldest first)."""
+    window = w.shape[0]
+    for i in range(window, yv.shape[0]):
+        sxx = 0.0
+        sxy = 0.0
+        n = 0
+        for k in range(window):
+            y = yv[i - window + k]
+            x = xv[i - window + k]
+            if math.isfinite(y) and math.isfinite(x):
+                sxx += w[k] * x * x
+                sxy += w[k] * x * y
+                n += 1
+        if n >= 3 and sxx > 0:
+            out[i] = sxy / sxx
+
+
+@_jit
+def ew_recursive_kernel(yv, xv, lam, window, out):  # pragma: no cover - compiled
+    """Recursive EW slope; ``window <= 0`` means an infinite window."""
+    lam_out = lam**window if window > 0 else 0.0
+    sxx = 0.0
+    sxy = 0.0
+    n = 0
+    for i in range(yv.shape[0]):
+        if (window <= 0 or i >= window) and n >= 3 and sxx > 0:
+            out[i] = sxy / sxx
+        y = yv[i]
+        x = xv[i]
+        valid = math.isfinite(y) and math.isfinite(x)
+        sxx *= lam
+        sxy *= lam
+        if valid:
+            sxx += x * x
+            sxy += x * y
+            n += 1
+        if window > 0 and i >= window:
+            y = yv[i - window]
+            x = xv[i - window]
+            if math.isfinite(y) and math.isfinite(x):
+                sxx -= lam_out * x * x
+                sxy -= lam_out * x * y
+                n -= 1
+        if n == 0:
+            sxx = 0.0
+            sxy = 0.0
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+
 import numpy as np
 import pandas as pd
 
@@ -35,32 +37,135 @@ def oos_r2(y_true: pd.Series, y_pred: pd.Series) -> float:
     return 1.0 - sse / sst
 
 
+STAT_COLUMNS = ["rmse", "mean", "std", "q01", "q05", "q95", "q99", "skew", "kurtosis", "n"]
+_QUANTILES = {"q01": 0.01, "q05": 0.05, "q95": 0.95, "q99": 0.99}
+
+
+def _zero_out_fperr(a: np.ndarray, tol: np.ndarray) -> np.ndarray:
+    return np.where(np.abs(a) < tol, 0.0, a)
+
+
+def skew_kurtosis(
+    n: np.ndarray, m2: np.ndarray, m3: np.ndarray, m4: np.ndarray, max_abs: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """pandas' bias-corrected skew and excess kurtosis from central moment sums.
+
+    ``m2``..``m4`` are sums of powers of deviations from the mean; sums within
+    floating-point noise of zero (relative to ``max_abs``) count as constant data.
+    """
+    eps = np.finfo(float).eps
+    with np.errstate(invalid="ignore", divide="ignore"):
+        m2 = _zero_out_fperr(m2, (eps * max_abs) ** 2 * n)
+        m3 = _zero_out_fperr(m3, (eps * max_abs) ** 3 * n)
+        m4 = _zero_out_fperr(m4, (eps * max_abs) ** 4 * n)
+
+        skew = (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / m2**1.5)
+        skew = np.where(m2 == 0, 0.0, skew)
+        skew = np.where(n < 3, np.nan, skew)
+
+        denom = (n - 2) * (n - 3) * m2**2
+        kurt = n * (n + 1) * (n - 1) * m4 / denom - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        kurt = np.where(denom == 0, 0.0, kurt)
+        kurt = np.where(n < 4, np.nan, kurt)
+    return skew, kurt
+
+
+def grouped_error_stats(codes: np.ndarray, err: np.ndarray, n_groups: int) -> dict[str, np.ndarray]:
+    """``error_stats`` for every group code at once.
+
+    Values are sorted once by (code, value); sums come from ``np.bincount`` and
+    quantiles are gathered from the sorted runs with NumPy's linear
+    interpolation. Skew and kurtosis follow pandas' bias-corrected estimators,
+    including its constant-data tolerance. Groups without observations are NaN.
+    """
+    ok = ~np.isnan(err) & (codes >= 0)
+    c, e = codes[ok], err[ok]
+    # sort by value, then stably by code; small integer codes take NumPy's radix sort
+    by_value = np.argsort(e)
+    code_dtype = np.int16 if n_groups < np.iinfo(np.int16).max else np.int64
+    order = by_value[np.argsort(c[by_value].astype(code_dtype), kind="stable")]
+    c, e = c[order], e[order]
+    n = np.bincount(c, minlength=n_groups).astype(float)
+    has = n > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(c, weights=e, minlength=n_groups) / n
+        adj = e - mean[c]
+        adj2 = adj**2
+        m2 = np.bincount(c, weights=adj2, minlength=n_groups)
+        m3 = np.bincount(c, weights=adj2 * adj, minlength=n_groups)
+        m4 = np.bincount(c, weights=adj2**2, minlength=n_groups)
+        out = {
+            "rmse": np.sqrt(np.bincount(c, weights=e * e, minlength=n_groups) / n),
+            "mean": mean,
+            "std": np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan),
+        }
+
+        counts = n.astype(np.int64)
+        starts = np.cumsum(counts) - counts
+        padded = np.append(e, np.nan)  # empty groups read the NaN sentinel
+
+        def at(k: np.ndarray) -> np.ndarray:
+            return padded[np.where(has, starts + k, len(e))]
+
+        for name, q in _QUANTILES.items():
+            pos = np.maximum(counts - 1, 0) * q
+            lo = np.floor(pos).astype(np.int64)
+            t = pos - lo
+            lower, upper = at(lo), at(np.minimum(lo + 1, np.maximum(counts - 1, 0)))
+            diff = upper - lower
+            out[name] = np.where(t >= 0.5, upper - diff * (1 - t), lower + diff * t)  # numpy's _lerp
+
+        max_abs = np.fmax(np.abs(at(0)), np.abs(at(counts - 1)))
+    out["skew"], out["kurtosis"] = skew_kurtosis(n, m2, m3, m4, max_abs)
+    out["n"] = np.where(has, n, np.nan)
+    return {k: out[k] for k in STAT_COLUMNS}
+
+
+def grouped_oos_r2(codes: np.ndarray, y: np.ndarray, yhat: np.ndarray, n_groups: int) -> np.ndarray:
+    """``oos_r2`` per group code over rows where both ``y`` and ``yhat`` are present."""
+    ok = ~np.isnan(y) & ~np.isnan(yhat) & (codes >= 0)
+    c, y, yhat = codes[ok], y[ok], yhat[ok]
+    n = np.bincount(c, minlength=n_groups).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ybar = np.bincount(c, weights=y, minlength=n_groups) / n
+        sse = np.bincount(c, weights=(y - yhat) ** 2, minlength=n_groups)
+        sst = np.bincount(c, weights=(y - ybar[c]) ** 2, minlength=n_groups)
+        return np.where((n > 0) & (sst > 0), 1.0 - sse / sst, np.nan)
+
+
 def metrics_by_ticker(results: pd.DataFrame) -> pd.DataFrame:
-    rows: list[dict[str, float | str]] = []
-    for ticker, g in results.groupby("ticker"):
-        err_box = g["q_boxcar"]
-        err_ew = g["q_ew"]
-        pred_box = g["pred_boxcar"]
-        pred_ew = g["pred_ew"]
-        y = g["rho"]
-        r1 = error_stats(err_box)
-        r2 = error_stats(err_ew)
-        rows.append({"ticker": ticker, "model": "boxcar", **r1, "oos_r2": oos_r2(y, pred_box)})
-        rows.append({"ticker": ticker, "model": "ew", **r2, "oos_r2": oos_r2(y, pred_ew)})
-    return pd.DataFrame(rows)
+    """Error stats and OOS R^2 per ticker and model (boxcar then ew per ticker)."""
+    codes, tickers = pd.factorize(results["ticker"], sort=True)
+    G = len(tickers)
+    y = results["rho"].to_numpy(dtype=float)
+    per_model = []
+    for err_col, pred_col in [("q_boxcar", "pred_boxcar"), ("q_ew", "pred_ew")]:
+        stats = grouped_error_stats(codes, results[err_col].to_numpy(dtype=float), G)
+        stats["oos_r2"] = grouped_oos_r2(codes, y, results[pred_col].to_numpy(dtype=float), G)
+        per_model.append(stats)
+    out = {"ticker": tickers.repeat(2), "model": np.tile(np.array(["boxcar", "ew"], dtype=object), G)}
+    for col in STAT_COLUMNS + ["oos_r2"]:
+        # interleave so each ticker's boxcar row is followed by its ew row
+        out[col] = np.column_stack([per_model[0][col], per_model[1][col]]).ravel()
+    return pd.DataFrame(out)
+
+
+POOLED_MODELS = [("boxcar", "q_boxcar", "pred_boxcar"), ("ew", "q_ew", "pred_ew")]
 
 
 def pooled_metrics(results: pd.DataFrame) -> pd.DataFrame:
     out = []
-    for model, err_col, pred_col in [
-        ("boxcar", "q_boxcar", "pred_boxcar"),
-        ("ew", "q_ew", "pred_ew"),
-    ]:
+    for model, err_col, pred_col in POOLED_MODELS:
         stats = error_stats(results[err_col])
         stats["model"] = model
         stats["oos_r2"] = oos_r2(results["rho"], results[pred_col])
         out.append(stats)
-    df = pd.DataFrame(out)
+    return pooled_frame(out)
+
+
+def pooled_frame(rows: list[dict[str, object]]) -> pd.DataFrame:
+    """``pooled_metrics`` table from one stats dict per model, boxcar first."""
+    df = pd.DataFrame(rows)
     box_rmse = float(df.loc[df["model"] == "boxcar", "rmse"].iloc[0])
     box_r2 = float(df.loc[df["model"] == "boxcar", "oos_r2"].iloc[0])
     df["rmse_delta_vs_boxcar"] = df["rmse"] - box_rmse
@@ -68,14 +173,176 @@ def pooled_metrics(results: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def event_windows(results: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
-    weekly = results.groupby("date")[["q_boxcar", "q_ew"]].apply(
-        lambda g: pd.Series(
-            {
-                "rmse_boxcar": float(np.sqrt(np.nanmean(np.square(g["q_boxcar"])))),
-                "rmse_ew": float(np.sqrt(np.nanmean(np.square(g["q_ew"])))),
-            }
-        )
-    )
+def weekly_sse_counts(results: pd.DataFrame) -> pd.DataFrame:
+    """Per-date sum of squared errors and error counts for both models.
+
+    Tables from disjoint row sets can be combined with ``.add(fill_value=0)``
+    before ``weekly_rmse_from_sums``.
+    """
+    codes, dates = pd.factorize(results["date"], sort=True)
+    n = len(dates)
+    out = {}
+    for model, col in [("boxcar", "q_boxcar"), ("ew", "q_ew")]:
+        q = results[col].to_numpy(dtype=float)
+        ok = np.isfinite(q) & (codes >= 0)
+        out[f"sse_{model}"] = np.bincount(codes[ok], weights=np.square(q[ok]), minlength=n)
+        out[f"n_{model}"] = np.bincount(codes[ok], minlength=n).astype(float)
+    return pd.DataFrame(out, index=pd.Index(dates, name="date"))
+
+
+def weekly_rmse_from_sums(sums: pd.DataFrame) -> pd.DataFrame:
+    out = {}
+    for model in ["boxcar", "ew"]:
+        sse, cnt = sums[f"sse_{model}"].to_numpy(), sums[f"n_{model}"].to_numpy()
+        out[f"rmse_{model}"] = np.sqrt(np.divide(sse, cnt, out=np.full(len(sse), np.nan), where=cnt > 0))
+    return pd.DataFrame(out, index=sums.index)
+
+
+def weekly_pooled_rmse(results: pd.DataFrame) -> pd.DataFrame:
+    """Cross-sectional RMSE of ``q_boxcar`` / ``q_ew`` for every date.
+
+    One vectorized pass (square, then ``np.bincount`` sums and counts over the
+    date codes); NaN errors are skipped. Shared by ``event_windows`` and the
+    weekly RMSE plots so a panel is only aggregated once.
+    """
+    return weekly_rmse_from_sums(weekly_sse_counts(results))
+
+
+def event_windows(results: pd.DataFrame | None, top_n: int = 10, weekly: pd.DataFrame | None = None) -> pd.DataFrame:
+    weekly = (weekly_pooled_rmse(results) if weekly is None else weekly).copy()
     weekly["gap_ew_minus_boxcar"] = weekly["rmse_ew"] - weekly["rmse_boxcar"]
     return weekly.reindex(weekly["gap_ew_minus_boxcar"].abs().sort_values(ascending=False).head(top_n).index)
+
+
+@dataclass(frozen=True)
+class LogHistogramSketch:
+    """Fixed-bin histogram on ``sign(x) * log1p(|x| / scale)``.
+
+    Memory is ``bins`` counters per series regardless of how many values are
+    added, and counts over a window are differences of cumulative counts.
+    Each order statistic is known to within half a bin, i.e. a relative error
+    of about ``zmax / bins``.
+    """
+
+    zmax: float
+    bins: int = 512
+    scale: float = 1e-4
+
+    @classmethod
+    def for_values(cls, x: np.ndarray, bins: int = 512, scale: float = 1e-4) -> LogHistogramSketch:
+        finite = np.abs(x[np.isfinite(x)])
+        top = float(finite.max()) if finite.size else 1.0
+        return cls(zmax=float(np.log1p(top / scale)) * (1 + 1e-9) or 1.0, bins=bins, scale=scale)
+
+    @property
+    def width(self) -> float:
+        return 2 * self.zmax / self.bins
+
+    def bin_index(self, x: np.ndarray) -> np.ndarray:
+        z = np.sign(x) * np.log1p(np.abs(x) / self.scale)
+        return np.clip(((z + self.zmax) / self.width).astype(np.int64), 0, self.bins - 1)
+
+    def _order_statistic(self, cum: np.ndarray, rank: np.ndarray) -> np.ndarray:
+        """Centre of the bin holding the zero-based ``rank``-th smallest value."""
+        k = np.minimum((cum <= rank).sum(axis=-1, keepdims=True), self.bins - 1)
+        z = -self.zmax + (k + 0.5) * self.width
+        return np.sign(z) * self.scale * np.expm1(np.abs(z))
+
+    def quantiles(self, counts: np.ndarray, levels: list[float]) -> np.ndarray:
+        """Quantiles of histograms ``counts[..., bins]``; returns ``(..., len(levels))``, NaN when empty.
+
+        Interpolates linearly between the two neighbouring order statistics,
+        like ``np.quantile``, with each order statistic read as its bin centre.
+        """
+        cum = np.cumsum(counts, axis=-1)
+        n = cum[..., -1:]
+        out = []
+        for level in levels:
+            pos = level * np.maximum(n - 1, 0)
+            lo = np.floor(pos)
+            v_lo = self._order_statistic(cum, lo)
+            v_hi = self._order_statistic(cum, np.minimum(lo + 1, np.maximum(n - 1, 0)))
+            out.append(np.where(n > 0, v_lo + (v_hi - v_lo) * (pos - lo), np.nan)[..., 0])
+        return np.stack(out, axis=-1)
+
+
+def _window_sums(a: np.ndarray, window: int) -> np.ndarray:
+    """Sum of rows ``i - window + 1 .. i`` along axis 0 (shorter at the start)."""
+    csum = np.zeros((a.shape[0] + 1,) + a.shape[1:], dtype=a.dtype)
+    np.cumsum(a, axis=0, out=csum[1:])
+    lo = np.maximum(np.arange(1, a.shape[0] + 1) - window, 0)
+    return csum[1:] - csum[lo]
+
+
+def rolling_error_stats(
+    results: pd.DataFrame,
+    window: int,
+    by_ticker: bool = False,
+    quantiles: dict[str, float] | None = None,
+    min_obs: int = 2,
+    bins: int = 512,
+) -> pd.DataFrame:
+    """RMSE, mean error, OOS R^2 and tail quantiles over a trailing window of dates.
+
+    One pass builds per-date (and per-ticker) sums of ``q``, ``q^2``, ``rho``
+    and ``rho^2``; window sums are differences of their cumulative sums, so
+    the cost is linear in the panel size. Quantiles come from a
+    ``LogHistogramSketch`` with the same windowing. Windows with fewer than
+    ``min_obs`` observations are NaN. Rows are ordered (ticker,) model, date.
+    """
+    quantiles = _QUANTILES if quantiles is None else quantiles
+    date_codes, dates = pd.factorize(results["date"], sort=True)
+    if by_ticker:
+        group_codes, groups = pd.factorize(results["ticker"], sort=True)
+    else:
+        group_codes, groups = np.zeros(len(results), dtype=np.int64), pd.Index([None])
+    T, G = len(dates), len(groups)
+    y = results["rho"].to_numpy(dtype=float)
+    errs = {m: results[f"q_{m}"].to_numpy(dtype=float) for m in ("boxcar", "ew")}
+    sketch = LogHistogramSketch.for_values(np.concatenate(list(errs.values())), bins=bins)
+    chunk = max(1, 4_000_000 // max(T * bins, 1))  # bounds the (T, chunk, bins) count block
+
+    blocks = []
+    for model, q in errs.items():
+        pred = results[f"pred_{model}"].to_numpy(dtype=float)
+        ok = ~np.isnan(q) & ~np.isnan(y) & ~np.isnan(pred) & (date_codes >= 0) & (group_codes >= 0)
+        t, g, qv, yv = date_codes[ok], group_codes[ok], q[ok], y[ok]
+        cell = t * G + g
+
+        def window_sum(w: np.ndarray | None) -> np.ndarray:
+            return _window_sums(np.bincount(cell, weights=w, minlength=T * G).reshape(T, G).astype(float), window)
+
+        n, sq, sq2, sy, sy2 = (window_sum(w) for w in (None, qv, qv * qv, yv, yv * yv))
+        enough = n >= max(min_obs, 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sst = sy2 - sy * sy / n
+            stats = {
+                "n": n,
+                "rmse": np.where(enough, np.sqrt(sq2 / n), np.nan),
+                "mean": np.where(enough, sq / n, np.nan),
+                "oos_r2": np.where(enough & (sst > 0), 1.0 - sq2 / sst, np.nan),
+            }
+
+        bin_idx = sketch.bin_index(qv)
+        qs = np.full((T, G, len(quantiles)), np.nan)
+        for g0 in range(0, G, chunk):
+            C = min(chunk, G - g0)
+            sel = (g >= g0) & (g < g0 + C)
+            flat = (t[sel] * C + (g[sel] - g0)) * bins + bin_idx[sel]
+            counts = np.bincount(flat, minlength=T * C * bins).reshape(T, C, bins)
+            qs[:, g0 : g0 + C] = sketch.quantiles(_window_sums(counts, window), list(quantiles.values()))
+        qs[~enough] = np.nan
+        for i, name in enumerate(quantiles):
+            stats[name] = qs[..., i]
+
+        # (T, G) -> group-major long rows
+        cols: dict[str, object] = {"date": np.tile(dates.to_numpy(), G)}
+        if by_ticker:
+            cols["ticker"] = groups.repeat(T)
+        cols["model"] = model
+        cols.update({k: np.ascontiguousarray(v.T).reshape(-1) for k, v in stats.items()})
+        blocks.append(pd.DataFrame(cols))
+
+    out = pd.concat(blocks, ignore_index=True)
+    keys = ["ticker", "model", "date"] if by_ticker else ["model", "date"]
+    return out.sort_values(keys, kind="stable").reset_index(drop=True)
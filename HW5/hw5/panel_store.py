@@ -0,0 +1,272 @@
+"""Streaming, out-of-core storage of the long panel.
+
+``PanelWriter`` appends panel chunks to Parquet (one row group per chunk) or
+CSV, so peak memory is bounded by the chunk size rather than the universe.
+``panel_metrics_streamed`` computes the run_all metrics and plot inputs back
+from that file one chunk at a time.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from .metrics import (
+    _QUANTILES,
+    POOLED_MODELS,
+    STAT_COLUMNS,
+    LogHistogramSketch,
+    metrics_by_ticker,
+    pooled_frame,
+    skew_kurtosis,
+    weekly_rmse_from_sums,
+    weekly_sse_counts,
+)
+
+PANEL_FORMATS = ("parquet", "csv")
+POOLED_COLUMNS = ["rho", "pred_boxcar", "pred_ew", "q_boxcar", "q_ew"]
+TAIL_LEVELS = np.linspace(0.01, 0.99, 99)  # levels of plots.tail_summary
+ORDER_STAT_BINS = 1 << 16
+
+
+class PanelWriter:
+    def __init__(self, path: Path, fmt: str = "parquet") -> None:
+        if fmt not in PANEL_FORMATS:
+            raise ValueError(f"Unknown panel format {fmt!r}; expected one of {PANEL_FORMATS}")
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            path.unlink()
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self.fmt == "csv":
+            chunk.to_csv(self.path, mode="a", header=self.rows == 0, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                self._writer = pq.ParquetWriter(str(self.path), self._schema)
+            self._writer.write_table(table, row_group_size=max(len(chunk), 1))
+        self.rows += len(chunk)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> PanelWriter:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def write_panel_stream(chunks: Iterable[pd.DataFrame], path: Path, fmt: str = "parquet") -> int:
+    with PanelWriter(path, fmt) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return writer.rows
+
+
+def iter_panel_file(path: Path, columns: list[str] | None = None, csv_chunksize: int = 500_000) -> Iterator[pd.DataFrame]:
+    """Yield a stored panel chunk by chunk (Parquet row groups or CSV blocks)."""
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(str(path))
+        for i in range(pf.num_row_groups):
+            yield pf.read_row_group(i, columns=columns).to_pandas()
+    else:
+        parse = ["date"] if columns is None or "date" in columns else None
+        yield from pd.read_csv(path, usecols=columns, parse_dates=parse, chunksize=csv_chunksize)
+
+
+def _whole_tickers(chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """Re-cut ticker-contiguous chunks so no ticker spans two of them."""
+    carry: pd.DataFrame | None = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        last = chunk["ticker"].iloc[-1]
+        tail = (chunk["ticker"] == last).to_numpy()
+        carry = chunk.loc[tail]
+        if (~tail).any():
+            yield chunk.loc[~tail]
+    if carry is not None and not carry.empty:
+        yield carry
+
+
+Moments = tuple[float, float, float, float, float]  # n, mean, then sums of squared/cubed/4th-power deviations
+
+
+def _moments(x: np.ndarray) -> Moments:
+    if x.size == 0:
+        return (0.0, 0.0, 0.0, 0.0, 0.0)
+    mean = float(x.mean())
+    d = x - mean
+    d2 = d * d
+    return (float(x.size), mean, float(d2.sum()), float((d2 * d).sum()), float((d2 * d2).sum()))
+
+
+def _merge_moments(a: Moments, b: Moments) -> Moments:
+    """Central moment sums of the union of two disjoint samples (Chan et al. / Pebay)."""
+    na, ma, m2a, m3a, m4a = a
+    nb, mb, m2b, m3b, m4b = b
+    n = na + nb
+    if na == 0 or nb == 0:
+        return a if nb == 0 else b
+    d = mb - ma
+    m2 = m2a + m2b + d * d * na * nb / n
+    m3 = m3a + m3b + d**3 * na * nb * (na - nb) / n**2 + 3 * d * (na * m2b - nb * m2a) / n
+    m4 = (
+        m4a
+        + m4b
+        + d**4 * na * nb * (na * na - na * nb + nb * nb) / n**3
+        + 6 * d * d * (na * na * m2b + nb * nb * m2a) / n**2
+        + 4 * d * (na * m3b - nb * m3a) / n
+    )
+    return (n, ma + d * nb / n, m2, m3, m4)
+
+
+def _interpolation_ranks(n: int, levels: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Lower/upper order-statistic ranks and weights of ``np.quantile``'s linear method."""
+    pos = max(n - 1, 0) * levels
+    lo = np.floor(pos).astype(np.int64)
+    return lo, np.minimum(lo + 1, max(n - 1, 0)), pos - lo
+
+
+def _streamed_order_statistics(
+    chunks: Callable[[], Iterable[pd.DataFrame]],
+    ranks: dict[str, np.ndarray],
+    max_abs: dict[str, float],
+) -> dict[str, np.ndarray]:
+    """Exact order statistics ``ranks[col]`` of the non-NaN values of each column.
+
+    One pass bins every value into a fine ``LogHistogramSketch``, locating the
+    bin that holds each requested rank; a second pass keeps only the values in
+    those bins, which are sorted to read off the exact ranks. Memory is the
+    histogram plus the (small) share of values in the selected bins.
+    """
+    sketches = {c: LogHistogramSketch.for_values(np.array([max_abs[c]]), bins=ORDER_STAT_BINS) for c in ranks}
+    counts = {c: np.zeros(ORDER_STAT_BINS, dtype=np.int64) for c in ranks}
+    for chunk in chunks():
+        for c, sketch in sketches.items():
+            e = chunk[c].to_numpy(dtype=float)
+            counts[c] += np.bincount(sketch.bin_index(e[~np.isnan(e)]), minlength=ORDER_STAT_BINS)
+
+    target: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+    for c, r in ranks.items():
+        cum = np.cumsum(counts[c])
+        b = np.searchsorted(cum, r, side="right")  # first bin with more than r values up to it
+        target[c] = (b, r - (cum[b] - counts[c][b]))
+
+    kept: dict[str, list[np.ndarray]] = {c: [] for c in ranks}
+    for chunk in chunks():
+        for c, sketch in sketches.items():
+            e = chunk[c].to_numpy(dtype=float)
+            e = e[~np.isnan(e)]
+            kept[c].append(e[np.isin(sketch.bin_index(e), target[c][0])])
+
+    out = {}
+    for c, sketch in sketches.items():
+        v = np.concatenate(kept[c])
+        bv = sketch.bin_index(v)
+        order = np.lexsort((v, bv))
+        v, bv = v[order], bv[order]
+        b, offset = target[c]
+        out[c] = v[np.searchsorted(bv, b) + offset]
+    return out
+
+
+def panel_metrics_streamed(
+    path: Path,
+    csv_chunksize: int = 500_000,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame | None]:
+    """Per-ticker metrics, pooled metrics, weekly RMSE and tail quantiles from a stored panel.
+
+    Everything is reduced one chunk at a time, so memory is bounded by the
+    chunk size. Pooled moments and OOS R^2 are merged from per-chunk central
+    moment sums; pooled quantiles and the 1%..99% tail quantiles (the
+    ``plots.tail_summary`` table, ``None`` if a model has no errors) are exact
+    order statistics from two more passes over the error columns.
+    """
+    per_ticker: list[pd.DataFrame] = []
+    sums: pd.DataFrame | None = None
+    err = {model: _moments(np.empty(0)) for model, _, _ in POOLED_MODELS}
+    fit = dict(err)
+    sumsq = dict.fromkeys(err, 0.0)
+    sse = dict.fromkeys(err, 0.0)
+    max_abs = dict.fromkeys(err, 0.0)
+    cols = ["date", "ticker", *POOLED_COLUMNS]
+    for chunk in _whole_tickers(iter_panel_file(path, columns=cols, csv_chunksize=csv_chunksize)):
+        per_ticker.append(metrics_by_ticker(chunk))
+        part = weekly_sse_counts(chunk)
+        sums = part if sums is None else sums.add(part, fill_value=0.0)
+
+        y = chunk["rho"].to_numpy(dtype=float)
+        for model, err_col, pred_col in POOLED_MODELS:
+            e = chunk[err_col].to_numpy(dtype=float)
+            e = e[~np.isnan(e)]
+            err[model] = _merge_moments(err[model], _moments(e))
+            sumsq[model] += float(np.dot(e, e))
+            finite = np.abs(e[np.isfinite(e)])
+            if finite.size:
+                max_abs[model] = max(max_abs[model], float(finite.max()))
+            pred = chunk[pred_col].to_numpy(dtype=float)
+            ok = ~np.isnan(y) & ~np.isnan(pred)
+            fit[model] = _merge_moments(fit[model], _moments(y[ok]))
+            sse[model] += float(np.sum((y[ok] - pred[ok]) ** 2))
+
+    if sums is None:
+        raise ValueError(f"Panel file {path} is empty")
+
+    levels = np.concatenate([list(_QUANTILES.values()), TAIL_LEVELS])
+    ranks = {}
+    for model, err_col, _ in POOLED_MODELS:
+        lo, hi, _ = _interpolation_ranks(int(err[model][0]), levels)
+        ranks[err_col] = np.concatenate([lo, hi]) if err[model][0] else np.empty(0, dtype=np.int64)
+    order_stats = _streamed_order_statistics(
+        lambda: iter_panel_file(path, columns=list(ranks), csv_chunksize=csv_chunksize),
+        ranks,
+        {err_col: max_abs[model] for model, err_col, _ in POOLED_MODELS},
+    )
+
+    rows = []
+    tail = {}
+    for model, err_col, _ in POOLED_MODELS:
+        n, mean, m2, m3, m4 = err[model]
+        stats: dict[str, object] = dict.fromkeys(STAT_COLUMNS, np.nan)
+        if n:
+            _, _, t = _interpolation_ranks(int(n), levels)
+            lower, upper = np.split(order_stats[err_col], 2)
+            diff = upper - lower
+            qs = np.where(t >= 0.5, upper - diff * (1 - t), lower + diff * t)  # numpy's _lerp
+            skew, kurt = skew_kurtosis(np.array(n), np.array(m2), np.array(m3), np.array(m4), np.array(max_abs[model]))
+            stats.update(
+                rmse=float(np.sqrt(sumsq[model] / n)),
+                mean=mean,
+                std=float(np.sqrt(m2 / (n - 1))) if n > 1 else np.nan,
+                skew=float(skew),
+                kurtosis=float(kurt),
+                n=n,
+            )
+            stats.update(zip(_QUANTILES, map(float, qs[: len(_QUANTILES)])))
+            tail[model] = qs[len(_QUANTILES) :]
+        stats["model"] = model
+        n_fit, _, sst, _, _ = fit[model]
+        stats["oos_r2"] = 1.0 - sse[model] / sst if n_fit and sst > 0 else np.nan
+        rows.append(stats)
+
+    weekly = weekly_rmse_from_sums(sums.sort_index())
+    tail_table = pd.DataFrame(tail, index=TAIL_LEVELS) if len(tail) == len(POOLED_MODELS) else None
+    return pd.concat(per_ticker, ignore_index=True), pooled_frame(rows), weekly, tail_table
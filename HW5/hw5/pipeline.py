@@ -1,26 +1,260 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Sequence
 
 import numpy as np
 import pandas as pd
 
+from .cache import StageCache, cached, open_cache
 from .config import Config
-from .io import load_cds, load_or_fetch_equity_adj_close
+from .instrument import NULL_TIMER, Timer
+from .io import (
+    cds_dataset_is_current,
+    convert_cds_to_parquet,
+    load_cds,
+    load_cds_wide_parquet,
+    load_or_fetch_equity_adj_close,
+)
 from .rolling import (
+    ew_weights,
     rolling_ols_no_intercept,
+    rolling_ols_no_intercept_array,
+    rolling_slope_no_intercept_array,
     rolling_slope_no_intercept_boxcar,
     rolling_slope_no_intercept_ew,
 )
-from .transforms import align_weekly_returns, cds_wide_parspread, simple_returns, to_weekly_wed_last
+from .transforms import ResampledReturns, cds_wide_parspread, resample_returns_multi
 
 
 @dataclass
 class PipelineResult:
-    panel: pd.DataFrame
+    panel: pd.DataFrame | CompactPanel | None  # CompactPanel when config.compact_panel
     cds_weekly_ret: pd.DataFrame
     eq_weekly_ret: pd.DataFrame
     market_weekly_ret: pd.Series
+    cds_weekly_px: pd.DataFrame | None = None
+    eq_weekly_px: pd.DataFrame | None = None
+    cache_key: str | None = None  # stage-cache key of the weekly returns, when caching is on
+    cds_last_day: pd.Timestamp | None = None  # last daily CDS / equity rows behind the weekly bins
+    eq_last_day: pd.Timestamp | None = None
+
+
+PANEL_COLUMNS = [
+    "date",
+    "ticker",
+    "r_cds",
+    "r_equity",
+    "m",
+    "r_index",
+    "gamma",
+    "beta_equity",
+    "beta_index",
+    "f",
+    "rho",
+    "c",
+    "mu_boxcar",
+    "mu_ew",
+    "pred_boxcar",
+    "pred_ew",
+    "q_boxcar",
+    "q_ew",
+]
+# per-date columns that CompactPanel stores once instead of once per ticker
+DATE_COLUMNS = ["m", "r_index"]
+COMPACT_PANEL_COLUMNS = [c for c in PANEL_COLUMNS if c not in DATE_COLUMNS]
+
+
+def _lag(a: np.ndarray) -> np.ndarray:
+    out = np.full_like(a, np.nan)
+    out[1:] = a[:-1]
+    return out
+
+
+@dataclass
+class HedgeStage:
+    """Stage-1 (contemporaneous hedge) outputs as ``(T, N)`` arrays.
+
+    These depend only on the weekly returns and ``boxcar_window``, so a
+    parameter sweep over the predictive stage can reuse one instance.
+    """
+
+    dates: pd.Index
+    tickers: list[str]
+    r_cds: np.ndarray
+    r_equity: np.ndarray
+    m: np.ndarray
+    r_index: np.ndarray
+    gamma: np.ndarray
+    beta_equity: np.ndarray
+    beta_index: np.ndarray
+    f: np.ndarray
+    rho: np.ndarray
+    c: np.ndarray
+
+
+def compute_hedge_stage(
+    cds_ret: pd.DataFrame,
+    eq_ret: pd.DataFrame,
+    market_ret: pd.Series,
+    boxcar_window: int,
+    index_ret: pd.Series | None = None,
+) -> HedgeStage:
+    """Stage-1 hedge regressions for every ticker in ``cds_ret``.
+
+    ``index_ret`` defaults to the cross-sectional mean of ``cds_ret``; pass
+    the full-universe index when ``cds_ret`` only holds a subset of tickers.
+    """
+    dates = cds_ret.index
+    tickers = list(cds_ret.columns)
+    T, N = len(dates), len(tickers)
+
+    if index_ret is None:
+        index_ret = cds_ret.mean(axis=1, skipna=True)
+    index_ret = index_ret.reindex(dates).to_numpy(dtype=float)
+    r_cds = cds_ret.to_numpy(dtype=float)
+    r_eq = eq_ret.reindex(index=dates, columns=tickers).to_numpy(dtype=float)
+    m = market_ret.reindex(dates).to_numpy(dtype=float)
+    m_b = np.broadcast_to(m[:, None], (T, N))
+    idx_b = np.broadcast_to(index_ret[:, None], (T, N))
+
+    gamma = rolling_ols_no_intercept_array(r_eq, m_b[..., None], window=boxcar_window)[..., 0]
+    betas = rolling_ols_no_intercept_array(r_cds, np.stack([r_eq, idx_b], axis=-1), window=boxcar_window)
+
+    f = betas[..., 0] * r_eq + betas[..., 1] * idx_b
+    return HedgeStage(
+        dates=dates,
+        tickers=tickers,
+        r_cds=r_cds,
+        r_equity=r_eq,
+        m=m_b,
+        r_index=idx_b,
+        gamma=gamma,
+        beta_equity=betas[..., 0],
+        beta_index=betas[..., 1],
+        f=f,
+        rho=r_cds - f,
+        c=r_eq - gamma * m_b,
+    )
+
+
+def compute_predictive_arrays(
+    rho: np.ndarray,
+    c: np.ndarray,
+    ew_window: int,
+    ew_half_life: float,
+) -> dict[str, np.ndarray]:
+    """Boxcar and EW predictive slopes, forecasts and errors for ``rho ~ c_{n-1}``."""
+    c_lag = _lag(c)
+    mu_box = rolling_slope_no_intercept_array(rho, c_lag, window=ew_window)
+    mu_ew = rolling_slope_no_intercept_array(rho, c_lag, window=ew_window, weights=ew_weights(ew_window, ew_half_life))
+    pred_box = _lag(mu_box) * c_lag
+    pred_ew = _lag(mu_ew) * c_lag
+    return {
+        "mu_boxcar": mu_box,
+        "mu_ew": mu_ew,
+        "pred_boxcar": pred_box,
+        "pred_ew": pred_ew,
+        "q_boxcar": rho - pred_box,
+        "q_ew": rho - pred_ew,
+    }
+
+
+def _panel_series(stage: HedgeStage, pred: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    return {
+        "r_cds": stage.r_cds,
+        "r_equity": stage.r_equity,
+        "m": stage.m,
+        "r_index": stage.r_index,
+        "gamma": stage.gamma,
+        "beta_equity": stage.beta_equity,
+        "beta_index": stage.beta_index,
+        "f": stage.f,
+        "rho": stage.rho,
+        "c": stage.c,
+        **pred,
+    }
+
+
+def compute_predictive_panel(stage: HedgeStage, ew_window: int, ew_half_life: float) -> pd.DataFrame:
+    """Stage-2 predictive slopes on top of ``stage``, returned as the long panel."""
+    T, N = len(stage.dates), len(stage.tickers)
+    wide = _panel_series(stage, compute_predictive_arrays(stage.rho, stage.c, ew_window, ew_half_life))
+    # ticker-major row order, matching the per-ticker concat
+    cols: dict[str, object] = {
+        "date": np.tile(stage.dates.to_numpy(), N),
+        "ticker": np.repeat(np.asarray(stage.tickers, dtype=object), T),
+    }
+    cols.update({k: np.ascontiguousarray(v.T).reshape(-1) for k, v in wide.items()})
+    return pd.DataFrame(cols, columns=PANEL_COLUMNS)
+
+
+@dataclass
+class CompactPanel:
+    """Memory-lean form of the long panel.
+
+    ``panel`` stores ``ticker`` as a categorical and the derived series as
+    float32 (the estimators still run in float64); the per-date market and
+    CDS-index returns (``m``, ``r_index``) are kept once in ``by_date``
+    instead of being repeated for every ticker.
+    """
+
+    panel: pd.DataFrame
+    by_date: pd.DataFrame
+
+    def __len__(self) -> int:
+        return len(self.panel)
+
+    @classmethod
+    def from_long(cls, panel: pd.DataFrame) -> CompactPanel:
+        by_date = panel.groupby("date", sort=True)[DATE_COLUMNS].first()
+        compact = panel[COMPACT_PANEL_COLUMNS].copy()
+        compact["ticker"] = pd.Categorical(compact["ticker"], categories=sorted(compact["ticker"].unique()))
+        float_cols = COMPACT_PANEL_COLUMNS[2:]
+        compact[float_cols] = compact[float_cols].astype(np.float32)
+        return cls(panel=compact, by_date=by_date)
+
+    def to_long(self) -> pd.DataFrame:
+        """Float64 long panel with the ``PANEL_COLUMNS`` layout."""
+        out = self.panel.astype({c: float for c in COMPACT_PANEL_COLUMNS[2:]})
+        out["ticker"] = out["ticker"].astype(out["ticker"].cat.categories.dtype)
+        per_row = self.by_date.reindex(pd.DatetimeIndex(out["date"]))
+        for col in DATE_COLUMNS:
+            out[col] = per_row[col].to_numpy(dtype=float)
+        return out[PANEL_COLUMNS]
+
+    def memory_usage(self) -> int:
+        return int(self.panel.memory_usage(deep=True).sum() + self.by_date.memory_usage(deep=True).sum())
+
+    def write(self, path: Path, fmt: str = "csv") -> Path:
+        """Write ``panel`` to ``path`` and ``by_date`` next to it as ``<stem>_by_date``; returns the latter."""
+        by_date_path = path.with_name(f"{path.stem}_by_date{path.suffix}")
+        if fmt == "parquet":
+            self.panel.to_parquet(path, index=False)
+            self.by_date.to_parquet(by_date_path)
+        else:
+            self.panel.to_csv(path, index=False)
+            self.by_date.to_csv(by_date_path)
+        return by_date_path
+
+
+def compact_predictive_panel(stage: HedgeStage, ew_window: int, ew_half_life: float) -> CompactPanel:
+    """``compute_predictive_panel`` assembled directly in compact form."""
+    T, N = len(stage.dates), len(stage.tickers)
+    wide = _panel_series(stage, compute_predictive_arrays(stage.rho, stage.c, ew_window, ew_half_life))
+    cols: dict[str, object] = {
+        "date": np.tile(stage.dates.to_numpy(), N),
+        "ticker": pd.Categorical.from_codes(np.repeat(np.arange(N), T), categories=stage.tickers),
+    }
+    cols.update(
+        {k: np.ascontiguousarray(v.T, dtype=np.float32).reshape(-1) for k, v in wide.items() if k not in DATE_COLUMNS}
+    )
+    by_date = pd.DataFrame(
+        {"m": stage.m[:, 0] if N else np.full(T, np.nan), "r_index": stage.r_index[:, 0] if N else np.full(T, np.nan)},
+        index=pd.Index(stage.dates, name="date"),
+    )
+    return CompactPanel(panel=pd.DataFrame(cols, columns=COMPACT_PANEL_COLUMNS), by_date=by_date)
 
 
 def compute_panel(
@@ -30,6 +264,49 @@ def compute_panel(
     boxcar_window: int,
     ew_window: int,
     ew_half_life: float,
+    batched: bool = True,
+) -> pd.DataFrame:
+    """Long ticker/date panel of hedge and predictive regression outputs.
+
+    ``batched=True`` solves every ticker at once on ``(T, N, p)`` arrays with
+    stacked normal equations; ``batched=False`` runs the per-ticker loop.
+    Inputs are expected to share the same weekly index (see
+    ``align_weekly_returns``).
+    """
+    if not batched:
+        return _compute_panel_loop(cds_ret, eq_ret, market_ret, boxcar_window, ew_window, ew_half_life)
+    stage = compute_hedge_stage(cds_ret, eq_ret, market_ret, boxcar_window)
+    return compute_predictive_panel(stage, ew_window, ew_half_life)
+
+
+def iter_panel_chunks(
+    cds_ret: pd.DataFrame,
+    eq_ret: pd.DataFrame,
+    market_ret: pd.Series,
+    boxcar_window: int,
+    ew_window: int,
+    ew_half_life: float,
+    chunk_size: int = 256,
+) -> Iterator[pd.DataFrame]:
+    """Yield the long panel ``chunk_size`` tickers at a time.
+
+    Concatenating the chunks reproduces ``compute_panel``; the CDS index return
+    is always taken over the full universe.
+    """
+    index_ret = cds_ret.mean(axis=1, skipna=True)
+    for i in range(0, cds_ret.shape[1], chunk_size):
+        cols = cds_ret.columns[i : i + chunk_size]
+        stage = compute_hedge_stage(cds_ret[cols], eq_ret, market_ret, boxcar_window, index_ret=index_ret)
+        yield compute_predictive_panel(stage, ew_window, ew_half_life)
+
+
+def _compute_panel_loop(
+    cds_ret: pd.DataFrame,
+    eq_ret: pd.DataFrame,
+    market_ret: pd.Series,
+    boxcar_window: int,
+    ew_window: int,
+    ew_half_life: float,
 ) -> pd.DataFrame:
     index_ret = cds_ret.mean(axis=1, skipna=True).rename("r_index")
     rows: list[pd.DataFrame] = []
@@ -81,35 +358,161 @@ def compute_panel(
     return pd.concat(rows, axis=0, ignore_index=True)
 
 
-def run_pipeline(config: Config) -> PipelineResult:
-    cds_df = load_cds(config.cds_path)
-    tickers = sorted(cds_df["ticker"].unique().tolist())
-    cds_px = cds_wide_parspread(cds_df)
+def _cds_source(config: Config, timer: Timer = NULL_TIMER) -> Path:
+    """The columnar dataset written by io.convert_cds_to_parquet when present, else the delim file.
 
-    eq_px = load_or_fetch_equity_adj_close(
-        config.equity_cache_path,
-        tickers=tickers,
-        start=cds_px.index.min(),
-        end=cds_px.index.max(),
-    )
+    A dataset converted from an older delim file is rebuilt first.
+    """
+    dataset = config.cds_dataset_dir()
+    if not dataset.exists():
+        return config.cds_path
+    if not cds_dataset_is_current(dataset, config.cds_path):
+        with timer.stage("convert_cds"):
+            convert_cds_to_parquet(config.cds_path, dataset, overwrite=True)
+    return dataset
+
+
+def _cds_selection(config: Config) -> dict:
+    return {"tickers": config.tickers, "start": config.start_date, "end": config.end_date}
+
+
+def _load_cds_wide(config: Config, timer: Timer = NULL_TIMER) -> pd.DataFrame:
+    source = _cds_source(config, timer)
+    if source != config.cds_path:
+        return load_cds_wide_parquet(source, **_cds_selection(config))
+    with timer.stage("load_cds_rows") as rec:
+        rows = load_cds(config.cds_path)
+        rec.rows = len(rows)
+    # same selection the Parquet loader pushes down
+    keep = np.ones(len(rows), dtype=bool)
+    if config.tickers is not None:
+        keep &= rows["ticker"].isin(config.tickers).to_numpy()
+    if config.start_date is not None:
+        keep &= (rows["date"] >= pd.Timestamp(config.start_date)).to_numpy()
+    if config.end_date is not None:
+        keep &= (rows["date"] <= pd.Timestamp(config.end_date)).to_numpy()
+    with timer.stage("pivot"):
+        return cds_wide_parspread(rows if keep.all() else rows[keep])
+
+
+def _load_prices(
+    config: Config, cache: StageCache | None = None, timer: Timer = NULL_TIMER
+) -> tuple[pd.DataFrame, pd.DataFrame, list[str]]:
+    """Daily wide CDS parspreads and equity adjusted closes (incl. SPY)."""
+    with timer.stage("load_cds") as rec:
+        cds_key = None
+        if cache is not None:
+            cds_key = cache.key(cds=cache.file_digest(_cds_source(config, timer)), **_cds_selection(config))
+        cds_px = cached(cache, "cds_wide", cds_key, lambda: _load_cds_wide(config, timer))
+        rec.rows = len(cds_px)
+    tickers = sorted(cds_px.columns.tolist())
+
+    with timer.stage("load_equity") as rec:
+        eq_px = load_or_fetch_equity_adj_close(
+            config.equity_cache_path,
+            tickers=tickers,
+            start=cds_px.index.min(),
+            end=cds_px.index.max(),
+        )
+        rec.rows = len(eq_px)
     if "SPY" not in eq_px.columns:
         raise ValueError("Equity adjusted close data must include SPY")
+    return cds_px, eq_px, tickers
 
-    cds_w = to_weekly_wed_last(cds_px)
-    eq_w = to_weekly_wed_last(eq_px[tickers + ["SPY"]])
 
-    cds_ret = simple_returns(cds_w)
-    eq_ret = simple_returns(eq_w[tickers])
-    m_ret = simple_returns(eq_w[["SPY"]])["SPY"].rename("m")
+def _weekly_key(cache: StageCache, config: Config, anchor: str) -> str:
+    return cache.key(
+        cds=cache.file_digest(_cds_source(config)),
+        equity=cache.file_digest(config.equity_cache_path),
+        anchor=anchor,
+        **_cds_selection(config),
+    )
 
-    cds_ret, eq_ret, m_ret = align_weekly_returns(cds_ret, eq_ret, m_ret)
 
-    panel = compute_panel(
-        cds_ret=cds_ret,
-        eq_ret=eq_ret,
-        market_ret=m_ret,
-        boxcar_window=config.boxcar_window,
-        ew_window=config.ew_window,
-        ew_half_life=config.ew_half_life,
+def _result_from_block(
+    block: ResampledReturns,
+    config: Config,
+    build_panel: bool,
+    cache: StageCache | None = None,
+    weekly_key: str | None = None,
+    timer: Timer = NULL_TIMER,
+) -> PipelineResult:
+    panel = None
+    if build_panel:
+        with timer.stage("compute_panel") as rec:
+            panel = _panel_from_block(block, config, cache, weekly_key)
+            rec.rows = len(panel)
+    return PipelineResult(
+        panel=panel,
+        cds_weekly_ret=block.cds_ret,
+        eq_weekly_ret=block.eq_ret,
+        market_weekly_ret=block.market_ret,
+        cds_weekly_px=block.cds_px,
+        eq_weekly_px=block.eq_px,
+        cache_key=weekly_key,
+        cds_last_day=block.cds_last_day,
+        eq_last_day=block.eq_last_day,
     )
-    return PipelineResult(panel=panel, cds_weekly_ret=cds_ret, eq_weekly_ret=eq_ret, market_weekly_ret=m_ret)
+
+
+def _panel_from_block(
+    block: ResampledReturns, config: Config, cache: StageCache | None, weekly_key: str | None
+) -> pd.DataFrame | CompactPanel:
+    build = compact_predictive_panel if config.compact_panel else compute_predictive_panel
+
+    def hedge() -> HedgeStage:
+        return compute_hedge_stage(block.cds_ret, block.eq_ret, block.market_ret, config.boxcar_window)
+
+    if cache is None:
+        return build(hedge(), config.ew_window, config.ew_half_life)
+    hedge_key = cache.key(weekly=weekly_key, boxcar_window=config.boxcar_window)
+    panel_key = cache.key(
+        hedge=hedge_key, ew_window=config.ew_window, ew_half_life=config.ew_half_life, compact=config.compact_panel
+    )
+    return cache.get_or_compute(
+        "panel",
+        panel_key,
+        lambda: build(cache.get_or_compute("hedge", hedge_key, hedge), config.ew_window, config.ew_half_life),
+    )
+
+
+def run_pipeline(config: Config, build_panel: bool = True, timer: Timer = NULL_TIMER) -> PipelineResult:
+    """Load, resample to ``config.anchor`` and estimate; ``build_panel=False`` stops
+    at the resampled returns (``panel`` is then ``None``, e.g. when the panel is
+    streamed to disk). Stages are memoized on disk when ``config.cache_dir`` is set
+    and timed into ``timer`` (see hw5.instrument)."""
+    return run_pipeline_multi(config, [config.anchor], build_panel=build_panel, timer=timer)[config.anchor]
+
+
+def run_pipeline_multi(
+    config: Config, anchors: Sequence[str], build_panel: bool = True, timer: Timer = NULL_TIMER
+) -> dict[str, PipelineResult]:
+    """Like ``run_pipeline`` for several anchors (e.g. ``["W-WED", "W-FRI"]``),
+    loading the daily data once and resampling all anchors in a single pass."""
+    cache = open_cache(config)
+    blocks: dict[str, ResampledReturns] = {}
+    keys: dict[str, str | None] = dict.fromkeys(anchors)
+    if cache is not None:
+        with timer.stage("weekly_cache_lookup"):
+            for anchor in anchors:
+                keys[anchor] = _weekly_key(cache, config, anchor)
+                hit = cache.get("weekly", keys[anchor])
+                if hit is not None:
+                    blocks[anchor] = hit
+
+    missing = [a for a in anchors if a not in blocks]
+    if missing:
+        cds_px, eq_px, tickers = _load_prices(config, cache, timer)
+        with timer.stage("resample") as rec:
+            fresh = resample_returns_multi(cds_px, eq_px, tickers, missing)
+            rec.rows = sum(len(b.cds_ret) for b in fresh.values())
+        for anchor, block in fresh.items():
+            if cache is not None:
+                # rekey: loading may have extended the equity cache file
+                keys[anchor] = _weekly_key(cache, config, anchor)
+                cache.put("weekly", keys[anchor], block)
+        blocks.update(fresh)
+    return {
+        anchor: _result_from_block(blocks[anchor], config, build_panel, cache, keys[anchor], timer)
+        for anchor in anchors
+    }
@@ -0,0 +1,165 @@
+"""Lazy, parallel rendering of the run_all figures.
+
+A ``PlotJob`` pairs a small plot-ready summary (see the ``*_summary``
+functions in hw5.plots) with the ``render_*`` function that draws it. Jobs are
+hashed on their summary, renderer (including its module's source) and
+arguments; a figure whose hash matches the manifest entry of the PNG already
+on disk is skipped, the rest are rendered on the Agg backend, in a process
+pool when there are several.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+
+from . import plots
+
+MANIFEST_NAME = ".plot_manifest.json"
+
+# robustness_sweep.csv column -> heatmap file name
+ROBUSTNESS_HEATMAPS = {
+    "delta_rmse_vs_baseline": "delta_rmse_heatmap.png",
+    "stability_rank_corr": "stability_heatmap.png",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _module_source_hash(module: str) -> str:
+    return hashlib.sha256(inspect.getsource(sys.modules[module]).encode()).hexdigest()
+
+
+@dataclass
+class PlotJob:
+    render: Callable[..., None]  # module-level, so it pickles into worker processes
+    summary: pd.DataFrame | pd.Series
+    out_path: Path
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+    def digest(self) -> str:
+        h = hashlib.sha256()
+        h.update(f"{self.render.__module__}.{self.render.__qualname__}".encode())
+        h.update(_module_source_hash(self.render.__module__).encode())  # editing the renderer redraws
+        h.update(json.dumps(self.kwargs, sort_keys=True, default=str).encode())
+        frame = self.summary.to_frame() if isinstance(self.summary, pd.Series) else self.summary
+        h.update(json.dumps([str(c) for c in frame.columns] + list(frame.shape)).encode())
+        h.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+        return h.hexdigest()
+
+
+def panel_plot_jobs(
+    results: pd.DataFrame | None,
+    out_dir: Path,
+    weekly: pd.DataFrame | None = None,
+    window: int = 12,
+    tail: pd.DataFrame | None = None,
+) -> list[PlotJob]:
+    """Jobs for the rolling RMSE, error gap and tail QQ figures.
+
+    ``results`` may be ``None`` when the ``weekly`` RMSE table and ``tail``
+    quantiles are already reduced (see ``panel_store.panel_metrics_streamed``).
+    """
+    jobs = [
+        PlotJob(
+            plots.render_rolling_rmse,
+            plots.rolling_rmse_summary(results, window, weekly),
+            out_dir / "rolling_rmse.png",
+            {"window": window},
+        ),
+        PlotJob(plots.render_error_gap, plots.error_gap_summary(results, weekly), out_dir / "error_gap.png"),
+    ]
+    quantiles = plots.tail_summary(results) if tail is None and results is not None else tail
+    if quantiles is not None:
+        jobs.append(PlotJob(plots.render_tail_comparison, quantiles, out_dir / "tail_qq.png"))
+    return jobs
+
+
+def robustness_plot_jobs(
+    table: pd.DataFrame,
+    out_dir: Path,
+    heatmaps: dict[str, str] | None = None,
+) -> list[PlotJob]:
+    """One heatmap job per robustness metric column."""
+    return [
+        PlotJob(
+            plots.render_robustness_heatmap,
+            plots.robustness_heatmap_summary(table, col),
+            out_dir / name,
+            {"title": col},
+        )
+        for col, name in (heatmaps or ROBUSTNESS_HEATMAPS).items()
+    ]
+
+
+def _load_manifest(path: Path) -> dict[str, str]:
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _init_worker() -> None:
+    import matplotlib.pyplot as plt
+
+    plt.switch_backend("Agg")
+
+
+def _render(job: PlotJob) -> None:
+    job.render(job.summary, job.out_path, **job.kwargs)
+
+
+def render_plot_jobs(jobs: list[PlotJob], manifest_path: Path, max_workers: int | None = None) -> list[Path]:
+    """Render jobs whose summary changed since the last run; returns the paths drawn.
+
+    ``max_workers`` defaults to the CPU count; with one worker (or one stale
+    figure) rendering happens in this process, still on Agg. The manifest maps each
+    output path (relative to the manifest's directory when possible) to the
+    digest it was rendered from.
+    """
+    manifest = _load_manifest(manifest_path)
+    base = manifest_path.parent
+
+    def key(p: Path) -> str:
+        try:
+            return str(p.resolve().relative_to(base.resolve()))
+        except ValueError:
+            return str(p.resolve())
+
+    stale = []
+    for job in jobs:
+        digest = job.digest()
+        k = key(job.out_path)
+        if manifest.get(k) != digest or not job.out_path.exists():
+            stale.append((job, k, digest))
+
+    workers = min(max_workers or os.cpu_count() or 1, len(stale))
+    if workers <= 1:
+        import matplotlib.pyplot as plt
+
+        previous = plt.get_backend()
+        _init_worker()
+        try:
+            for job, _, _ in stale:
+                _render(job)
+        finally:
+            plt.switch_backend(previous)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            list(pool.map(_render, [job for job, _, _ in stale]))
+
+    for _, k, digest in stale:
+        manifest[k] = digest
+    if stale:
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return [job.out_path for job, _, _ in stale]
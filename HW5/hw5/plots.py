@@ -6,83 +6,107 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+from .metrics import weekly_pooled_rmse
 
-def plot_rolling_rmse(results: pd.DataFrame, out_path: Path, window: int = 12) -> None:
-    weekly = results.groupby("date")[["q_boxcar", "q_ew"]].apply(
-        lambda g: pd.Series(
-            {
-                "boxcar": float(np.sqrt(np.nanmean(np.square(g["q_boxcar"])))),
-                "ew": float(np.sqrt(np.nanmean(np.square(g["q_ew"])))),
-            }
-        )
-    )
-    roll = weekly.rolling(window).mean()
-    plt.figure(figsize=(11, 5))
+
+def _save(fig, out_path: Path) -> None:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    fig.tight_layout()
+    fig.savefig(out_path, dpi=150)
+    plt.close(fig)
+
+
+# Each figure is split into a summary (small, plot-ready data derived from the
+# panel) and a render step that only draws it; hw5.plot_jobs hashes the
+# summaries and renders in worker processes.
+
+
+def rolling_rmse_summary(results: pd.DataFrame, window: int = 12, weekly: pd.DataFrame | None = None) -> pd.DataFrame:
+    weekly = weekly_pooled_rmse(results) if weekly is None else weekly
+    return weekly.rename(columns={"rmse_boxcar": "boxcar", "rmse_ew": "ew"}).rolling(window).mean()
+
+
+def render_rolling_rmse(roll: pd.DataFrame, out_path: Path, window: int = 12) -> None:
+    fig = plt.figure(figsize=(11, 5))
     plt.plot(roll.index, roll["boxcar"], label="Boxcar")
     plt.plot(roll.index, roll["ew"], label="EWLS")
     plt.title(f"Rolling pooled RMSE ({window}-week mean)")
     plt.legend()
-    plt.tight_layout()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(out_path, dpi=150)
-    plt.close()
-
-
-def plot_error_gap(results: pd.DataFrame, out_path: Path) -> None:
-    weekly = results.groupby("date")[["q_boxcar", "q_ew"]].apply(
-        lambda g: pd.Series(
-            {
-                "rmse_boxcar": float(np.sqrt(np.nanmean(np.square(g["q_boxcar"])))),
-                "rmse_ew": float(np.sqrt(np.nanmean(np.square(g["q_ew"])))),
-            }
-        )
-    )
-    weekly["gap"] = weekly["rmse_ew"] - weekly["rmse_boxcar"]
-    plt.figure(figsize=(11, 4))
-    plt.plot(weekly.index, weekly["gap"], label="EW - Boxcar")
+    _save(fig, out_path)
+
+
+def plot_rolling_rmse(
+    results: pd.DataFrame,
+    out_path: Path,
+    window: int = 12,
+    weekly: pd.DataFrame | None = None,
+) -> None:
+    render_rolling_rmse(rolling_rmse_summary(results, window, weekly), out_path, window)
+
+
+def error_gap_summary(results: pd.DataFrame, weekly: pd.DataFrame | None = None) -> pd.Series:
+    weekly = weekly_pooled_rmse(results) if weekly is None else weekly
+    return (weekly["rmse_ew"] - weekly["rmse_boxcar"]).rename("gap")
+
+
+def render_error_gap(gap: pd.Series, out_path: Path) -> None:
+    fig = plt.figure(figsize=(11, 4))
+    plt.plot(gap.index, gap, label="EW - Boxcar")
     plt.axhline(0.0, color="black", lw=1)
     plt.title("Weekly pooled RMSE gap")
-    plt.tight_layout()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(out_path, dpi=150)
-    plt.close()
+    _save(fig, out_path)
 
 
-def plot_tail_comparison(results: pd.DataFrame, out_path: Path) -> None:
+def plot_error_gap(results: pd.DataFrame, out_path: Path, weekly: pd.DataFrame | None = None) -> None:
+    render_error_gap(error_gap_summary(results, weekly), out_path)
+
+
+def tail_summary(results: pd.DataFrame) -> pd.DataFrame | None:
+    """Error quantiles of both models at 1%..99%; ``None`` if either has no errors."""
     e1 = results["q_boxcar"].dropna().to_numpy()
     e2 = results["q_ew"].dropna().to_numpy()
     if e1.size == 0 or e2.size == 0:
-        return
+        return None
     qs = np.linspace(0.01, 0.99, 99)
-    q1 = np.quantile(e1, qs)
-    q2 = np.quantile(e2, qs)
-    plt.figure(figsize=(6, 6))
+    return pd.DataFrame({"boxcar": np.quantile(e1, qs), "ew": np.quantile(e2, qs)}, index=qs)
+
+
+def render_tail_comparison(quantiles: pd.DataFrame, out_path: Path) -> None:
+    q1, q2 = quantiles["boxcar"].to_numpy(), quantiles["ew"].to_numpy()
+    fig = plt.figure(figsize=(6, 6))
     plt.plot(q1, q2, lw=1.5)
     lim = [min(q1.min(), q2.min()), max(q1.max(), q2.max())]
     plt.plot(lim, lim, "k--", lw=1)
     plt.xlabel("Boxcar error quantiles")
     plt.ylabel("EWLS error quantiles")
     plt.title("Tail comparison: error quantile-quantile")
-    plt.tight_layout()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(out_path, dpi=150)
-    plt.close()
+    _save(fig, out_path)
 
 
-def plot_robustness_heatmap(table: pd.DataFrame, value_col: str, out_path: Path) -> None:
-    piv = table.pivot(index="window", columns="half_life", values=value_col).sort_index().sort_index(axis=1)
+def plot_tail_comparison(results: pd.DataFrame, out_path: Path) -> None:
+    quantiles = tail_summary(results)
+    if quantiles is not None:
+        render_tail_comparison(quantiles, out_path)
+
+
+def robustness_heatmap_summary(table: pd.DataFrame, value_col: str) -> pd.DataFrame:
+    return table.pivot(index="window", columns="half_life", values=value_col).sort_index().sort_index(axis=1)
+
+
+def render_robustness_heatmap(piv: pd.DataFrame, out_path: Path, title: str) -> None:
     fig, ax = plt.subplots(figsize=(7, 4))
     im = ax.imshow(piv.values, aspect="auto", cmap="coolwarm")
     ax.set_xticks(range(piv.shape[1]), labels=[str(c) for c in piv.columns])
     ax.set_yticks(range(piv.shape[0]), labels=[str(r) for r in piv.index])
     ax.set_xlabel("Half-life")
     ax.set_ylabel("Window")
-    ax.set_title(value_col)
+    ax.set_title(title)
     for i in range(piv.shape[0]):
         for j in range(piv.shape[1]):
             ax.text(j, i, f"{piv.values[i,j]:.4f}", ha="center", va="center", fontsize=8)
     fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    fig.tight_layout()
-    fig.savefig(out_path, dpi=150)
-    plt.close(fig)
+    _save(fig, out_path)
+
+
+def plot_robustness_heatmap(table: pd.DataFrame, value_col: str, out_path: Path) -> None:
+    render_robustness_heatmap(robustness_heatmap_summary(table, value_col), out_path, value_col)
@@ -1,12 +1,147 @@
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 from .config import Config
 from .metrics import pooled_metrics
-from .pipeline import compute_panel
+from .pipeline import _lag, compute_hedge_stage
+from .rolling import rolling_slope_no_intercept_ew_multi_array
+
+EXECUTORS = ("serial", "threads", "processes")
+
+# Per-process view of the shared stage-1 arrays (populated by _init_worker).
+_WORKER: dict[str, object] = {}
+
+
+def _ticker_rmse_delta(pred: dict[str, np.ndarray], tickers: list[str]) -> pd.Series:
+    def rmse(q: np.ndarray) -> np.ndarray:
+        ok = np.isfinite(q)
+        n = ok.sum(axis=0)
+        sse = np.where(ok, q * q, 0.0).sum(axis=0)
+        return np.sqrt(np.divide(sse, n, out=np.full(n.shape, np.nan), where=n > 0))
+
+    return pd.Series(rmse(pred["q_ew"]) - rmse(pred["q_boxcar"]), index=tickers)
+
+
+def _metrics_from_pred(rho: np.ndarray, pred: dict[str, np.ndarray], tickers: list[str]) -> dict[str, object]:
+    """Pooled EW metrics and per-ticker RMSE delta for one (window, half_life) cell."""
+    long = pd.DataFrame({"rho": rho.T.reshape(-1), **{k: v.T.reshape(-1) for k, v in pred.items()}})
+    pool = pooled_metrics(long)
+    ew_row = pool.loc[pool["model"] == "ew"].iloc[0]
+    return {
+        "ew_rmse": float(ew_row["rmse"]),
+        "ew_oos_r2": float(ew_row["oos_r2"]),
+        "ticker_delta": _ticker_rmse_delta(pred, tickers),
+    }
+
+
+def _cells_metrics(
+    rho: np.ndarray,
+    c: np.ndarray,
+    tickers: list[str],
+    cells: list[tuple[int, float]],
+) -> list[dict[str, object]]:
+    """Metrics for a batch of cells.
+
+    The boxcar slope of every window (an infinite half-life) and the EW slope
+    of every cell come out of a single ``rolling_slope_no_intercept_ew_multi_array``
+    call instead of one rolling fit per cell.
+    """
+    windows = sorted({window for window, _ in cells})
+    specs = [(window, np.inf) for window in windows] + list(cells)
+    c_lag = _lag(c)
+    mu = rolling_slope_no_intercept_ew_multi_array(rho, c_lag, [w for w, _ in specs], [h for _, h in specs])
+    pred = _lag(mu) * c_lag[..., None]
+    q = rho[..., None] - pred
+
+    out = []
+    for i, (window, _) in enumerate(cells):
+        box, ew = windows.index(window), len(windows) + i
+        cell_pred = {
+            "pred_boxcar": pred[..., box],
+            "pred_ew": pred[..., ew],
+            "q_boxcar": q[..., box],
+            "q_ew": q[..., ew],
+        }
+        out.append(_metrics_from_pred(rho, cell_pred, tickers))
+    return out
+
+
+def _share_arrays(arrays: dict[str, np.ndarray]) -> tuple[list[shared_memory.SharedMemory], dict[str, tuple]]:
+    blocks: list[shared_memory.SharedMemory] = []
+    spec: dict[str, tuple] = {}
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a, dtype=float)
+        shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+        np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)[...] = a
+        blocks.append(shm)
+        spec[name] = (shm.name, a.shape, a.dtype.str)
+    return blocks, spec
+
+
+def _init_worker(spec: dict[str, tuple], tickers: list[str]) -> None:
+    blocks = []
+    for name, (shm_name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)
+        _WORKER[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    _WORKER["tickers"] = tickers
+    _WORKER["_blocks"] = blocks  # keep mappings alive for the worker's lifetime
+
+
+def _worker_cells(cells: list[tuple[int, float]]) -> list[dict[str, object]]:
+    return _cells_metrics(_WORKER["rho"], _WORKER["c"], _WORKER["tickers"], cells)
+
+
+def _cell_batches(cells: list[tuple[int, float]], max_cells: int) -> list[list[tuple[int, float]]]:
+    """Cells grouped by window, at most ``max_cells`` per batch, in first-seen window order."""
+    by_window: dict[int, list[tuple[int, float]]] = {}
+    for cell in cells:
+        by_window.setdefault(cell[0], []).append(cell)
+    step = max(1, max_cells)
+    return [group[i : i + step] for group in by_window.values() for i in range(0, len(group), step)]
+
+
+def _map_cells(
+    cells: list[tuple[int, float]],
+    rho: np.ndarray,
+    c: np.ndarray,
+    tickers: list[str],
+    executor: str,
+    max_workers: int | None,
+    batch_cells: int = 4,
+) -> list[dict[str, object]]:
+    # Batches share one window and hold at most batch_cells cells, so the
+    # (T, N, cells) slope / prediction arrays stay the same size however large
+    # the grid; results are flattened back into cell order.
+    batches = _cell_batches(cells, batch_cells)
+    if executor == "serial":
+        results = [_cells_metrics(rho, c, tickers, batch) for batch in batches]
+    elif executor == "threads":
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(lambda batch: _cells_metrics(rho, c, tickers, batch), batches))
+    else:
+        blocks, spec = _share_arrays({"rho": rho, "c": c})
+        try:
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(spec, tickers),
+            ) as pool:
+                results = list(pool.map(_worker_cells, batches))
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+    by_cell = {}
+    for batch, metrics in zip(batches, results):
+        by_cell.update(zip(batch, metrics))
+    return [by_cell[cell] for cell in cells]
 
 
 def run_robustness(
@@ -15,57 +150,56 @@ def run_robustness(
     eq_ret: pd.DataFrame,
     market_ret: pd.Series,
     out_dir: Path,
+    executor: str | None = None,
+    max_workers: int | None = None,
 ) -> pd.DataFrame:
+    """Sweep the EW predictive window / half-life grid against the baseline.
+
+    ``executor`` is one of ``"serial"``, ``"threads"`` or ``"processes"``
+    (defaults come from ``config``). Process workers read the stage-1 ``rho``
+    and ``c`` matrices from shared memory instead of receiving a pickled copy
+    per task. Cells are evaluated in batches of at most
+    ``config.robustness_batch_cells`` cells of one window, so peak memory does
+    not grow with the grid. Row order is the same for every executor.
+    """
+    executor = executor or config.robustness_executor
+    max_workers = max_workers if max_workers is not None else config.robustness_workers
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor {executor!r}; expected one of {EXECUTORS}")
+
     out_dir.mkdir(parents=True, exist_ok=True)
-    baseline = compute_panel(
-        cds_ret=cds_ret,
-        eq_ret=eq_ret,
-        market_ret=market_ret,
-        boxcar_window=config.boxcar_window,
-        ew_window=config.ew_window,
-        ew_half_life=config.ew_half_life,
+    # Stage-1 hedge outputs only depend on boxcar_window, which the sweep holds
+    # fixed; only the predictive slopes are re-estimated, batched across cells.
+    stage = compute_hedge_stage(cds_ret, eq_ret, market_ret, boxcar_window=config.boxcar_window)
+
+    cells = [(config.ew_window, config.ew_half_life)]
+    for window in config.robustness_windows:
+        cells.append((window, config.ew_half_life))
+        cells.extend((window, half_life) for half_life in config.robustness_half_lives)
+    cells = list(dict.fromkeys(cells))
+    metrics = _map_cells(
+        cells, stage.rho, stage.c, stage.tickers, executor, max_workers, config.robustness_batch_cells
     )
-    baseline_pool = pooled_metrics(baseline)
-    base_ew_rmse = float(baseline_pool.loc[baseline_pool["model"] == "ew", "rmse"].iloc[0])
-    base_ew_r2 = float(baseline_pool.loc[baseline_pool["model"] == "ew", "oos_r2"].iloc[0])
+    results = dict(zip(cells, metrics))
+
+    baseline = results[(config.ew_window, config.ew_half_life)]
+    base_ew_rmse = baseline["ew_rmse"]
+    base_ew_r2 = baseline["ew_oos_r2"]
 
     rows = []
     for window in config.robustness_windows:
-        base_panel_w = compute_panel(
-            cds_ret=cds_ret,
-            eq_ret=eq_ret,
-            market_ret=market_ret,
-            boxcar_window=config.boxcar_window,
-            ew_window=window,
-            ew_half_life=config.ew_half_life,
-        )
-        base_ticker_delta = (
-            base_panel_w.groupby("ticker")[["q_ew", "q_boxcar"]].apply(lambda g: (g["q_ew"].pow(2).mean() ** 0.5) - (g["q_boxcar"].pow(2).mean() ** 0.5))
-        )
-
+        base_ticker_delta = results[(window, config.ew_half_life)]["ticker_delta"]
         for half_life in config.robustness_half_lives:
-            panel = compute_panel(
-                cds_ret=cds_ret,
-                eq_ret=eq_ret,
-                market_ret=market_ret,
-                boxcar_window=config.boxcar_window,
-                ew_window=window,
-                ew_half_life=half_life,
-            )
-            pool = pooled_metrics(panel)
-            ew_row = pool.loc[pool["model"] == "ew"].iloc[0]
-            ticker_delta = (
-                panel.groupby("ticker")[["q_ew", "q_boxcar"]].apply(lambda g: (g["q_ew"].pow(2).mean() ** 0.5) - (g["q_boxcar"].pow(2).mean() ** 0.5))
-            )
-            stab = ticker_delta.rank().corr(base_ticker_delta.rank(), method="spearman")
+            cell = results[(window, half_life)]
+            stab = cell["ticker_delta"].rank().corr(base_ticker_delta.rank(), method="spearman")
             rows.append(
                 {
                     "window": window,
                     "half_life": half_life,
-                    "ew_rmse": float(ew_row["rmse"]),
-                    "ew_oos_r2": float(ew_row["oos_r2"]),
-                    "delta_rmse_vs_baseline": float(ew_row["rmse"] - base_ew_rmse),
-                    "delta_r2_vs_baseline": float(ew_row["oos_r2"] - base_ew_r2),
+                    "ew_rmse": cell["ew_rmse"],
+                    "ew_oos_r2": cell["ew_oos_r2"],
+                    "delta_rmse_vs_baseline": cell["ew_rmse"] - base_ew_rmse,
+                    "delta_r2_vs_baseline": cell["ew_oos_r2"] - base_ew_r2,
                     "stability_rank_corr": float(stab),
                 }
             )
@@ -1,18 +1,153 @@
 from __future__ import annotations
 
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Sequence
+
 import numpy as np
 import pandas as pd
 
+from .kernels import ew_recursive_kernel, ols_window_kernel, resolve_backend, slope_window_kernel
+
+# Windows whose squared Cholesky pivot falls below this fraction of its
+# diagonal are re-solved with lstsq. The smallest such ratio is the squared
+# ratio of smallest to largest pivot of the unit-diagonal X'X, so its inverse
+# estimates that matrix's condition number; the normal equations lose about
+# log10 of it in digits, and capping it at 1e3 keeps the recursive engine
+# within 1e-10 of the lstsq reference even for highly collinear regressors.
+_CHOL_RTOL = 1e-3
+
+
+def _cholesky_solve(A: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Solve stacked SPD systems ``A @ beta = b`` over leading axes.
+
+    Returns the solutions and a mask of systems whose factorization was well
+    conditioned (estimated condition number of the scaled system below
+    ``1 / _CHOL_RTOL``); entries outside the mask are left as NaN.
+    """
+    p = A.shape[-1]
+    L = np.zeros_like(A)
+    ok = np.ones(A.shape[:-2], dtype=bool)
+    for j in range(p):
+        d = A[..., j, j] - np.sum(L[..., j, :j] ** 2, axis=-1)
+        ok &= d > _CHOL_RTOL * A[..., j, j]
+        ljj = np.sqrt(np.where(ok, d, 1.0))
+        L[..., j, j] = ljj
+        for i in range(j + 1, p):
+            L[..., i, j] = (A[..., i, j] - np.sum(L[..., i, :j] * L[..., j, :j], axis=-1)) / ljj
+
+    z = np.zeros_like(b)
+    for j in range(p):
+        z[..., j] = (b[..., j] - np.sum(L[..., j, :j] * z[..., :j], axis=-1)) / L[..., j, j]
+    beta = np.zeros_like(b)
+    for j in reversed(range(p)):
+        beta[..., j] = (z[..., j] - np.sum(L[..., j + 1 :, j] * beta[..., j + 1 :], axis=-1)) / L[..., j, j]
+    beta[~ok] = np.nan
+    return beta, ok
+
+
+def _trailing_window_sum(a: np.ndarray, window: int) -> np.ndarray:
+    """Sum of rows ``i - window .. i - 1`` for every row ``i`` (axis 0).
+
+    Equivalent to adding the newest row and dropping the oldest at each step;
+    rows ``i < window`` are zero. The series is cut into blocks of ``window``
+    rows and every window is a suffix sum of one block plus a prefix sum of
+    the next, so each sum only carries rounding from the rows it spans (a
+    difference of one global cumsum would keep the error of every large
+    value seen earlier).
+    """
+    T = a.shape[0]
+    out = np.zeros((T,) + a.shape[1:], dtype=float)
+    if T <= window:
+        return out
+    n_blocks = -(-T // window)
+    blocks = np.zeros((n_blocks * window,) + a.shape[1:], dtype=float)
+    blocks[:T] = a
+    blocks = blocks.reshape((n_blocks, window) + a.shape[1:])
+    prefix = np.cumsum(blocks, axis=1).reshape((-1,) + a.shape[1:])
+    suffix = np.cumsum(blocks[:, ::-1], axis=1)[:, ::-1].reshape((-1,) + a.shape[1:])
+
+    start = np.arange(T - window)  # first row of the window ending before row start + window
+    tail = start + window - 1  # last row, in the block after start's (or the same block when aligned)
+    out[window:] = suffix[start]
+    split = start % window != 0
+    out[window:][split] += prefix[tail[split]]
+    return out
+
+
+def rolling_ols_no_intercept_array(yv: np.ndarray, xv: np.ndarray, window: int) -> np.ndarray:
+    """Recursive rolling no-intercept OLS on raw arrays.
+
+    ``yv`` has shape ``(T, ...)`` and ``xv`` shape ``(T, ..., p)``; any trailing
+    batch axes (e.g. tickers) are solved together. Row ``i`` uses rows
+    ``i - window .. i - 1``; rows with a non-finite value are left out of the
+    running ``X'X`` / ``X'y`` sums.
+    """
+    yv = np.asarray(yv, dtype=float)
+    xv = np.asarray(xv, dtype=float)
+    T, p = xv.shape[0], xv.shape[-1]
+    out = np.full(xv.shape, np.nan, dtype=float)
+    if T <= window:
+        return out
+
+    valid = np.isfinite(yv) & np.isfinite(xv).all(axis=-1)
+    x0 = np.where(valid[..., None], xv, 0.0)
+    y0 = np.where(valid, yv, 0.0)
 
-def rolling_ols_no_intercept(y: pd.Series, X: pd.DataFrame, window: int) -> pd.DataFrame:
+    n = _trailing_window_sum(valid.astype(float), window)[window:]
+    xtx = _trailing_window_sum(x0[..., :, None] * x0[..., None, :], window)[window:]
+    xty = _trailing_window_sum(x0 * y0[..., None], window)[window:]
+
+    beta, ok = _cholesky_solve(xtx, xty)
+    enough = n > p
+    out[window:] = np.where(enough[..., None], beta, np.nan)
+
+    # Rank-deficient or near-collinear windows: defer to lstsq on the raw rows.
+    for pos in zip(*np.nonzero(enough & ~ok)):
+        i = pos[0] + window
+        rest = tuple(pos[1:])
+        yw = yv[(slice(i - window, i),) + rest]
+        xw = xv[(slice(i - window, i),) + rest]
+        mask = valid[(slice(i - window, i),) + rest]
+        out[(i,) + rest], *_ = np.linalg.lstsq(xw[mask], yw[mask], rcond=None)
+    return out
+
+
+def rolling_ols_no_intercept(
+    y: pd.Series,
+    X: pd.DataFrame,
+    window: int,
+    engine: str = "recursive",
+    backend: str | None = None,
+) -> pd.DataFrame:
+    """Rolling no-intercept OLS of ``y`` on ``X`` using the prior ``window`` rows.
+
+    ``engine="recursive"`` keeps running ``X'X`` / ``X'y`` sums with a Cholesky
+    solve per step; ``engine="lstsq"`` re-fits every window from scratch and is
+    kept as the reference implementation. The per-window loop of the latter
+    runs as a compiled kernel when ``backend`` resolves to numba (see
+    ``hw5.kernels.resolve_backend``).
+    """
     y = y.astype(float)
     X = X.astype(float)
     idx = y.index
     cols = list(X.columns)
-    out = pd.DataFrame(np.nan, index=idx, columns=cols, dtype=float)
 
-    yv = y.to_numpy()
-    xv = X.to_numpy()
+    if engine == "recursive":
+        beta = rolling_ols_no_intercept_array(y.to_numpy(), X.to_numpy(), window)
+        return pd.DataFrame(beta, index=idx, columns=cols, dtype=float)
+    if engine != "lstsq":
+        raise ValueError(f"Unknown rolling OLS engine: {engine!r}")
+
+    yv = np.ascontiguousarray(y.to_numpy())
+    xv = np.ascontiguousarray(X.to_numpy())
+    if resolve_backend(backend) == "numba":
+        beta = np.full(xv.shape, np.nan)
+        ols_window_kernel(yv, xv, window, beta, _CHOL_RTOL)
+        return pd.DataFrame(beta, index=idx, columns=cols, dtype=float)
+
+    out = pd.DataFrame(np.nan, index=idx, columns=cols, dtype=float)
     p = xv.shape[1]
 
     for i in range(window, len(idx)):
@@ -33,9 +168,126 @@ def ew_weights(window: int, half_life: float) -> np.ndarray:
     return w / w.sum()
 
 
-def rolling_slope_no_intercept_boxcar(y: pd.Series, x: pd.Series, window: int) -> pd.Series:
+def rolling_slope_no_intercept_array(
+    yv: np.ndarray,
+    xv: np.ndarray,
+    window: int,
+    weights: np.ndarray | None = None,
+) -> np.ndarray:
+    """Rolling no-intercept slope of ``yv`` on ``xv`` over axis 0.
+
+    Arrays may carry trailing batch axes (e.g. ``(T, N)`` for a ticker panel).
+    ``weights`` (oldest first, length ``window``) defaults to a boxcar; weights
+    need not be normalized because the normalization cancels in the ratio.
+    Windows with fewer than 3 finite pairs or a non-positive denominator are NaN.
+    """
+    yv = np.asarray(yv, dtype=float)
+    xv = np.asarray(xv, dtype=float)
+    out = np.full(yv.shape, np.nan, dtype=float)
+    if yv.shape[0] <= window:
+        return out
+    w = np.ones(window) if weights is None else np.asarray(weights, dtype=float)
+
+    valid = np.isfinite(yv) & np.isfinite(xv)
+    x0 = np.where(valid, xv, 0.0)
+    y0 = np.where(valid, yv, 0.0)
+
+    def wsum(a: np.ndarray) -> np.ndarray:
+        # windows ending at rows window-1 .. T-2 feed outputs window .. T-1
+        view = np.lib.stride_tricks.sliding_window_view(a, window, axis=0)[:-1]
+        return view @ w
+
+    n = np.lib.stride_tricks.sliding_window_view(valid, window, axis=0)[:-1].sum(axis=-1)
+    den = wsum(x0 * x0)
+    num = wsum(x0 * y0)
+    ok = (n >= 3) & (den > 0)
+    out[window:] = np.where(ok, num / np.where(ok, den, 1.0), np.nan)
+    return out
+
+
+def ew_weight_matrix(windows: Sequence[int], half_lives: Sequence[float]) -> np.ndarray:
+    """``(H, max(windows))`` stack of ``ew_weights``, zero-padded on the oldest side.
+
+    ``half_life=np.inf`` gives boxcar weights.
+    """
+    wmax = max(windows)
+    out = np.zeros((len(half_lives), wmax))
+    for h, (window, half_life) in enumerate(zip(windows, half_lives)):
+        out[h, wmax - window :] = ew_weights(window, half_life)
+    return out
+
+
+def rolling_slope_no_intercept_ew_multi_array(
+    yv: np.ndarray,
+    xv: np.ndarray,
+    windows: int | Sequence[int],
+    half_lives: Sequence[float],
+) -> np.ndarray:
+    """``rolling_slope_no_intercept_array`` for several (window, half_life) cells at once.
+
+    ``windows`` is a single window or one per half-life. Returns ``(T, ..., H)``:
+    the weighted sums for every cell come from one matmul of the strided
+    ``max(windows)`` view against the stacked ``ew_weight_matrix``, and each
+    cell keeps its own minimum-observation rule and warm-up rows.
+    """
+    yv = np.asarray(yv, dtype=float)
+    xv = np.asarray(xv, dtype=float)
+    half_lives = list(half_lives)
+    windows = [int(windows)] * len(half_lives) if np.isscalar(windows) else [int(w) for w in windows]
+    if len(windows) != len(half_lives):
+        raise ValueError("windows and half_lives must have the same length")
+    T = yv.shape[0]
+    out = np.full(yv.shape + (len(half_lives),), np.nan, dtype=float)
+    if not half_lives or T == 0:
+        return out
+    W = ew_weight_matrix(windows, half_lives)
+    wmax = W.shape[1]
+    counts = (W > 0).astype(float)  # window membership, for the n >= 3 rule
+
+    valid = np.isfinite(yv) & np.isfinite(xv)
+    x0 = np.where(valid, xv, 0.0)
+    y0 = np.where(valid, yv, 0.0)
+    pad = np.zeros((wmax,) + yv.shape[1:])
+
+    def wsum(a: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        # view[t] covers rows t - wmax .. t - 1, i.e. the window feeding output t
+        view = np.lib.stride_tricks.sliding_window_view(np.concatenate([pad, a]), wmax, axis=0)[:T]
+        return view @ weights.T
+
+    n = wsum(valid.astype(float), counts)
+    den = wsum(x0 * x0, W)
+    num = wsum(x0 * y0, W)
+    warm = np.arange(T)[:, None] >= np.asarray(windows)[None, :]
+    ok = (n >= 3) & (den > 0) & warm.reshape((T,) + (1,) * (yv.ndim - 1) + (len(windows),))
+    out[...] = np.where(ok, num / np.where(ok, den, 1.0), np.nan)
+    return out
+
+
+def rolling_slope_no_intercept_ew_multi(
+    y: pd.Series,
+    x: pd.Series,
+    windows: int | Sequence[int],
+    half_lives: Sequence[float],
+) -> pd.DataFrame:
+    """EW slopes for several half-lives (and windows) as columns (window, half_life)."""
+    half_lives = list(half_lives)
+    windows = [int(windows)] * len(half_lives) if np.isscalar(windows) else list(windows)
+    out = rolling_slope_no_intercept_ew_multi_array(y.to_numpy(dtype=float), x.to_numpy(dtype=float), windows, half_lives)
+    columns = pd.MultiIndex.from_arrays([windows, half_lives], names=["window", "half_life"])
+    return pd.DataFrame(out, index=y.index, columns=columns)
+
+
+def rolling_slope_no_intercept_boxcar(
+    y: pd.Series,
+    x: pd.Series,
+    window: int,
+    backend: str | None = None,
+) -> pd.Series:
     yv, xv = y.to_numpy(dtype=float), x.to_numpy(dtype=float)
     out = np.full_like(yv, np.nan, dtype=float)
+    if resolve_backend(backend) == "numba":
+        slope_window_kernel(yv, xv, np.ones(window), out)
+        return pd.Series(out, index=y.index, name="mu_boxcar")
     for i in range(window, len(yv)):
         yw = yv[i - window : i]
         xw = xv[i - window : i]
@@ -49,10 +301,19 @@ def rolling_slope_no_intercept_boxcar(y: pd.Series, x: pd.Series, window: int) -
     return pd.Series(out, index=y.index, name="mu_boxcar")
 
 
-def rolling_slope_no_intercept_ew(y: pd.Series, x: pd.Series, window: int, half_life: float) -> pd.Series:
+def rolling_slope_no_intercept_ew(
+    y: pd.Series,
+    x: pd.Series,
+    window: int,
+    half_life: float,
+    backend: str | None = None,
+) -> pd.Series:
     w_full = ew_weights(window, half_life)
     yv, xv = y.to_numpy(dtype=float), x.to_numpy(dtype=float)
     out = np.full_like(yv, np.nan, dtype=float)
+    if resolve_backend(backend) == "numba":
+        slope_window_kernel(yv, xv, w_full, out)
+        return pd.Series(out, index=y.index, name="mu_ew")
     for i in range(window, len(yv)):
         yw = yv[i - window : i]
         xw = xv[i - window : i]
@@ -66,3 +327,79 @@ def rolling_slope_no_intercept_ew(y: pd.Series, x: pd.Series, window: int, half_
             continue
         out[i] = np.dot(w * xw[mask], yw[mask]) / den
     return pd.Series(out, index=y.index, name="mu_ew")
+
+
+@dataclass
+class EWSlopeStream:
+    """Streaming exponentially weighted no-intercept slope.
+
+    Keeps the weighted sums ``Σ w x²`` and ``Σ w x y`` and updates them in O(1)
+    per observation: decay by ``λ``, add the new term and, with a finite
+    ``window``, subtract the term leaving the window scaled by ``λ**window``.
+    ``window=None`` gives the infinite-window (pure discounted) EWLS estimate.
+    Non-finite pairs contribute nothing, matching the NaN-masked windowed fit.
+    """
+
+    half_life: float
+    window: int | None = None
+    sxx: float = 0.0
+    sxy: float = 0.0
+    n_obs: int = 0
+    n_seen: int = 0
+    _buf: deque = field(default_factory=deque, repr=False)
+
+    def __post_init__(self) -> None:
+        self.lam = 0.5 ** (1.0 / self.half_life)
+        self.lam_out = self.lam**self.window if self.window is not None else 0.0
+
+    def update(self, y: float, x: float) -> None:
+        valid = math.isfinite(y) and math.isfinite(x)
+        xx, xy = (x * x, x * y) if valid else (0.0, 0.0)
+        self.sxx = self.lam * self.sxx + xx
+        self.sxy = self.lam * self.sxy + xy
+        self.n_obs += valid
+        self.n_seen += 1
+        if self.window is not None:
+            self._buf.append((xx, xy, valid))
+            if len(self._buf) > self.window:
+                old_xx, old_xy, old_valid = self._buf.popleft()
+                self.sxx -= self.lam_out * old_xx
+                self.sxy -= self.lam_out * old_xy
+                self.n_obs -= old_valid
+            if self.n_obs == 0:
+                # drop rounding residue once the window holds no observations
+                self.sxx = self.sxy = 0.0
+
+    @property
+    def slope(self) -> float:
+        if self.window is not None and self.n_seen < self.window:
+            return math.nan
+        if self.n_obs < 3 or self.sxx <= 0:
+            return math.nan
+        return self.sxy / self.sxx
+
+
+def rolling_slope_no_intercept_ew_recursive(
+    y: pd.Series,
+    x: pd.Series,
+    half_life: float,
+    window: int | None = None,
+    backend: str | None = None,
+) -> pd.Series:
+    """Recursive counterpart of ``rolling_slope_no_intercept_ew``.
+
+    With an integer ``window`` the result matches the windowed estimator; with
+    ``window=None`` every prior observation is used with weight ``λ**age``.
+    """
+    yv, xv = y.to_numpy(dtype=float), x.to_numpy(dtype=float)
+    if resolve_backend(backend) == "numba":
+        out = np.full_like(yv, np.nan, dtype=float)
+        ew_recursive_kernel(yv, xv, 0.5 ** (1.0 / half_life), window or 0, out)
+        return pd.Series(out, index=y.index, name="mu_ew")
+
+    stream = EWSlopeStream(half_life=half_life, window=window)
+    out = np.empty_like(yv, dtype=float)
+    for i in range(len(yv)):
+        out[i] = stream.slope
+        stream.update(yv[i], xv[i])
+    return pd.Series(out, index=y.index, name="mu_ew")
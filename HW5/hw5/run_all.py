@@ -2,45 +2,118 @@ from __future__ import annotations
 
 from pathlib import Path
 
+from .cache import open_cache
 from .config import default_config
-from .metrics import event_windows, metrics_by_ticker, pooled_metrics
-from .pipeline import run_pipeline
-from .plots import plot_error_gap, plot_robustness_heatmap, plot_rolling_rmse, plot_tail_comparison
+from .incremental import STATE_DIRNAME, save_state, state_from_result
+from .instrument import make_timer
+from .metrics import event_windows, metrics_by_ticker, pooled_metrics, weekly_pooled_rmse
+from .panel_store import panel_metrics_streamed, write_panel_stream
+from .pipeline import CompactPanel, iter_panel_chunks, run_pipeline
+from .plot_jobs import MANIFEST_NAME, panel_plot_jobs, render_plot_jobs, robustness_plot_jobs
 from .robustness import run_robustness
 
 
 def main() -> None:
     config = default_config()
     config.output_dir.mkdir(parents=True, exist_ok=True)
+    timer = make_timer(config.instrument)
 
-    result = run_pipeline(config)
-    panel = result.panel
-    panel.to_csv(config.output_dir / "panel_results.csv", index=False)
+    result = run_pipeline(config, build_panel=not config.stream_panel, timer=timer)
+    if config.stream_panel:
+        # Out-of-core path: the full panel never sits in memory.
+        panel_path = config.output_dir / f"panel_results.{config.panel_format}"
+        chunks = iter_panel_chunks(
+            result.cds_weekly_ret,
+            result.eq_weekly_ret,
+            result.market_weekly_ret,
+            boxcar_window=config.boxcar_window,
+            ew_window=config.ew_window,
+            ew_half_life=config.ew_half_life,
+            chunk_size=config.panel_chunk_size,
+        )
+        with timer.stage("compute_panel_stream") as rec:
+            rec.rows = write_panel_stream(chunks, panel_path, fmt=config.panel_format)
+        panel_files = [panel_path]
+        with timer.stage("metrics") as rec:
+            per_ticker, pooled, weekly, tail = panel_metrics_streamed(panel_path)
+            rec.rows = len(per_ticker)
+        panel = None  # plots and event windows use the reduced weekly / tail tables
+    else:
+        panel, tail = result.panel, None
+        panel_path = config.output_dir / "panel_results.csv"
+        panel_files = [panel_path]
+        with timer.stage("write_panel") as rec:
+            if isinstance(panel, CompactPanel):
+                # m / r_index go to panel_results_by_date.csv
+                panel_files.append(panel.write(panel_path))
+                panel = panel.panel
+            else:
+                panel.to_csv(panel_path, index=False)
+            rec.rows = len(panel)
+        with timer.stage("metrics") as rec:
+            per_ticker = metrics_by_ticker(panel)
+            pooled = pooled_metrics(panel)
+            weekly = weekly_pooled_rmse(panel)
+            rec.rows = len(per_ticker)
+    save_state(state_from_result(result, config), config.output_dir / STATE_DIRNAME)
 
-    per_ticker = metrics_by_ticker(panel)
     per_ticker.to_csv(config.output_dir / "metrics_per_ticker.csv", index=False)
-
-    pooled = pooled_metrics(panel)
     pooled.to_csv(config.output_dir / "metrics_pooled.csv", index=False)
 
-    events = event_windows(panel)
-    events.to_csv(config.output_dir / "event_windows.csv")
+    with timer.stage("event_windows") as rec:
+        events = event_windows(panel, weekly=weekly)
+        events.to_csv(config.output_dir / "event_windows.csv")
+        rec.rows = len(events)
 
-    plot_rolling_rmse(panel, config.output_dir / "rolling_rmse.png")
-    plot_error_gap(panel, config.output_dir / "error_gap.png")
-    plot_tail_comparison(panel, config.output_dir / "tail_qq.png")
+    with timer.stage("plot_summaries"):
+        panel_jobs = panel_plot_jobs(panel, config.output_dir, weekly=weekly, tail=tail)
 
     robustness_dir = config.output_dir / "robustness"
-    robust = run_robustness(
-        config=config,
-        cds_ret=result.cds_weekly_ret,
-        eq_ret=result.eq_weekly_ret,
-        market_ret=result.market_weekly_ret,
-        out_dir=robustness_dir,
-    )
-    plot_robustness_heatmap(robust, "delta_rmse_vs_baseline", robustness_dir / "delta_rmse_heatmap.png")
-    plot_robustness_heatmap(robust, "stability_rank_corr", robustness_dir / "stability_heatmap.png")
+    cache = open_cache(config)
+    robust_key = None
+    if cache is not None and result.cache_key is not None:
+        robust_key = cache.key(
+            weekly=result.cache_key,
+            boxcar_window=config.boxcar_window,
+            ew_window=config.ew_window,
+            ew_half_life=config.ew_half_life,
+            windows=config.robustness_windows,
+            half_lives=config.robustness_half_lives,
+        )
+    with timer.stage("robustness") as rec:
+        robust = None if robust_key is None else cache.get("robustness", robust_key)
+        if robust is None:
+            robust = run_robustness(
+                config=config,
+                cds_ret=result.cds_weekly_ret,
+                eq_ret=result.eq_weekly_ret,
+                market_ret=result.market_weekly_ret,
+                out_dir=robustness_dir,
+            )
+            if robust_key is not None:
+                cache.put("robustness", robust_key, robust)
+        else:
+            robustness_dir.mkdir(parents=True, exist_ok=True)
+            robust.to_csv(robustness_dir / "robustness_sweep.csv", index=False)
+        rec.rows = len(robust)
+    robust_jobs = robustness_plot_jobs(robust, robustness_dir)
+    plot_jobs = panel_jobs + robust_jobs
+    with timer.stage("plots") as rec:
+        rendered = render_plot_jobs(plot_jobs, config.output_dir / MANIFEST_NAME, max_workers=config.plot_workers)
+        rec.rows = len(rendered)
 
+    # only what this run wrote: the panel layout, figures and timings depend on config
+    outputs = [
+        *(p.name for p in panel_files),
+        "metrics_per_ticker.csv",
+        "metrics_pooled.csv",
+        "event_windows.csv",
+        *(job.out_path.name for job in panel_jobs),
+        "robustness/robustness_sweep.csv",
+        *(job.out_path.relative_to(config.output_dir).as_posix() for job in robust_jobs),
+    ]
+    if config.instrument:
+        outputs.append("timings.json (per-stage wall/CPU time, peak RSS delta, rows)")
     report = Path(config.output_dir / "summary.md")
     report.write_text(
         "\n".join(
@@ -48,22 +121,14 @@ def main() -> None:
                 "# HW5 Predictive Regression Summary",
                 "",
                 "## Generated outputs",
-                "- panel_results.csv",
-                "- metrics_per_ticker.csv",
-                "- metrics_pooled.csv",
-                "- event_windows.csv",
-                "- rolling_rmse.png",
-                "- error_gap.png",
-                "- tail_qq.png",
-                "- robustness/robustness_sweep.csv",
-                "- robustness/delta_rmse_heatmap.png",
-                "- robustness/stability_heatmap.png",
+                *(f"- {name}" for name in outputs),
                 "",
                 "## Interpretation scaffold",
                 "See event_windows.csv for largest model gaps, and compare pooled/tail metrics between boxcar and EW.",
             ]
         )
     )
+    timer.write_json(config.output_dir / "timings.json")
 
 
 if __name__ == "__main__":
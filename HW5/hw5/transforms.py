@@ -1,10 +1,66 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
 import pandas as pd
 
+# "D" keeps every observed row; the others match ``df.resample(anchor).last()``.
+ANCHORS = ("D", "W-WED", "W-FRI", "ME")
+
+
+def _bin_labels(idx: pd.DatetimeIndex, anchor: str) -> tuple[pd.DatetimeIndex, pd.DatetimeIndex]:
+    """Per-row bin label and the full (gap-free) label range for ``anchor``."""
+    if anchor == "D":
+        labels = idx.normalize()
+        return labels, labels.unique()
+    unit = np.datetime_data(idx.dtype)[0]
+    if anchor.startswith("W-"):
+        labels = idx.to_period(anchor).end_time.normalize()
+    elif anchor in ("ME", "M"):
+        labels = idx.to_period("M").end_time.normalize()
+    else:
+        raise ValueError(f"Unsupported anchor {anchor!r}; expected one of {ANCHORS}")
+    labels = labels.as_unit(unit)
+    return labels, pd.date_range(labels[0], labels[-1], freq=anchor, unit=unit)
+
+
+def resample_last_multi(df: pd.DataFrame, anchors: Sequence[str]) -> dict[str, pd.DataFrame]:
+    """Last valid observation per column and bin, for several anchors at once.
+
+    The daily matrix is sorted once and scanned once for the position of the
+    latest finite value in every column; each anchor then only gathers at its
+    bin ends. Equivalent to ``df.resample(anchor).last()`` per anchor.
+    """
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    values = df.to_numpy(dtype=float)
+    T = values.shape[0]
+    rows = np.arange(T)[:, None]
+    last_valid = np.maximum.accumulate(np.where(np.isfinite(values), rows, -1), axis=0) if T else rows
+
+    out: dict[str, pd.DataFrame] = {}
+    for anchor in anchors:
+        if T == 0:
+            out[anchor] = df.astype(float).iloc[:0]
+            continue
+        labels, full = _bin_labels(pd.DatetimeIndex(df.index), anchor)
+        lab = labels.to_numpy()
+        ends = np.append(np.flatnonzero(lab[1:] != lab[:-1]), T - 1)
+        starts = np.insert(ends[:-1] + 1, 0, 0)
+        src = last_valid[ends]
+        ok = src >= starts[:, None]
+        block = np.where(ok, values[np.where(ok, src, 0), np.arange(values.shape[1])], np.nan)
+        binned = pd.DataFrame(block, index=pd.DatetimeIndex(lab[ends]), columns=df.columns)
+        binned = binned.reindex(full)
+        binned.index.name = df.index.name
+        out[anchor] = binned
+    return out
+
 
 def to_weekly_wed_last(df: pd.DataFrame) -> pd.DataFrame:
-    return df.resample("W-WED").last()
+    return resample_last_multi(df, ["W-WED"])["W-WED"]
 
 
 def simple_returns(df: pd.DataFrame) -> pd.DataFrame:
@@ -24,3 +80,53 @@ def align_weekly_returns(
 ) -> tuple[pd.DataFrame, pd.DataFrame, pd.Series]:
     idx = cds_ret.index.intersection(eq_ret.index).intersection(market_ret.index)
     return cds_ret.loc[idx], eq_ret.loc[idx], market_ret.loc[idx]
+
+
+@dataclass
+class ResampledReturns:
+    """Aligned prices and returns for one anchor; return frames hold a single float64 block,
+    so ``to_numpy()`` hands the rolling kernels a view rather than a copy."""
+
+    anchor: str
+    cds_px: pd.DataFrame
+    eq_px: pd.DataFrame
+    cds_ret: pd.DataFrame
+    eq_ret: pd.DataFrame
+    market_ret: pd.Series
+    cds_last_day: pd.Timestamp | None = None  # last daily observation, to tell complete bins
+    eq_last_day: pd.Timestamp | None = None
+
+
+def _float_block(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame(df.to_numpy(dtype=float, copy=True), index=df.index, columns=df.columns)
+
+
+def resample_returns_multi(
+    cds_px: pd.DataFrame,
+    eq_px: pd.DataFrame,
+    tickers: list[str],
+    anchors: Sequence[str],
+    market: str = "SPY",
+) -> dict[str, ResampledReturns]:
+    """Resample CDS and equity prices to every anchor and build aligned returns."""
+    cds_bins = resample_last_multi(cds_px, anchors)
+    eq_bins = resample_last_multi(eq_px[tickers + [market]], anchors)
+    out = {}
+    for anchor in anchors:
+        cds_w, eq_w = cds_bins[anchor], eq_bins[anchor]
+        cds_ret, eq_ret, m_ret = align_weekly_returns(
+            simple_returns(cds_w),
+            simple_returns(eq_w[tickers]),
+            simple_returns(eq_w[[market]])[market].rename("m"),
+        )
+        out[anchor] = ResampledReturns(
+            anchor=anchor,
+            cds_px=cds_w,
+            eq_px=eq_w,
+            cds_ret=_float_block(cds_ret),
+            eq_ret=_float_block(eq_ret),
+            market_ret=m_ret.astype(float),
+            cds_last_day=cds_px.index.max(),
+            eq_last_day=eq_px.index.max(),
+        )
+    return out
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import json
+
+from hw5.benchmark import compare_benchmarks, run_benchmarks, synthetic_returns
+
+
+def test_synthetic_returns_shape_and_nan_density() -> None:
+    cds, eq, m = synthetic_returns(n_tickers=20, n_weeks=200, nan_frac=0.1, seed=1)
+    assert cds.shape == eq.shape == (200, 20)
+    assert len(m) == 200
+    assert 0.05 < cds.isna().to_numpy().mean() < 0.15
+
+
+def test_run_benchmarks_is_json_and_comparable() -> None:
+    report = run_benchmarks(n_tickers=2, n_weeks=40, repeat=1, include_robustness=False)
+    report = json.loads(json.dumps(report))
+    assert "compute_panel[batched]" in report["results"]
+    assert report["params"]["n_tickers"] == 2
+    assert report["env"]["kernel_backend"] in ("numba", "python")
+
+    slower = json.loads(json.dumps(report))
+    for r in slower["results"].values():
+        r["best_s"] *= 2.0
+    table = compare_benchmarks(report, slower, tolerance=1.5)
+    assert table["regression"].all()
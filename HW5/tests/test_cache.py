@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import os
+
+import pandas as pd
+import pytest
+
+from hw5 import cache as cache_mod
+from hw5.cache import StageCache
+
+
+def test_get_or_compute_memoizes_and_invalidates(tmp_path) -> None:
+    cache = StageCache(tmp_path / "cache")
+    calls = []
+
+    def compute() -> pd.DataFrame:
+        calls.append(1)
+        return pd.DataFrame({"a": [1.0, 2.0]})
+
+    key = cache.key(window=16, half_life=12.0)
+    first = cache.get_or_compute("panel", key, compute)
+    second = cache.get_or_compute("panel", key, compute)
+    pd.testing.assert_frame_equal(first, second)
+    assert len(calls) == 1
+
+    assert cache.invalidate("hedge") == 0
+    assert cache.invalidate("panel") == 1
+    cache.get_or_compute("panel", key, compute)
+    assert len(calls) == 2
+
+
+def test_file_digest_tracks_content(tmp_path) -> None:
+    cache = StageCache(tmp_path / "cache")
+    src = tmp_path / "input.delim"
+    src.write_text("a\tb\n1\t2\n")
+    d1 = cache.file_digest(src)
+    assert StageCache(tmp_path / "cache").file_digest(src) == d1  # memoized across instances
+
+    src.write_text("a\tb\n1\t3\n")
+    os.utime(src, ns=(1, 1))
+    assert cache.file_digest(src) != d1
+    assert cache.file_digest(tmp_path / "absent") == "missing"
+
+
+def test_lru_eviction_keeps_recent_entries(tmp_path) -> None:
+    cache = StageCache(tmp_path / "cache", max_bytes=3500)
+    blob = b"x" * 1000
+    for i, name in enumerate(["a", "b", "c"]):
+        cache.put("panel", name, blob)
+        os.utime(cache._path("panel", name), ns=(i * 10**9, i * 10**9))
+    # touching "a" makes "b" the least recently used
+    assert cache.get("panel", "a") == blob
+    cache.put("panel", "d", blob)
+    assert cache.get("panel", "b") is None
+    assert cache.get("panel", "a") == blob
+    assert cache.get("panel", "d") == blob
+
+
+@pytest.mark.parametrize(
+    "blob",
+    [b"cno_such_module_hw5\nThing\n.", b"cbuiltins\nno_such_attr_hw5\n.", b"\x80\x05\x95"],
+    ids=["missing-module", "missing-attr", "truncated"],
+)
+def test_unreadable_entry_is_a_miss(tmp_path, blob: bytes) -> None:
+    cache = StageCache(tmp_path / "cache")
+    cache._path("panel", "k").write_bytes(blob)
+    assert cache.get("panel", "k") is None
+    assert not cache._path("panel", "k").exists()
+
+
+def test_key_changes_with_stage_code(monkeypatch) -> None:
+    before = StageCache.key(window=16)
+    monkeypatch.setattr(cache_mod, "code_version", lambda: "edited")
+    assert StageCache.key(window=16) != before
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hw5.config import default_config
+from hw5.incremental import append_panel_rows, load_state, save_state, state_from_result, update_state
+from hw5.panel_store import write_panel_stream
+from hw5.pipeline import COMPACT_PANEL_COLUMNS, PANEL_COLUMNS, CompactPanel, PipelineResult, compute_panel
+from hw5.transforms import align_weekly_returns, simple_returns, to_weekly_wed_last
+
+
+def _daily_prices(n_days: int = 700) -> tuple[pd.DataFrame, pd.DataFrame]:
+    rng = np.random.default_rng(11)
+    idx = pd.bdate_range("2020-01-01", periods=n_days)
+    tickers = ["AAA", "BBB", "CCC"]
+    spy = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_days)))
+    eq = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0, 0.015, (n_days, 3)), axis=0)), index=idx, columns=tickers
+    )
+    eq["SPY"] = spy
+    cds = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, 3)), axis=0)), index=idx, columns=tickers
+    )
+    cds.iloc[rng.integers(0, n_days, 40), 1] = np.nan
+    return cds, eq
+
+
+def _full_result(cds_px: pd.DataFrame, eq_px: pd.DataFrame, config) -> PipelineResult:
+    tickers = list(cds_px.columns)
+    cds_w = to_weekly_wed_last(cds_px)
+    eq_w = to_weekly_wed_last(eq_px)
+    cds_ret, eq_ret, m_ret = align_weekly_returns(
+        simple_returns(cds_w), simple_returns(eq_w[tickers]), simple_returns(eq_w[["SPY"]])["SPY"].rename("m")
+    )
+    panel = compute_panel(cds_ret, eq_ret, m_ret, config.boxcar_window, config.ew_window, config.ew_half_life)
+    return PipelineResult(
+        panel,
+        cds_ret,
+        eq_ret,
+        m_ret,
+        cds_weekly_px=cds_w,
+        eq_weekly_px=eq_w,
+        cds_last_day=cds_px.index.max(),
+        eq_last_day=eq_px.index.max(),
+    )
+
+
+def test_incremental_update_matches_full_recompute(tmp_path: Path) -> None:
+    config = replace(default_config(tmp_path), boxcar_window=10, ew_window=8, ew_half_life=6.0)
+    cds, eq = _daily_prices()
+    cutoff = pd.Timestamp("2022-02-02")  # a Wednesday
+
+    initial = _full_result(cds.loc[:cutoff], eq.loc[:cutoff], config)
+    save_state(state_from_result(initial, config), tmp_path / "state")
+    state = load_state(tmp_path / "state")
+
+    appended = []
+    for week_end in pd.date_range(cutoff + pd.Timedelta(weeks=1), periods=4, freq="W-WED"):
+        days = slice(week_end - pd.Timedelta(days=6), week_end)
+        rows, state = update_state(state, cds.loc[days], eq.loc[days])
+        assert len(rows) == cds.shape[1]
+        appended.append(rows)
+
+    full = _full_result(cds.loc[:week_end], eq.loc[:week_end], config).panel
+    expected = full.loc[full["date"] > cutoff].sort_values(["date", "ticker"]).reset_index(drop=True)
+    got = pd.concat(appended).sort_values(["date", "ticker"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, expected, rtol=1e-10, atol=1e-12)
+
+
+@pytest.mark.parametrize(
+    "cds_end, eq_end",
+    [
+        ("2022-02-02", "2022-02-08"),  # equity stops on a Tuesday inside the next week
+        ("2022-02-07", "2022-02-08"),  # both stop mid-week; the partial week is re-emitted
+    ],
+)
+def test_incremental_update_completes_mid_week_cutoff(tmp_path: Path, cds_end: str, eq_end: str) -> None:
+    config = replace(default_config(tmp_path), boxcar_window=10, ew_window=8, ew_half_life=6.0)
+    cds, eq = _daily_prices()
+    cds_end, eq_end = pd.Timestamp(cds_end), pd.Timestamp(eq_end)
+
+    initial = _full_result(cds.loc[:cds_end], eq.loc[:eq_end], config)
+    state = state_from_result(initial, config)
+    assert state.last_date == pd.Timestamp("2022-02-02")
+    save_state(state, tmp_path / "state")
+    state = load_state(tmp_path / "state")
+
+    appended = []
+    seen_cds, seen_eq = cds_end, eq_end
+    for week_end in pd.date_range("2022-02-09", periods=3, freq="W-WED"):
+        new_cds = cds.loc[(cds.index > seen_cds) & (cds.index <= week_end)]
+        new_eq = eq.loc[(eq.index > seen_eq) & (eq.index <= week_end)]
+        rows, state = update_state(state, new_cds, new_eq)
+        assert not rows.empty
+        appended.append(rows)
+        seen_cds = seen_eq = week_end
+
+    full = _full_result(cds.loc[:week_end], eq.loc[:week_end], config).panel
+    expected = full.loc[full["date"] > pd.Timestamp("2022-02-02")].sort_values(["date", "ticker"])
+    got = pd.concat(appended).sort_values(["date", "ticker"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, expected.reset_index(drop=True), rtol=1e-10, atol=1e-12)
+
+
+def test_incremental_update_rejects_mismatched_weeks(tmp_path: Path) -> None:
+    config = replace(default_config(tmp_path), boxcar_window=10, ew_window=8, ew_half_life=6.0)
+    cds, eq = _daily_prices()
+    cutoff = pd.Timestamp("2022-02-02")
+    state = state_from_result(_full_result(cds.loc[:cutoff], eq.loc[:cutoff], config), config)
+
+    days = slice(cutoff + pd.Timedelta(days=1), cutoff + pd.Timedelta(weeks=1))
+    with pytest.raises(ValueError, match="do not line up"):
+        update_state(state, cds.loc[days], eq.loc[days].iloc[:0])
+
+
+@pytest.mark.parametrize("layout", ["csv", "compact-csv", "compact-parquet", "stream-parquet"])
+def test_append_panel_rows_keeps_run_all_layout(tmp_path: Path, layout: str) -> None:
+    config = replace(default_config(tmp_path), boxcar_window=10, ew_window=8, ew_half_life=6.0)
+    cds, eq = _daily_prices(300)
+    full = _full_result(cds, eq, config).panel
+    dates = full["date"].drop_duplicates().sort_values()
+    old = full.loc[full["date"] <= dates.iloc[-3]]
+    new = full.loc[full["date"] >= dates.iloc[-3]]  # the first new week replaces a stored row set
+    old = old.copy()
+    old.loc[old["date"] == dates.iloc[-3], ["q_boxcar", "m"]] += 1.0  # stored while that week was partial
+
+    fmt = "parquet" if layout.endswith("parquet") else "csv"
+    path = tmp_path / f"panel_results.{fmt}"
+    if layout.startswith("compact"):
+        CompactPanel.from_long(old).write(path, fmt=fmt)
+    else:
+        write_panel_stream([old.iloc[: len(old) // 2], old.iloc[len(old) // 2 :]], path, fmt=fmt)
+
+    assert append_panel_rows(tmp_path, new) == path
+
+    if fmt == "parquet":
+        got = pd.read_parquet(path)
+    else:
+        got = pd.read_csv(path, parse_dates=["date"])
+    if layout.startswith("compact"):
+        by_date_path = tmp_path / f"panel_results_by_date.{fmt}"
+        if fmt == "parquet":
+            by_date = pd.read_parquet(by_date_path)
+        else:
+            by_date = pd.read_csv(by_date_path, index_col=0, parse_dates=True)
+        assert list(got.columns) == COMPACT_PANEL_COLUMNS
+        got = got.join(by_date, on="date")
+    got = got[PANEL_COLUMNS].astype({"ticker": str}).sort_values(["date", "ticker"]).reset_index(drop=True)
+    expected = full.sort_values(["date", "ticker"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, expected, rtol=1e-6, check_dtype=False)
+
+
+def test_append_panel_rows_rejects_unknown_layout(tmp_path: Path) -> None:
+    pd.DataFrame({"date": ["2020-01-01"], "x": [1.0]}).to_csv(tmp_path / "panel_results.csv", index=False)
+    cds, eq = _daily_prices(300)
+    config = default_config(tmp_path)
+    rows = _full_result(cds, eq, config).panel.tail(3)
+    with pytest.raises(ValueError, match="unrecognised panel layout"):
+        append_panel_rows(tmp_path, rows)
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import json
+
+from hw5.instrument import NULL_TIMER, StageTimer, make_timer
+
+
+def test_stage_timer_records_nested_stages(tmp_path) -> None:
+    timer = StageTimer()
+    with timer.stage("load") as rec:
+        with timer.stage("pivot"):
+            sum(range(10_000))
+        rec.rows = 42
+
+    @timer.wrap("metrics")
+    def metrics() -> int:
+        return 7
+
+    assert metrics() == 7
+    names = [(r.stage, r.parent) for r in timer.records]
+    assert names == [("pivot", "load"), ("load", None), ("metrics", None)]
+    load = timer.records[1]
+    assert load.rows == 42 and load.wall_s >= timer.records[0].wall_s and load.cpu_s >= 0
+
+    timer.write_json(tmp_path / "timings.json")
+    payload = json.loads((tmp_path / "timings.json").read_text())
+    assert [s["stage"] for s in payload["stages"]] == ["pivot", "load", "metrics"]
+    assert payload["total_wall_s"] == load.wall_s + timer.records[2].wall_s
+
+
+def test_null_timer_is_inert(tmp_path) -> None:
+    timer = make_timer(False)
+    assert timer is NULL_TIMER
+    with timer.stage("load") as rec:
+        rec.rows = 3
+    assert timer.wrap("x")(len) is len
+    timer.write_json(tmp_path / "timings.json")
+    assert not (tmp_path / "timings.json").exists()
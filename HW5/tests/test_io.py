@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hw5.config import default_config
+from hw5.io import (
+    cds_dataset_is_current,
+    convert_cds_to_parquet,
+    load_cds,
+    load_cds_wide_parquet,
+    load_or_fetch_equity_adj_close,
+)
+from hw5.pipeline import _load_cds_wide
+from hw5.transforms import cds_wide_parspread
+
+
+def _write_delim(path: Path) -> None:
+    dates = pd.bdate_range("2019-12-02", "2020-02-28")
+    rows = [
+        {"date": d.date().isoformat(), "ticker": t, "tenor": "5Y", "parspread": 0.01 + 0.001 * i, "currency": "USD"}
+        for i, d in enumerate(dates)
+        for t in ["AAA", "BBB", "CCC"]
+        if not (t == "CCC" and i % 7 == 0)
+    ]
+    pd.DataFrame(rows).to_csv(path, sep="\t")
+
+
+def test_parquet_dataset_roundtrip_with_pushdown(tmp_path: Path) -> None:
+    delim = tmp_path / "cds.delim"
+    _write_delim(delim)
+    ref = cds_wide_parspread(load_cds(delim))
+
+    dataset = convert_cds_to_parquet(delim, tmp_path / "cds_parquet", chunksize=50)
+    assert (dataset / "year=2020" / "ticker=AAA").is_dir()
+
+    wide = load_cds_wide_parquet(dataset)
+    pd.testing.assert_frame_equal(wide, ref, check_freq=False)
+
+    part = load_cds_wide_parquet(dataset, tickers=["CCC", "AAA"], start="2019-12-20", end="2020-01-10")
+    expected = ref.loc["2019-12-20":"2020-01-10", ["AAA", "CCC"]]
+    pd.testing.assert_frame_equal(part, expected, check_freq=False)
+    assert np.isnan(part["CCC"]).any()
+
+
+def test_stale_parquet_dataset_is_rebuilt(tmp_path: Path) -> None:
+    delim = tmp_path / "cds.delim"
+    _write_delim(delim)
+    config = replace(
+        default_config(tmp_path),
+        cds_path=delim,
+        cache_dir=None,
+        tickers=("AAA", "CCC"),
+        start_date="2019-12-20",
+        end_date="2020-01-10",
+    )
+    dataset = convert_cds_to_parquet(delim, config.cds_dataset_dir())
+    assert dataset == tmp_path / "cds_parquet"
+    before = _load_cds_wide(config)
+    assert list(before.columns) == ["AAA", "CCC"]
+
+    edited = pd.read_csv(delim, sep="\t", index_col=0)
+    edited["parspread"] *= 2
+    edited.to_csv(delim, sep="\t")
+    assert not cds_dataset_is_current(dataset, delim)
+
+    after = _load_cds_wide(config)
+    assert cds_dataset_is_current(dataset, delim)
+    pd.testing.assert_frame_equal(after, before * 2)
+    from_delim = _load_cds_wide(replace(config, cds_parquet_dir=tmp_path / "absent"))
+    pd.testing.assert_frame_equal(after, from_delim, check_freq=False)
+
+
+class _FakeProvider:
+    def __init__(self, fail: set[str] | None = None, basis: float = 1.0) -> None:
+        self.calls: list[tuple[tuple[str, ...], pd.Timestamp, pd.Timestamp]] = []
+        self.fail = fail or set()
+        self.basis = basis  # adjustment factor of this download, as after a later dividend
+
+    def __call__(self, symbols: list[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        self.calls.append((tuple(symbols), start, end))
+        if self.fail & set(symbols):
+            raise ConnectionError("provider down")
+        idx = pd.bdate_range(start, end)
+        days = (idx - pd.Timestamp("2020-01-01")).days.to_numpy()
+        return pd.DataFrame({s: self.basis * (100.0 + days + ord(s[0])) for s in symbols}, index=idx)
+
+
+def test_equity_fetch_only_missing_tickers_and_dates(tmp_path: Path) -> None:
+    cache = tmp_path / "eq.parquet"
+    start, end = pd.Timestamp("2020-01-06"), pd.Timestamp("2020-03-31")
+
+    fake = _FakeProvider()
+    px = load_or_fetch_equity_adj_close(cache, ["AAA", "BBB"], start, end, provider=fake, chunk_size=2)
+    assert {"AAA", "BBB", "SPY"} <= set(px.columns)
+    assert sorted(sym for call in fake.calls for sym in call[0]) == ["AAA", "BBB", "SPY"]
+
+    fake = _FakeProvider()
+    load_or_fetch_equity_adj_close(cache, ["AAA", "BBB"], start, end, provider=fake)
+    assert fake.calls == []
+
+    fake = _FakeProvider()
+    px = load_or_fetch_equity_adj_close(cache, ["AAA", "BBB", "CCC"], start, end + pd.Timedelta(days=30), provider=fake)
+    fetched = {(call[0], call[1] <= start) for call in fake.calls}
+    assert (("CCC",), True) in fetched
+    assert all(s == ("CCC",) or not full for s, full in fetched)
+    assert px.index.max() >= end + pd.Timedelta(days=30)
+
+    saturday = pd.Timestamp("2020-05-16")
+    load_or_fetch_equity_adj_close(cache, ["AAA", "BBB"], start, saturday, provider=_FakeProvider())
+    fake = _FakeProvider()
+    load_or_fetch_equity_adj_close(cache, ["AAA", "BBB"], start, saturday, provider=fake)
+    assert fake.calls == []  # the requested span is covered, not just the last trading day returned
+
+
+def test_equity_fetch_keeps_completed_chunks_on_failure(tmp_path: Path) -> None:
+    cache = tmp_path / "eq.parquet"
+    start, end = pd.Timestamp("2020-01-06"), pd.Timestamp("2020-02-28")
+    with pytest.raises(RuntimeError):
+        missing = cache.with_name("none.parquet")
+        load_or_fetch_equity_adj_close(missing, ["BBB"], start, end, provider=_FakeProvider({"BBB", "SPY"}))
+    with pytest.warns(RuntimeWarning, match="1 of 3"):
+        px = load_or_fetch_equity_adj_close(
+            cache, ["AAA", "BBB"], start, end, provider=_FakeProvider({"BBB"}), chunk_size=1
+        )
+
+    assert "BBB" not in px.columns
+    assert "AAA" in pd.read_parquet(cache).columns
+
+    fake = _FakeProvider()
+    load_or_fetch_equity_adj_close(cache, ["AAA", "BBB"], start, end, provider=fake, chunk_size=1)
+    assert [call[0] for call in fake.calls] == [("BBB",)]
+
+
+def test_equity_extension_is_rebased_onto_cached_basis(tmp_path: Path) -> None:
+    cache = tmp_path / "eq.parquet"
+    start, end = pd.Timestamp("2020-01-06"), pd.Timestamp("2020-02-28")
+    first = load_or_fetch_equity_adj_close(cache, ["AAA"], start, end, provider=_FakeProvider())
+
+    later = _FakeProvider(basis=0.9)
+    px = load_or_fetch_equity_adj_close(cache, ["AAA"], start, end + pd.Timedelta(days=60), provider=later)
+    assert all(call[1] <= first.index.max() for call in later.calls)  # overlaps the cached segment
+    truth = _FakeProvider()(["AAA", "SPY"], px.index.min(), px.index.max())
+    pd.testing.assert_frame_equal(px[["AAA", "SPY"]], truth, check_freq=False)
+
+
+def test_legacy_equity_cache_without_sidecar_works_offline(tmp_path: Path) -> None:
+    cache = tmp_path / "eq.parquet"
+    idx = pd.bdate_range("2020-01-06", "2020-03-31")
+    legacy = _FakeProvider()(["AAA", "GE", "SPY"], idx[0], idx[-1])
+    legacy["GE"] = np.nan  # delisted: never returned any prices
+    legacy.to_parquet(cache)
+
+    offline = _FakeProvider({"AAA", "GE", "SPY"})
+    px = load_or_fetch_equity_adj_close(cache, ["AAA", "GE"], idx[0], idx[-1], provider=offline)
+    assert offline.calls == []  # legacy columns cover the whole cache index, GE included
+    pd.testing.assert_frame_equal(px, legacy, check_freq=False)
+
+    with pytest.warns(RuntimeWarning, match="using the cached prices"):
+        px = load_or_fetch_equity_adj_close(cache, ["AAA", "GE"], idx[0], pd.Timestamp("2020-04-30"), provider=offline)
+    pd.testing.assert_frame_equal(px, legacy, check_freq=False)
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from hw5.metrics import (
+    error_stats,
+    event_windows,
+    metrics_by_ticker,
+    oos_r2,
+    rolling_error_stats,
+    weekly_pooled_rmse,
+)
+
+
+def _toy_panel() -> pd.DataFrame:
+    rng = np.random.default_rng(5)
+    dates = pd.date_range("2021-01-06", periods=30, freq="W-WED")
+    panel = pd.DataFrame(
+        {
+            "date": np.tile(dates, 3),
+            "ticker": np.repeat(["AAA", "BBB", "CCC"], len(dates)),
+            "q_boxcar": rng.normal(0, 0.05, 3 * len(dates)),
+            "q_ew": rng.normal(0, 0.05, 3 * len(dates)),
+        }
+    )
+    panel.loc[panel.sample(frac=0.2, random_state=1).index, "q_ew"] = np.nan
+    panel.loc[panel["date"] == dates[0], ["q_boxcar", "q_ew"]] = np.nan
+    return panel
+
+
+def test_weekly_pooled_rmse_matches_groupby() -> None:
+    panel = _toy_panel()
+    weekly = weekly_pooled_rmse(panel)
+    sq = panel[["q_boxcar", "q_ew"]].pow(2).assign(date=panel["date"])
+    expected = np.sqrt(sq.groupby("date").mean()).rename(columns=lambda c: c.replace("q_", "rmse_"))
+    pd.testing.assert_frame_equal(weekly, expected)
+    assert weekly.iloc[0].isna().all()
+
+    events = event_windows(panel, top_n=5, weekly=weekly)
+    assert len(events) == 5
+    assert events["gap_ew_minus_boxcar"].abs().is_monotonic_decreasing
+
+
+def test_metrics_by_ticker_matches_per_group_stats() -> None:
+    rng = np.random.default_rng(11)
+    panel = _toy_panel()
+    panel["rho"] = rng.normal(0, 0.05, len(panel))
+    panel["pred_boxcar"] = panel["rho"] - panel["q_boxcar"]
+    panel["pred_ew"] = panel["rho"] - panel["q_ew"]
+    # small groups exercise the n < 2/3/4 and constant-error branches
+    tiny = pd.DataFrame(
+        {
+            "date": pd.Timestamp("2021-01-06"),
+            "ticker": ["DDD", "EEE", "EEE", "FFF", "FFF", "FFF", "GGG", "GGG", "GGG", "GGG"],
+            "q_boxcar": [0.1, 0.2, -0.1, 0.3, 0.3, 0.3, 0.1, -0.2, 0.4, 0.0],
+            "q_ew": np.nan,
+            "rho": rng.normal(0, 0.05, 10),
+            "pred_boxcar": rng.normal(0, 0.05, 10),
+            "pred_ew": np.nan,
+        }
+    )
+    panel = pd.concat([tiny, panel], ignore_index=True).sample(frac=1.0, random_state=3)
+
+    rows = []
+    for ticker, g in panel.groupby("ticker"):
+        for model in ["boxcar", "ew"]:
+            stats = error_stats(g[f"q_{model}"])
+            rows.append({"ticker": ticker, "model": model, **stats, "oos_r2": oos_r2(g["rho"], g[f"pred_{model}"])})
+    pd.testing.assert_frame_equal(metrics_by_ticker(panel), pd.DataFrame(rows), rtol=1e-10)
+
+
+def test_rolling_error_stats_match_window_slices() -> None:
+    rng = np.random.default_rng(8)
+    panel = _toy_panel()
+    panel["rho"] = rng.normal(0, 0.05, len(panel))
+    panel["pred_boxcar"] = panel["rho"] - panel["q_boxcar"]
+    panel["pred_ew"] = panel["rho"] - panel["q_ew"]
+    dates = np.sort(panel["date"].unique())
+    window = 8
+
+    for by_ticker in (False, True):
+        rolled = rolling_error_stats(panel, window, by_ticker=by_ticker)
+        keys = ["ticker", "model", "date"] if by_ticker else ["model", "date"]
+        rolled = rolled.set_index(keys)
+        for i in (3, 12, len(dates) - 1):
+            lo, hi = dates[max(i - window + 1, 0)], dates[i]
+            in_window = panel[(panel["date"] >= lo) & (panel["date"] <= hi)]
+            groups = in_window.groupby("ticker") if by_ticker else [(None, in_window)]
+            for ticker, g in groups:
+                for model in ("boxcar", "ew"):
+                    key = (ticker, model, dates[i]) if by_ticker else (model, dates[i])
+                    row = rolled.loc[key]
+                    stats = error_stats(g[f"q_{model}"])
+                    assert row["n"] == np.nan_to_num(stats["n"])
+                    if stats["n"] >= 2:
+                        assert np.isclose(row["rmse"], stats["rmse"], rtol=1e-10)
+                        assert np.isclose(row["mean"], stats["mean"], rtol=1e-8, atol=1e-14)
+                        assert np.isclose(row["oos_r2"], oos_r2(g["rho"], g[f"pred_{model}"]), rtol=1e-8)
+                        # sketch quantiles: within a bin of the exact order statistics
+                        for q in ("q05", "q95"):
+                            assert np.isclose(row[q], stats[q], rtol=0.03)
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hw5.metrics import metrics_by_ticker, pooled_metrics, weekly_pooled_rmse
+from hw5.panel_store import iter_panel_file, panel_metrics_streamed, write_panel_stream
+from hw5.pipeline import compute_panel, iter_panel_chunks
+from hw5.plots import tail_summary
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "csv"])
+def test_streamed_panel_matches_in_memory(tmp_path: Path, fmt: str) -> None:
+    rng = np.random.default_rng(9)
+    idx = pd.date_range("2020-01-01", periods=60, freq="W-WED")
+    m = pd.Series(rng.normal(0, 0.02, len(idx)), index=idx)
+    eq = pd.DataFrame(
+        0.8 * m.to_numpy()[:, None] + rng.normal(0, 0.01, (len(idx), 5)),
+        index=idx,
+        columns=["AAA", "BBB", "CCC", "DDD", "EEE"],
+    )
+    cds = 0.3 * eq + rng.normal(0, 0.02, eq.shape)
+    full = compute_panel(cds, eq, m, boxcar_window=16, ew_window=16, ew_half_life=12.0)
+
+    path = tmp_path / f"panel.{fmt}"
+    rows = write_panel_stream(iter_panel_chunks(cds, eq, m, 16, 16, 12.0, chunk_size=2), path, fmt=fmt)
+    assert rows == len(full)
+    if fmt == "parquet":
+        assert len(list(iter_panel_file(path))) == 3
+
+    per_ticker, pooled, weekly, tail = panel_metrics_streamed(path, csv_chunksize=37)
+    pd.testing.assert_frame_equal(per_ticker, metrics_by_ticker(full))
+    pd.testing.assert_frame_equal(pooled, pooled_metrics(full), rtol=1e-9)
+    pd.testing.assert_frame_equal(weekly, weekly_pooled_rmse(full), check_freq=False)
+    pd.testing.assert_frame_equal(tail, tail_summary(full), rtol=1e-12)
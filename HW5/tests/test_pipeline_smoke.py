@@ -4,7 +4,7 @@ import numpy as np
 import pandas as pd
 
 from hw5.metrics import metrics_by_ticker, pooled_metrics
-from hw5.pipeline import compute_panel
+from hw5.pipeline import CompactPanel, compact_predictive_panel, compute_hedge_stage, compute_panel
 
 
 def test_pipeline_smoke_shapes() -> None:
@@ -25,3 +25,42 @@ def test_pipeline_smoke_shapes() -> None:
     pm = pooled_metrics(panel)
     assert not mt.empty
     assert not pm.empty
+
+
+def test_batched_panel_matches_per_ticker_loop() -> None:
+    rng = np.random.default_rng(4)
+    idx = pd.date_range("2020-01-01", periods=90, freq="W-WED")
+    m = pd.Series(rng.normal(0, 0.02, len(idx)), index=idx)
+    eq = pd.DataFrame(
+        0.8 * m.to_numpy()[:, None] + rng.normal(0, 0.01, (len(idx), 4)),
+        index=idx,
+        columns=["AAA", "BBB", "CCC", "DDD"],
+    )
+    cds = 0.3 * eq + rng.normal(0, 0.02, eq.shape)
+    cds.iloc[:30, 1] = np.nan
+    eq.iloc[rng.integers(0, len(idx), 12), 2] = np.nan
+
+    loop = compute_panel(cds, eq, m, boxcar_window=16, ew_window=16, ew_half_life=12.0, batched=False)
+    batched = compute_panel(cds, eq, m, boxcar_window=16, ew_window=16, ew_half_life=12.0)
+    pd.testing.assert_frame_equal(batched, loop, rtol=1e-10, atol=1e-12)
+
+
+def test_compact_panel_roundtrip(tmp_path) -> None:
+    rng = np.random.default_rng(6)
+    idx = pd.date_range("2020-01-01", periods=60, freq="W-WED")
+    m = pd.Series(rng.normal(0, 0.02, len(idx)), index=idx)
+    eq = pd.DataFrame(0.8 * m.to_numpy()[:, None] + rng.normal(0, 0.01, (len(idx), 3)), index=idx, columns=["AAA", "BBB", "CCC"])
+    cds = 0.3 * eq + rng.normal(0, 0.02, eq.shape)
+
+    full = compute_panel(cds, eq, m, boxcar_window=16, ew_window=16, ew_half_life=12.0)
+    compact = compact_predictive_panel(compute_hedge_stage(cds, eq, m, 16), ew_window=16, ew_half_life=12.0)
+    assert isinstance(compact.panel["ticker"].dtype, pd.CategoricalDtype)
+    assert (compact.panel.dtypes.iloc[2:] == np.float32).all()
+    assert len(compact.by_date) == len(idx)
+    assert compact.memory_usage() < 0.6 * full.memory_usage(deep=True).sum()
+    pd.testing.assert_frame_equal(compact.to_long(), full, rtol=1e-6)
+
+    rebuilt = CompactPanel.from_long(full)
+    pd.testing.assert_frame_equal(rebuilt.panel, compact.panel)
+    by_date_path = compact.write(tmp_path / "panel.csv")
+    assert by_date_path.name == "panel_by_date.csv"
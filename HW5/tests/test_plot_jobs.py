@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from hw5 import plot_jobs
+from hw5.plot_jobs import MANIFEST_NAME, PlotJob, panel_plot_jobs, render_plot_jobs, robustness_plot_jobs
+
+
+def _toy_panel() -> pd.DataFrame:
+    rng = np.random.default_rng(2)
+    dates = pd.date_range("2021-01-06", periods=40, freq="W-WED")
+    return pd.DataFrame(
+        {
+            "date": np.tile(dates, 2),
+            "ticker": np.repeat(["AAA", "BBB"], len(dates)),
+            "q_boxcar": rng.normal(0, 0.05, 2 * len(dates)),
+            "q_ew": rng.normal(0, 0.05, 2 * len(dates)),
+        }
+    )
+
+
+def _toy_sweep() -> pd.DataFrame:
+    grid = [(w, h) for w in (12, 16) for h in (8.0, 12.0)]
+    return pd.DataFrame(
+        {
+            "window": [w for w, _ in grid],
+            "half_life": [h for _, h in grid],
+            "delta_rmse_vs_baseline": np.linspace(-0.01, 0.01, 4),
+            "stability_rank_corr": np.linspace(0.5, 1.0, 4),
+        }
+    )
+
+
+def test_render_skips_unchanged_summaries(tmp_path) -> None:
+    panel = _toy_panel()
+    manifest = tmp_path / MANIFEST_NAME
+    jobs = panel_plot_jobs(panel, tmp_path) + robustness_plot_jobs(_toy_sweep(), tmp_path / "robustness")
+    drawn = render_plot_jobs(jobs, manifest, max_workers=2)
+    assert len(drawn) == 5 and all(p.exists() for p in drawn)
+
+    assert render_plot_jobs(panel_plot_jobs(panel, tmp_path), manifest) == []
+
+    changed = panel.copy()
+    changed.loc[0, "q_ew"] += 1.0
+    redrawn = render_plot_jobs(panel_plot_jobs(changed, tmp_path), manifest, max_workers=1)
+    assert {p.name for p in redrawn} == {"rolling_rmse.png", "error_gap.png", "tail_qq.png"}
+
+    (tmp_path / "robustness" / "stability_heatmap.png").unlink()
+    redrawn = render_plot_jobs(robustness_plot_jobs(_toy_sweep(), tmp_path / "robustness"), manifest)
+    assert [p.name for p in redrawn] == ["stability_heatmap.png"]
+
+
+def test_digest_tracks_renderer_source(monkeypatch, tmp_path) -> None:
+    job = panel_plot_jobs(_toy_panel(), tmp_path)[0]
+    before = job.digest()
+    monkeypatch.setattr(plot_jobs, "_module_source_hash", lambda module: "edited")
+    assert job.digest() != before
+
+
+def test_in_process_render_uses_agg(tmp_path) -> None:
+    seen = []
+
+    def render(summary: pd.DataFrame, out_path) -> None:
+        seen.append(plt.get_backend().lower())
+        out_path.write_bytes(b"")
+
+    plt.switch_backend("template")
+    try:
+        job = PlotJob(render, pd.DataFrame({"a": [1.0]}), tmp_path / "a.png")
+        render_plot_jobs([job], tmp_path / MANIFEST_NAME, max_workers=1)
+        assert seen == ["agg"]
+        assert plt.get_backend().lower() == "template"
+    finally:
+        plt.switch_backend("Agg")
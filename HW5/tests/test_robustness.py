@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from hw5.config import default_config
+from hw5.metrics import pooled_metrics
+from hw5.pipeline import compute_panel
+from hw5.robustness import _cell_batches, run_robustness
+
+
+def _toy_returns(n: int = 70) -> tuple[pd.DataFrame, pd.DataFrame, pd.Series]:
+    rng = np.random.default_rng(7)
+    idx = pd.date_range("2020-01-01", periods=n, freq="W-WED")
+    m = pd.Series(rng.normal(0, 0.02, n), index=idx, name="m")
+    eq = pd.DataFrame(
+        0.9 * m.to_numpy()[:, None] + rng.normal(0, 0.01, (n, 3)),
+        index=idx,
+        columns=["AAA", "BBB", "CCC"],
+    )
+    cds = 0.4 * eq + rng.normal(0, 0.02, eq.shape)
+    return cds, eq, m
+
+
+def test_run_robustness_matches_full_recompute(tmp_path: Path) -> None:
+    cds, eq, m = _toy_returns()
+    config = replace(
+        default_config(tmp_path),
+        robustness_windows=(8, 12),
+        robustness_half_lives=(4.0, 12.0),
+    )
+    table = run_robustness(config, cds, eq, m, out_dir=tmp_path / "robustness")
+
+    assert (tmp_path / "robustness" / "robustness_sweep.csv").exists()
+    assert list(table[["window", "half_life"]].itertuples(index=False, name=None)) == [
+        (8, 4.0),
+        (8, 12.0),
+        (12, 4.0),
+        (12, 12.0),
+    ]
+    for row in table.itertuples(index=False):
+        panel = compute_panel(cds, eq, m, config.boxcar_window, row.window, row.half_life, batched=False)
+        pool = pooled_metrics(panel)
+        assert np.isclose(row.ew_rmse, pool.loc[pool["model"] == "ew", "rmse"].iloc[0], rtol=1e-10)
+
+
+def test_run_robustness_executors_agree(tmp_path: Path) -> None:
+    cds, eq, m = _toy_returns()
+    config = replace(default_config(tmp_path), robustness_windows=(8, 12), robustness_half_lives=(4.0, 12.0))
+    serial = run_robustness(config, cds, eq, m, out_dir=tmp_path / "serial")
+    for executor in ("threads", "processes"):
+        other = run_robustness(config, cds, eq, m, out_dir=tmp_path / executor, executor=executor, max_workers=2)
+        pd.testing.assert_frame_equal(other, serial)
+
+
+def test_cell_batches_are_bounded_and_share_a_window(tmp_path: Path) -> None:
+    cells = [(16, 12.0), (8, 12.0), (8, 4.0), (8, 20.0), (12, 4.0), (16, 4.0)]
+    assert _cell_batches(cells, 2) == [[(16, 12.0), (16, 4.0)], [(8, 12.0), (8, 4.0)], [(8, 20.0)], [(12, 4.0)]]
+
+    cds, eq, m = _toy_returns()
+    config = replace(default_config(tmp_path), robustness_windows=(8, 12), robustness_half_lives=(4.0, 12.0))
+    wide = run_robustness(replace(config, robustness_batch_cells=100), cds, eq, m, out_dir=tmp_path / "wide")
+    single = run_robustness(replace(config, robustness_batch_cells=1), cds, eq, m, out_dir=tmp_path / "single")
+    pd.testing.assert_frame_equal(single, wide)
@@ -2,8 +2,17 @@ from __future__ import annotations
 
 import numpy as np
 import pandas as pd
+import pytest
 
-from hw5.rolling import ew_weights, rolling_ols_no_intercept, rolling_slope_no_intercept_ew
+from hw5.kernels import NUMBA_AVAILABLE, resolve_backend
+from hw5.rolling import (
+    ew_weights,
+    rolling_ols_no_intercept,
+    rolling_slope_no_intercept_boxcar,
+    rolling_slope_no_intercept_ew,
+    rolling_slope_no_intercept_ew_multi,
+    rolling_slope_no_intercept_ew_recursive,
+)
 
 
 def test_rolling_ols_matches_synthetic_truth() -> None:
@@ -20,6 +29,34 @@ def test_rolling_ols_matches_synthetic_truth() -> None:
     assert np.allclose(last, beta, atol=1e-10)
 
 
+def test_recursive_ols_matches_lstsq_with_gaps_and_collinearity() -> None:
+    rng = np.random.default_rng(0)
+    n = 300
+    X = pd.DataFrame(rng.normal(0, 0.02, (n, 2)), columns=["equity", "index"])
+    y = pd.Series(X.to_numpy() @ np.array([0.5, -1.2]) + rng.normal(0, 0.01, n))
+    X.iloc[rng.integers(0, n, 30), 0] = np.nan
+    y.iloc[rng.integers(0, n, 20)] = np.nan
+    X.iloc[100:120, 1] = 2.0 * X.iloc[100:120, 0]
+
+    ref = rolling_ols_no_intercept(y, X, window=16, engine="lstsq")
+    out = rolling_ols_no_intercept(y, X, window=16, engine="recursive")
+    assert out.isna().equals(ref.isna())
+    assert np.allclose(out, ref, atol=1e-10, equal_nan=True)
+
+
+@pytest.mark.parametrize("noise", [0.3, 0.03, 0.01, 3e-3, 1e-3, 1e-5])
+def test_recursive_ols_matches_lstsq_for_collinear_full_rank_regressors(noise: float) -> None:
+    rng = np.random.default_rng(3)
+    n = 400
+    x1 = rng.normal(0, 0.02, n)
+    X = pd.DataFrame({"equity": x1, "index": x1 + rng.normal(0, 0.02 * noise, n)})  # corr ~ 1 - noise^2 / 2
+    y = pd.Series(X.to_numpy() @ np.array([0.5, -1.2]) + rng.normal(0, 0.01, n))
+
+    ref = rolling_ols_no_intercept(y, X, window=16, engine="lstsq")
+    out = rolling_ols_no_intercept(y, X, window=16, engine="recursive")
+    np.testing.assert_allclose(out, ref, rtol=0, atol=1e-10)
+
+
 def test_ew_slope_matches_weighted_formula() -> None:
     y = pd.Series([1.0, 2.0, 3.0, 4.0, 5.0, 10.0])
     x = pd.Series([2.0, 1.0, 1.5, 2.5, 3.5, 4.0])
@@ -30,3 +67,93 @@ def test_ew_slope_matches_weighted_formula() -> None:
     xw = x.iloc[0:5].to_numpy()
     expected = np.dot(w * xw, yw) / np.dot(w * xw, xw)
     assert np.isclose(out.iloc[5], expected)
+
+
+def test_recursive_ew_slope_matches_windowed_with_gaps() -> None:
+    rng = np.random.default_rng(1)
+    n = 400
+    x = pd.Series(rng.normal(0, 1, n))
+    y = 0.3 * x + pd.Series(rng.normal(0, 1, n))
+    x.iloc[rng.integers(0, n, 40)] = np.nan
+    y.iloc[100:130] = np.nan
+
+    ref = rolling_slope_no_intercept_ew(y, x, window=16, half_life=12.0)
+    out = rolling_slope_no_intercept_ew_recursive(y, x, half_life=12.0, window=16)
+    assert out.isna().equals(ref.isna())
+    assert np.allclose(out, ref, atol=1e-10, equal_nan=True)
+
+
+def test_multi_half_life_ew_slope_matches_single_fits() -> None:
+    rng = np.random.default_rng(12)
+    n = 120
+    x = pd.Series(rng.normal(size=n))
+    y = pd.Series(0.5 * x.to_numpy() + rng.normal(scale=0.2, size=n))
+    y.iloc[rng.integers(0, n, 20)] = np.nan
+    x.iloc[:15] = np.nan
+
+    windows, half_lives = [12, 16, 16, 26], [8.0, 12.0, np.inf, 20.0]
+    multi = rolling_slope_no_intercept_ew_multi(y, x, windows, half_lives)
+    assert list(multi.columns) == list(zip(windows, half_lives))
+    for window, half_life in zip(windows, half_lives):
+        if np.isinf(half_life):
+            single = rolling_slope_no_intercept_boxcar(y, x, window=window, backend="python")
+        else:
+            single = rolling_slope_no_intercept_ew(y, x, window=window, half_life=half_life, backend="python")
+        np.testing.assert_allclose(multi[(window, half_life)], single, rtol=1e-10, atol=1e-14)
+
+
+def test_recursive_ew_slope_infinite_window() -> None:
+    y = pd.Series([1.0, 2.0, np.nan, 4.0, 5.0, 10.0])
+    x = pd.Series([2.0, 1.0, 1.5, 2.5, 3.5, 4.0])
+    out = rolling_slope_no_intercept_ew_recursive(y, x, half_life=3.0, window=None)
+
+    lam = 0.5 ** (1.0 / 3.0)
+    xw, yw = x.iloc[[0, 1, 3, 4]].to_numpy(), y.iloc[[0, 1, 3, 4]].to_numpy()
+    w = lam ** np.array([4, 3, 1, 0])
+    assert out.iloc[:4].isna().all()
+    assert np.isclose(out.iloc[5], np.dot(w * xw, yw) / np.dot(w * xw, xw))
+
+
+def test_backend_resolution(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("HW5_BACKEND", "python")
+    assert resolve_backend() == "python"
+    assert resolve_backend("auto") == ("numba" if NUMBA_AVAILABLE else "python")
+    with pytest.raises(ValueError):
+        resolve_backend("cuda")
+
+
+def test_compiled_kernels_match_python_fallback() -> None:
+    pytest.importorskip("numba")
+    rng = np.random.default_rng(2)
+    n = 300
+    X = pd.DataFrame(rng.normal(0, 0.02, (n, 2)), columns=["equity", "index"])
+    y = pd.Series(X.to_numpy() @ np.array([0.5, -1.2]) + rng.normal(0, 0.01, n))
+    X.iloc[rng.integers(0, n, 30), 0] = np.nan
+    X.iloc[100:120, 1] = 2.0 * X.iloc[100:120, 0]
+    x = X["equity"]
+
+    cases = [
+        lambda b: rolling_ols_no_intercept(y, X, window=16, engine="lstsq", backend=b),
+        lambda b: rolling_slope_no_intercept_boxcar(y, x, window=16, backend=b),
+        lambda b: rolling_slope_no_intercept_ew(y, x, window=16, half_life=12.0, backend=b),
+        lambda b: rolling_slope_no_intercept_ew_recursive(y, x, half_life=12.0, window=16, backend=b),
+        lambda b: rolling_slope_no_intercept_ew_recursive(y, x, half_life=12.0, window=None, backend=b),
+    ]
+    for case in cases:
+        ref = np.asarray(case("python"), dtype=float)
+        out = np.asarray(case("numba"), dtype=float)
+        assert np.array_equal(np.isnan(ref), np.isnan(out))
+        assert np.allclose(out, ref, atol=1e-12, equal_nan=True)
+
+
+def test_recursive_ols_unaffected_by_earlier_outlier() -> None:
+    rng = np.random.default_rng(7)
+    n, window = 20_000, 52
+    X = rng.normal(0.0, 0.02, (n, 2))
+    y = X @ np.array([1.3, -0.4]) + rng.normal(0.0, 0.01, n)
+    X[n // 2, 0] = 50.0
+
+    out = rolling_ols_no_intercept(pd.Series(y), pd.DataFrame(X), window).to_numpy()
+    rows = np.r_[window : n // 2 + 1, n // 2 + window + 1 : n : 97]
+    ref = np.array([np.linalg.lstsq(X[i - window : i], y[i - window : i], rcond=None)[0] for i in rows])
+    np.testing.assert_allclose(out[rows], ref, rtol=0, atol=1e-10)
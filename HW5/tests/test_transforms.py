@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from hw5.transforms import resample_last_multi, resample_returns_multi, to_weekly_wed_last
+
+
+def _daily(n: int = 260, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2020-01-01", periods=n).delete(np.arange(40, 60))  # a gap spanning whole bins
+    df = pd.DataFrame(rng.normal(size=(len(idx), 3)), index=idx, columns=["AAA", "BBB", "SPY"])
+    return df.mask(rng.random(df.shape) < 0.4)
+
+
+def test_resample_last_multi_matches_pandas() -> None:
+    df = _daily()
+    out = resample_last_multi(df.iloc[::-1], ["W-WED", "W-FRI", "ME", "D"])
+    for anchor in ("W-WED", "W-FRI", "ME"):
+        pd.testing.assert_frame_equal(out[anchor], df.resample(anchor).last())
+    pd.testing.assert_frame_equal(out["D"], df, check_freq=False)
+    pd.testing.assert_frame_equal(to_weekly_wed_last(df), df.resample("W-WED").last())
+
+
+def test_resample_returns_multi_blocks_are_aligned() -> None:
+    px = _daily().abs() + 1.0
+    blocks = resample_returns_multi(px[["AAA", "BBB"]], px, ["AAA", "BBB"], ["W-WED", "W-FRI"])
+    for anchor, block in blocks.items():
+        assert block.cds_ret.index.equals(block.eq_ret.index)
+        assert block.cds_ret.index.equals(block.market_ret.index)
+        arr = block.cds_ret.to_numpy()
+        assert arr.dtype == np.float64 and np.shares_memory(arr, block.cds_ret.to_numpy())
+        expected = px[["AAA", "BBB"]].resample(anchor).last().pct_change()
+        pd.testing.assert_frame_equal(block.cds_ret, expected.loc[block.cds_ret.index], check_freq=False)
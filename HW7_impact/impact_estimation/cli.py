@@ -3,11 +3,9 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
-import pandas as pd
-
 from .impact_config import ImpactConfig, require_parquet_engine
 from .impact_core import collapse_multihit_trades, robustness_sweep, run_exchange_and_pooled
-from .io import find_trade_files, read_trades_parquet
+from .io import find_trade_files, load_trade_files
 
 
 def parse_args() -> argparse.Namespace:
@@ -15,6 +13,8 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--repo-root", type=Path, default=Path("."))
     p.add_argument("--max-rows-per-file", type=int, default=None)
     p.add_argument("--sample-frac", type=float, default=None)
+    p.add_argument("--load-workers", type=int, default=4, help="Trade files read concurrently")
+    p.add_argument("--fit-workers", type=int, default=1, help="Processes for per-cell model fits")
     p.add_argument("--M", type=int, default=50)
     p.add_argument("--ts-floor", type=str, default="1ms")
     p.add_argument("--outdir", type=Path, default=Path("outputs"))
@@ -31,6 +31,7 @@ def main() -> None:
         ts_floor=None if str(args.ts_floor).lower() == "none" else args.ts_floor,
         max_rows_per_file=args.max_rows_per_file,
         sample_frac=args.sample_frac,
+        fit_workers=args.fit_workers,
     )
 
     files = find_trade_files(args.repo_root)
@@ -40,14 +41,7 @@ def main() -> None:
             "TRADE_FILES_GLOB/TRADE_FILES_LIST environment variables."
         )
 
-    pieces = []
-    for f in files:
-        try:
-            pieces.append(read_trades_parquet(f, cfg.max_rows_per_file, cfg.sample_frac))
-        except ValueError as exc:
-            raise ValueError(f"Schema mismatch in file {f}: {exc}") from exc
-
-    trades = pd.concat(pieces, ignore_index=True)
+    trades = load_trade_files(files, cfg.max_rows_per_file, cfg.sample_frac, max_workers=args.load_workers)
     parent = collapse_multihit_trades(trades, cfg.ts_floor)
     results = run_exchange_and_pooled(parent, cfg)
 
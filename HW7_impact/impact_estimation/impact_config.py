@@ -23,6 +23,8 @@ class ImpactConfig:
     sample_frac: Optional[float] = None
     min_n: int = 5000
     random_state: int = 42
+    fit_workers: int = 1  # processes for per-cell model fits; 1 fits in-process
+    fit_chunk_size: int = 4  # cells sent to a worker at a time
 
 
 def require_parquet_engine() -> str:
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import asdict
 import importlib
+from itertools import chain, islice
+from typing import Iterable, Iterator
 
 import numpy as np
 import pandas as pd
@@ -14,7 +18,7 @@ RESULT_COLUMNS = [
 ]
 
 
-def collapse_multihit_trades(df: pd.DataFrame, ts_floor: str | None) -> pd.DataFrame:
+def _collapse_multihit_sorted(df: pd.DataFrame, ts_floor: str | None) -> pd.DataFrame:
     d = df.copy()
     d["ts_g"] = d["ts"].dt.floor(ts_floor) if ts_floor is not None else d["ts"]
     d = d.sort_values(["exchange", "ts_g"], kind="mergesort")
@@ -31,17 +35,113 @@ def collapse_multihit_trades(df: pd.DataFrame, ts_floor: str | None) -> pd.DataF
     return out.reset_index(drop=True)
 
 
+def _small_codes(codes: np.ndarray, n: int) -> np.ndarray:
+    # numpy's stable sort is a counting (radix) sort for 8/16-bit integers
+    return codes.astype(np.int8 if n < 2**7 else np.int16 if n < 2**15 else np.int64)
+
+
+def collapse_multihit_trades(df: pd.DataFrame, ts_floor: str | None) -> pd.DataFrame:
+    """Aggregate trades sharing (exchange, floored ts, side) into one VWAP print.
+
+    Single linear pass for feeds that are time-ordered within each exchange:
+    exchange and side are integer-coded, runs of equal (exchange, ts, side)
+    are detected on the int64 floored timestamps and qty / price*qty are
+    reduced with ``np.add.reduceat``. Interleaved exchanges are grouped with a
+    stable counting sort on the exchange codes. Input that is not time-ordered
+    within an exchange (or has no datetime ``ts``) takes the general
+    sort-and-groupby path; both give the same rows in the same order.
+    """
+    if len(df) == 0 or not pd.api.types.is_datetime64_any_dtype(df["ts"]):
+        return _collapse_multihit_sorted(df, ts_floor)
+
+    ts_g = df["ts"].dt.floor(ts_floor) if ts_floor is not None else df["ts"]
+    ts_i = ts_g.array.asi8
+    ex = df["exchange"]
+    if isinstance(ex.dtype, pd.CategoricalDtype):
+        ex_codes, n_ex = ex.cat.codes.to_numpy(), len(ex.cat.categories)
+    else:
+        ex_codes, ex_uniques = pd.factorize(ex, sort=True)
+        n_ex = len(ex_uniques)
+    side_codes, side_uniques = pd.factorize(df["side"])
+    ex_codes = _small_codes(ex_codes, n_ex)
+    qty = df["qty"].to_numpy()
+    pxq = df["price"].to_numpy() * qty
+
+    # groupby drops rows with a missing key
+    keep = (ex_codes >= 0) & (side_codes >= 0) & (ts_i != np.iinfo(np.int64).min)
+    rows = None if keep.all() else np.flatnonzero(keep)
+    if rows is not None and len(rows) == 0:
+        return _collapse_multihit_sorted(df, ts_floor)
+    if np.any(ex_codes[1:] < ex_codes[:-1] if rows is None else np.diff(ex_codes[rows]) < 0):
+        ex_sel = ex_codes if rows is None else ex_codes[rows]
+        order = np.argsort(ex_sel, kind="stable")
+        rows = order if rows is None else rows[order]
+    if rows is not None:
+        ex_codes, side_codes, ts_i, qty, pxq = ex_codes[rows], side_codes[rows], ts_i[rows], qty[rows], pxq[rows]
+
+    new_ex = ex_codes[1:] != ex_codes[:-1]
+    dt = np.diff(ts_i)
+    if np.any((dt < 0) & ~new_ex):
+        return _collapse_multihit_sorted(df, ts_floor)
+
+    new_block = new_ex | (dt != 0)
+    starts = np.flatnonzero(np.concatenate(([True], new_block | (side_codes[1:] != side_codes[:-1]))))
+    if np.isnan(qty).any() or np.isnan(pxq).any():  # groupby sums skip NaN
+        qty = np.where(np.isnan(qty), 0, qty)
+        pxq = np.where(np.isnan(pxq), 0.0, pxq)
+    q_sum = np.add.reduceat(qty, starts)
+    pxq_sum = np.add.reduceat(pxq, starts)
+
+    # a side that reappears within one (exchange, ts) block is merged into its
+    # first run, as the keyed groupby does; runs are walked per side code
+    block = np.cumsum(np.concatenate(([False], new_block)))[starts]
+    if len(starts) > block[-1] + 1:
+        seg_side = side_codes[starts]
+        by_side = [np.flatnonzero(seg_side == s) for s in range(len(side_uniques))]
+        is_first = np.ones(len(starts), dtype=bool)
+        for pos in by_side:
+            is_first[pos[1:]] = block[pos[1:]] != block[pos[:-1]]
+        if not is_first.all():
+            seg = np.cumsum(is_first) - 1
+            for pos in by_side:
+                # each repeat takes the group of the latest first run of its side
+                last_first = np.maximum.accumulate(np.where(is_first[pos], np.arange(len(pos)), 0))
+                seg[pos] = seg[pos[last_first]]
+            q_sum = np.bincount(seg, weights=q_sum).astype(q_sum.dtype, copy=False)
+            pxq_sum = np.bincount(seg, weights=pxq_sum)
+            starts = starts[is_first]
+
+    src = starts if rows is None else rows[starts]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price = pxq_sum / q_sum
+    out = pd.DataFrame(
+        {
+            "ts": ts_g.take(src).array,
+            "qty": q_sum,
+            "price": price,
+            "exchange": ex.take(src).array,
+            "side": df["side"].take(src).array,
+        }
+    )
+    out = out.dropna(subset=["price"])
+    out = out[(out["qty"] > 0) & (out["price"] > 0)].copy()
+    return out.reset_index(drop=True)
+
+
 def infer_side_signs(df: pd.DataFrame, M: int) -> dict[str, int]:
-    d = df.sort_values("ts").reset_index(drop=True)
+    return _infer_side_signs_sorted(df.sort_values("ts").reset_index(drop=True), M)
+
+
+def _infer_side_signs_sorted(d: pd.DataFrame, M: int) -> dict[str, int]:
     sides = [str(s) for s in d["side"].dropna().unique()]
     if len(sides) == 2:
-        d["p_fwd"] = d["price"].shift(-M)
-        d = d.dropna(subset=["p_fwd"])
-        d["r"] = d["p_fwd"] / d["price"] - 1.0
+        p_fwd = d["price"].shift(-M)
+        keep = p_fwd.notna().to_numpy()
+        r = (p_fwd / d["price"] - 1.0).to_numpy()[keep]
         s0, s1 = sides[0], sides[1]
         map_a, map_b = {s0: 1, s1: -1}, {s0: -1, s1: 1}
-        ya = d["side"].map(map_a) * d["r"]
-        yb = d["side"].map(map_b) * d["r"]
+        ya = pd.Series(_side_sign_array(d["side"], map_a, np.nan)[keep] * r)
+        yb = pd.Series(_side_sign_array(d["side"], map_b, np.nan)[keep] * r)
         return map_a if ya.mean() >= yb.mean() else map_b
 
     mapping: dict[str, int] = {}
@@ -57,27 +157,74 @@ def infer_side_signs(df: pd.DataFrame, M: int) -> dict[str, int]:
 
 
 def add_markouts(df: pd.DataFrame, M: int, side_sign: dict[str, int]) -> pd.DataFrame:
-    d = df.sort_values("ts").copy()
-    d["sgn"] = d["side"].map(side_sign).fillna(1).astype(int)
-    d["p_fwd"] = d["price"].shift(-M)
-    d = d.dropna(subset=["p_fwd"])
-    d["r"] = d["p_fwd"] / d["price"] - 1.0
-    d["y"] = d["sgn"] * d["r"]
-    d["V"] = d["qty"]
-    return d[["ts", "exchange", "side", "sgn", "price", "p_fwd", "r", "y", "V"]].reset_index(drop=True)
+    return _markouts_sorted(df.sort_values("ts"), M, side_sign)
+
+
+def _side_sign_array(side: pd.Series, side_sign: dict[str, int], missing: float) -> np.ndarray:
+    """``side.map(side_sign)`` with ``missing`` for unmapped or missing sides, looked up per label."""
+    if isinstance(side.dtype, pd.CategoricalDtype):
+        codes, labels = side.cat.codes.to_numpy(), side.cat.categories
+    else:
+        codes, labels = pd.factorize(side)
+    table = np.array([side_sign.get(s, missing) for s in labels] + [missing], dtype=float)
+    return table[codes]  # code -1 (missing) picks the trailing entry
+
+
+def _markouts_sorted(d: pd.DataFrame, M: int, side_sign: dict[str, int]) -> pd.DataFrame:
+    sgn = pd.Series(_side_sign_array(d["side"], side_sign, 1).astype(int), index=d.index)
+    p_fwd = d["price"].shift(-M)
+    r = p_fwd / d["price"] - 1.0
+    out = pd.DataFrame(
+        {
+            "ts": d["ts"],
+            "exchange": d["exchange"],
+            "side": d["side"],
+            "sgn": sgn,
+            "price": d["price"],
+            "p_fwd": p_fwd,
+            "r": r,
+            "y": sgn * r,
+            "V": d["qty"],
+        }
+    )
+    return out[p_fwd.notna()].reset_index(drop=True)
+
+
+def _sorted_volumes(d: pd.DataFrame) -> np.ndarray:
+    v = d["V"].to_numpy(float)
+    return np.sort(v[~np.isnan(v)])
+
+
+def _quantiles(v_sorted: np.ndarray, qs: list[float]) -> np.ndarray:
+    # same np.quantile call Series.quantile makes, on the non-missing values
+    return np.quantile(v_sorted, qs) if len(v_sorted) else np.full(len(qs), np.nan)
 
 
 def trim_outliers_and_bin(df: pd.DataFrame, q_outlier: float, q_bins: tuple[tuple[float, float], ...]) -> pd.DataFrame:
-    d = df.copy()
-    cut = d["V"].quantile(q_outlier)
-    d = d[d["V"] <= cut].copy()
+    return _trim_and_bin_sorted(df, _sorted_volumes(df), q_outlier, q_bins)
+
+
+def _trim_and_bin_sorted(
+    d: pd.DataFrame, v_sorted: np.ndarray, q_outlier: float, q_bins: tuple[tuple[float, float], ...]
+) -> pd.DataFrame:
+    """trim_outliers_and_bin given the sorted non-missing volumes of ``d``.
+
+    The kept volumes are a prefix of ``v_sorted``, so one sort serves every
+    outlier cut.
+    """
+    cut = _quantiles(v_sorted, [q_outlier])[0]
+    kept = v_sorted[: np.searchsorted(v_sorted, cut, side="right")]
     levels = sorted(set(x for pair in q_bins for x in pair))
-    qvals = d["V"].quantile(levels).to_dict()
-    d["qbin"] = pd.NA
-    for lo, hi in q_bins:
+    qvals = dict(zip(levels, _quantiles(kept, levels)))
+    v = d["V"].to_numpy()
+    inside = v <= cut
+    code = np.full(len(d), -1, dtype=np.int16)
+    for i, (lo, hi) in enumerate(q_bins):
         vlo, vhi = qvals[lo], qvals[hi]
-        d.loc[(d["V"] >= vlo) & (d["V"] < vhi), "qbin"] = f"Q{lo:.4f}_{hi:.4f}"
-    return d.dropna(subset=["qbin"]).reset_index(drop=True)
+        code[inside & (v >= vlo) & (v < vhi)] = i
+    binned = code >= 0
+    names = np.array([f"Q{lo:.4f}_{hi:.4f}" for lo, hi in q_bins], dtype=object)
+    return d[binned].assign(qbin=names[code[binned]]).reset_index(drop=True)
 
 
 def fit_sqrt_model(df: pd.DataFrame, hac_lags: int) -> dict[str, float | int]:
@@ -154,54 +301,126 @@ def fit_power_model(df: pd.DataFrame) -> dict[str, float | int | bool]:
     return {"mu1": mu1, "mu2": mu2, "mu1_se": np.nan, "mu2_se": np.nan, "n": len(v), "success": True, "cost": cost}
 
 
-def fit_grid(d: pd.DataFrame, cfg: ImpactConfig, label: str) -> pd.DataFrame:
+# (label, date, qbin, hac_lags, frame with V and y, extra columns for the result row)
+Cell = tuple[str, object, str, int, pd.DataFrame, dict]
+
+
+def _grid_cells(d: pd.DataFrame, cfg: ImpactConfig, label: str, tags: dict | None = None) -> Iterator[Cell]:
+    """Cells of ``d`` with at least ``cfg.min_n`` trades, in (date, qbin) order."""
     if d.empty:
-        return pd.DataFrame(columns=RESULT_COLUMNS)
-    x = d.copy()
-    x["date"] = x["ts"].dt.date
-    rows = []
-    for (date, qbin), g in x.groupby(["date", "qbin"], observed=True):
-        if len(g) < cfg.min_n:
-            continue
-        row = {"label": label, "date": date, "qbin": qbin}
-        row.update(fit_sqrt_model(g, cfg.hac_lags))
-        row.update(fit_power_model(g))
-        rows.append(row)
-    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+        return
+    day = d["ts"].dt.normalize()  # same calendar day as ts.dt.date, without per-row date objects
+    for (date, qbin), g in d[["V", "y"]].groupby([day, d["qbin"]], observed=True):
+        if len(g) >= cfg.min_n:
+            yield (label, date.date(), qbin, cfg.hac_lags, g, tags or {})
+
+
+def _fit_cell(cell: Cell) -> dict:
+    label, date, qbin, hac_lags, g, tags = cell
+    row = {"label": label, "date": date, "qbin": qbin}
+    row.update(fit_sqrt_model(g, hac_lags))
+    row.update(fit_power_model(g))
+    row.update(tags)
+    return row
+
+
+def _fit_chunk(chunk: list[Cell]) -> list[dict]:
+    return [_fit_cell(c) for c in chunk]
+
+
+def _seed_worker(seed: int) -> None:
+    np.random.seed(seed)
+
+
+def _fit_cells(cells: Iterable[Cell], cfg: ImpactConfig) -> list[dict]:
+    """Fit every cell, in order.
+
+    ``cells`` is consumed lazily, so a generator keeps only the cells being
+    fitted alive. In-process, each cell is fitted as it is produced. With
+    ``cfg.fit_workers > 1`` chunks of ``cfg.fit_chunk_size`` cells stream
+    into a process pool (seeded with ``cfg.random_state``) with at most two
+    chunks per worker in flight. The fits themselves are deterministic, so
+    rows do not depend on the worker count or chunking.
+    """
+    if cfg.fit_workers <= 1:
+        return [_fit_cell(c) for c in cells]
+    it = iter(cells)
+    size = max(1, cfg.fit_chunk_size)
+    chunks = iter(lambda: list(islice(it, size)), [])
+    head = list(islice(chunks, 2))
+    if len(head) < 2:
+        return [row for chunk in head for row in _fit_chunk(chunk)]
+
+    rows: list[dict] = []
+    pending: deque = deque()
+    seeded = {"initializer": _seed_worker, "initargs": (cfg.random_state,)}
+    with ProcessPoolExecutor(max_workers=cfg.fit_workers, **seeded) as pool:
+        for chunk in chain(head, chunks):
+            pending.append(pool.submit(_fit_chunk, chunk))
+            if len(pending) >= 2 * cfg.fit_workers:
+                rows.extend(pending.popleft().result())
+        while pending:
+            rows.extend(pending.popleft().result())
+    return rows
 
 
-def run_exchange_and_pooled(d_parent: pd.DataFrame, cfg: ImpactConfig) -> pd.DataFrame:
-    outputs: list[pd.DataFrame] = []
-    for ex, g in d_parent.groupby("exchange", observed=True):
-        m = infer_side_signs(g, cfg.M)
-        d = trim_outliers_and_bin(add_markouts(g, cfg.M, m), cfg.q_outlier, cfg.q_bins)
-        r = fit_grid(d, cfg, f"EX:{ex}")
-        if not r.empty:
-            outputs.append(r)
+def fit_grid(d: pd.DataFrame, cfg: ImpactConfig, label: str) -> pd.DataFrame:
+    return pd.DataFrame(_fit_cells(_grid_cells(d, cfg, label), cfg), columns=RESULT_COLUMNS)
+
+
+def _ts_sorted_sets(d_parent: pd.DataFrame) -> list[tuple[str, pd.DataFrame]]:
+    """(label, trades sorted by ts) for each exchange, then the pooled set.
+
+    ``side`` is made categorical so the per-M sign lookups map categories
+    rather than every trade.
+    """
+    sets = [(f"EX:{ex}", g.sort_values("ts").reset_index(drop=True)) for ex, g in d_parent.groupby("exchange", observed=True)]
+    sets.append(("ALL", d_parent.sort_values("ts").reset_index(drop=True)))
+    return [(label, d.assign(side=d["side"].astype("category"))) for label, d in sets]
+
 
-    m_all = infer_side_signs(d_parent, cfg.M)
-    d_all = trim_outliers_and_bin(add_markouts(d_parent, cfg.M, m_all), cfg.q_outlier, cfg.q_bins)
-    r_all = fit_grid(d_all, cfg, "ALL")
-    if not r_all.empty:
-        outputs.append(r_all)
+def _markout_sets(sets: list[tuple[str, pd.DataFrame]], M: int) -> list[tuple[str, pd.DataFrame, np.ndarray]]:
+    """(label, markouts, sorted volumes) per set at horizon M."""
+    out = []
+    for label, d in sets:
+        mk = _markouts_sorted(d, M, _infer_side_signs_sorted(d, M))
+        out.append((label, mk, _sorted_volumes(mk)))
+    return out
 
-    return pd.concat(outputs, ignore_index=True) if outputs else pd.DataFrame(columns=RESULT_COLUMNS)
+
+def _markout_set_cells(
+    prepared: list[tuple[str, pd.DataFrame, np.ndarray]], cfg: ImpactConfig, tags: dict | None = None
+) -> Iterator[Cell]:
+    for label, mk, v_sorted in prepared:
+        yield from _grid_cells(_trim_and_bin_sorted(mk, v_sorted, cfg.q_outlier, cfg.q_bins), cfg, label, tags)
+
+
+def run_exchange_and_pooled(d_parent: pd.DataFrame, cfg: ImpactConfig) -> pd.DataFrame:
+    """Fit every exchange and the pooled set; their cells share one worker pool."""
+    cells = _markout_set_cells(_markout_sets(_ts_sorted_sets(d_parent), cfg.M), cfg)
+    return pd.DataFrame(_fit_cells(cells, cfg), columns=RESULT_COLUMNS)
 
 
 def robustness_sweep(d_parent: pd.DataFrame, base_cfg: ImpactConfig | None = None) -> pd.DataFrame:
+    """Refit the grid over M x outlier quantile.
+
+    Each exchange and the pooled set are sorted once; side signs and markouts
+    are computed once per M and shared by the outlier cuts of that M. Cells
+    are generated one configuration at a time and streamed into
+    ``_fit_cells``, so only one M's markouts are alive at once and, with
+    ``fit_workers > 1``, all configurations share one pool.
+    """
     cfg = base_cfg or ImpactConfig()
-    outs: list[pd.DataFrame] = []
-    for M in [1, 5, 10, 25, 50, 100]:
-        for qout in [0.995, 0.9975, 0.999]:
-            local = ImpactConfig(**asdict(cfg))
-            local.M = M
-            local.q_outlier = qout
-            local.hac_lags = max(10, M)
-            r = run_exchange_and_pooled(d_parent, local)
-            if not r.empty:
-                r["M"] = M
-                r["q_outlier"] = qout
-                outs.append(r)
-    if outs:
-        return pd.concat(outs, ignore_index=True)
-    return pd.DataFrame(columns=RESULT_COLUMNS + ['M', 'q_outlier'])
+    sets = _ts_sorted_sets(d_parent)
+
+    def cells() -> Iterator[Cell]:
+        for M in [1, 5, 10, 25, 50, 100]:
+            prepared = _markout_sets(sets, M)
+            for qout in [0.995, 0.9975, 0.999]:
+                local = ImpactConfig(**asdict(cfg))
+                local.M = M
+                local.q_outlier = qout
+                local.hac_lags = max(10, M)
+                yield from _markout_set_cells(prepared, local, {"M": M, "q_outlier": qout})
+
+    return pd.DataFrame(_fit_cells(cells(), cfg), columns=RESULT_COLUMNS + ["M", "q_outlier"])
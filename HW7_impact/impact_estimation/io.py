@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 import pandas as pd
 
@@ -59,9 +60,16 @@ def _standardize_columns(df: pd.DataFrame, path: Path) -> pd.DataFrame:
     return std[_REQUIRED_COLS].copy()
 
 
-def read_trades_parquet(path: Path, max_rows: Optional[int], sample_frac: Optional[float]) -> pd.DataFrame:
-    require_parquet_engine()
-    df = pd.read_parquet(path)
+def _projected_columns(names: list[str], path: Path) -> list[str]:
+    """Source columns to read: those with an alias, validated like ``_standardize_columns``."""
+    cols = [c for c in names if c in _ALIAS_MAP]
+    missing = [c for c in _REQUIRED_COLS if c not in {_ALIAS_MAP[col] for col in cols}]
+    if missing:
+        raise ValueError(f"File {path} missing required standardized columns: {missing}")
+    return cols
+
+
+def _clean_trades(df: pd.DataFrame, path: Path) -> pd.DataFrame:
     df = _standardize_columns(df, path)
 
     df["ts"] = pd.to_datetime(df["ts"], errors="coerce", utc=True)
@@ -71,10 +79,53 @@ def read_trades_parquet(path: Path, max_rows: Optional[int], sample_frac: Option
     df["exchange"] = df["exchange"].astype("string")
 
     df = df.dropna(subset=_REQUIRED_COLS)
-    df = df[(df["qty"] > 0) & (df["price"] > 0)]
-
-    if max_rows is not None and max_rows > 0:
-        df = df.iloc[:max_rows]
+    return df[(df["qty"] > 0) & (df["price"] > 0)]
+
+
+def _iter_parquet_frames(path: Path, engine: str, batch_size: int) -> Iterator[pd.DataFrame]:
+    """Projected record batches (pyarrow) or row groups (fastparquet) as DataFrames."""
+    if engine == "pyarrow":
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        cols = _projected_columns(pf.schema_arrow.names, path)
+        for batch in pf.iter_batches(batch_size=batch_size, columns=cols):
+            yield batch.to_pandas()
+    else:
+        import fastparquet
+
+        pf = fastparquet.ParquetFile(str(path))
+        cols = _projected_columns(list(pf.columns), path)
+        yield from pf.iter_row_groups(columns=cols)
+
+
+def read_trades_parquet(
+    path: Path,
+    max_rows: Optional[int],
+    sample_frac: Optional[float],
+    batch_size: int = 1 << 20,
+) -> pd.DataFrame:
+    """Read, standardize and clean one trade file.
+
+    Only the aliased columns are read, batch by batch; coercion and the
+    qty/price filters run per batch and reading stops once ``max_rows`` clean
+    rows are collected, so a capped read touches only the head of the file.
+    """
+    engine = require_parquet_engine()
+    limit = max_rows if max_rows is not None and max_rows > 0 else None
+
+    pieces: list[pd.DataFrame] = []
+    n_rows = 0
+    for frame in _iter_parquet_frames(path, engine, batch_size):
+        clean = _clean_trades(frame, path)
+        if limit is not None and n_rows + len(clean) >= limit:
+            pieces.append(clean.iloc[: limit - n_rows])
+            break
+        pieces.append(clean)
+        n_rows += len(clean)
+    if not pieces:  # file without rows
+        pieces.append(_clean_trades(pd.DataFrame(columns=_REQUIRED_COLS), path))
+    df = pd.concat(pieces, ignore_index=True)
 
     if sample_frac is not None and 0 < sample_frac < 1:
         df = df.sample(frac=sample_frac, random_state=42)
@@ -82,6 +133,65 @@ def read_trades_parquet(path: Path, max_rows: Optional[int], sample_frac: Option
     return df.reset_index(drop=True)
 
 
+def _trade_schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("ts", pa.timestamp("ns", tz="UTC")),
+            ("side", pa.string()),
+            ("qty", pa.float64()),
+            ("price", pa.float64()),
+            ("exchange", pa.string()),
+        ]
+    )
+
+
+def _read_trades_table(path: Path, max_rows: Optional[int], sample_frac: Optional[float], schema):
+    import pyarrow as pa
+
+    try:
+        df = read_trades_parquet(path, max_rows, sample_frac)
+        return pa.Table.from_pandas(df, preserve_index=False).cast(schema)
+    except (ValueError, pa.ArrowInvalid, pa.ArrowTypeError) as exc:
+        raise ValueError(f"Schema mismatch in file {path}: {exc}") from exc
+
+
+def load_trade_files(
+    files: list[Path],
+    max_rows_per_file: Optional[int],
+    sample_frac: Optional[float],
+    max_workers: int = 4,
+) -> pd.DataFrame:
+    """Read ``files`` concurrently and return one standardized trade frame.
+
+    Each file is read in a bounded thread pool and cast to a fixed Arrow
+    schema; the per-file tables are concatenated as chunks without copying
+    and converted to pandas once, column by column without block
+    consolidation, so each column's Arrow buffers are released as soon as it
+    is converted. Rows keep file order. Errors name the offending file.
+    """
+    require_parquet_engine()
+    import pyarrow as pa
+
+    schema = _trade_schema()
+    workers = max(1, min(max_workers, len(files)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_read_trades_table, f, max_rows_per_file, sample_frac, schema) for f in files]
+        tables = [fut.result() for fut in futures]
+
+    table = pa.concat_tables(tables) if tables else schema.empty_table()
+    del tables, futures
+    # self_destruct only frees each column's Arrow buffers once it is converted
+    # when columns are not consolidated into shared blocks and are converted one at a time
+    return table.to_pandas(
+        self_destruct=True,
+        split_blocks=True,
+        use_threads=False,
+        types_mapper={pa.string(): pd.StringDtype()}.get,
+    )
+
+
 def explore_trades(df: pd.DataFrame) -> None:
     if df.empty:
         print("Empty dataframe")
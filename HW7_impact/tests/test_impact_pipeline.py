@@ -1,15 +1,20 @@
 from __future__ import annotations
 
+from dataclasses import asdict
+
 import numpy as np
 import pandas as pd
 
 from impact_estimation.impact_config import ImpactConfig
 from impact_estimation.impact_core import (
+    _collapse_multihit_sorted,
     add_markouts,
     collapse_multihit_trades,
+    fit_grid,
     fit_power_model,
     fit_sqrt_model,
     infer_side_signs,
+    robustness_sweep,
     run_exchange_and_pooled,
     trim_outliers_and_bin,
 )
@@ -35,6 +40,37 @@ def test_collapse_multihit_qty_vwap():
     assert np.isclose(buy["price"], (10 * 1 + 14 * 3) / 4)
 
 
+def _multihit_trades(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "ts": pd.Timestamp("2024-01-01", tz="UTC") + pd.to_timedelta(np.sort(rng.integers(0, 3 * n, n)), unit="us"),
+            "exchange": pd.array(rng.choice(["KRKN", "BNCE", "CBSE"], n), dtype="string"),
+            "side": pd.array(rng.choice(["BUY", "SELL"], n), dtype="string"),
+            "qty": rng.exponential(1.0, n),
+            "price": 100 + rng.normal(0, 1, n),
+        }
+    )
+
+
+def test_collapse_multihit_fast_path_matches_sorted_groupby():
+    df = _multihit_trades(3000)
+    df.loc[::17, "qty"] = np.nan
+    df.loc[::23, "side"] = pd.NA
+    for frame in (df, df.sort_values("exchange", kind="mergesort")):
+        for ts_floor in (None, "1ms"):
+            pd.testing.assert_frame_equal(
+                collapse_multihit_trades(frame, ts_floor),
+                _collapse_multihit_sorted(frame, ts_floor),
+                rtol=1e-12,
+            )
+
+
+def test_collapse_multihit_unordered_input_falls_back():
+    df = _multihit_trades(500).sample(frac=1.0, random_state=1)
+    pd.testing.assert_frame_equal(collapse_multihit_trades(df, "1ms"), _collapse_multihit_sorted(df, "1ms"))
+
+
 def test_infer_side_signs_best_mapping():
     n = 60
     ts = pd.date_range("2024-01-01", periods=n, freq="s", tz="UTC")
@@ -93,3 +129,33 @@ def test_end_to_end_exchange_and_pooled_non_empty():
     out = run_exchange_and_pooled(df, cfg)
     assert not out.empty
     assert set(out["label"]).issuperset({"ALL"})
+
+
+def test_robustness_sweep_matches_single_runs():
+    df = _multihit_trades(6000, seed=2)
+    df["ts"] = pd.date_range("2024-01-01", periods=len(df), freq="10s", tz="UTC")
+    cfg = ImpactConfig(min_n=300, q_bins=((0.2, 0.5), (0.5, 0.8), (0.8, 0.99)))
+    sweep = robustness_sweep(df, cfg)
+    for M, qout in [(1, 0.995), (25, 0.999)]:
+        single = run_exchange_and_pooled(df, ImpactConfig(M=M, q_outlier=qout, hac_lags=max(10, M), min_n=300, q_bins=cfg.q_bins))
+        got = sweep[(sweep["M"] == M) & (sweep["q_outlier"] == qout)].drop(columns=["M", "q_outlier"])
+        pd.testing.assert_frame_equal(got.reset_index(drop=True), single)
+
+    # the shared per-exchange path equals the public step-by-step one
+    local = ImpactConfig(M=5, q_outlier=0.995, min_n=300, q_bins=cfg.q_bins)
+    ex = df[df["exchange"] == "BNCE"]
+    d = trim_outliers_and_bin(add_markouts(ex, local.M, infer_side_signs(ex, local.M)), local.q_outlier, local.q_bins)
+    expected = fit_grid(d, local, "EX:BNCE")
+    got = run_exchange_and_pooled(df, local)
+    assert not expected.empty
+    pd.testing.assert_frame_equal(got[got["label"] == "EX:BNCE"].reset_index(drop=True), expected)
+
+
+def test_parallel_fit_matches_serial():
+    df = _multihit_trades(6000, seed=4)
+    df["ts"] = pd.date_range("2024-01-01", periods=len(df), freq="60s", tz="UTC")
+    cfg = ImpactConfig(M=5, min_n=200, q_bins=((0.2, 0.5), (0.5, 0.8), (0.8, 0.99)))
+    serial = run_exchange_and_pooled(df, cfg)
+    parallel = run_exchange_and_pooled(df, ImpactConfig(**{**asdict(cfg), "fit_workers": 2, "fit_chunk_size": 3}))
+    assert serial["date"].nunique() > 1
+    pd.testing.assert_frame_equal(parallel, serial)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from impact_estimation.io import load_trade_files, read_trades_parquet
+
+
+def _write_trades(path, n: int = 5000, row_group_size: int = 700) -> pd.DataFrame:
+    rng = np.random.default_rng(3)
+    raw = pd.DataFrame(
+        {
+            "timestamp": pd.date_range("2025-05-05", periods=n, freq="37ms", tz="UTC"),
+            "side": rng.choice(["BUY", "SELL"], n),
+            "quantity": rng.exponential(2.0, n),
+            "trade price": 150 + rng.normal(0, 1, n).cumsum() * 0.01,
+            "Exchange": rng.choice(["OKX", "BINANCE"], n),
+            "unused_payload": rng.normal(size=n),
+        }
+    )
+    raw.loc[rng.choice(n, 300, replace=False), "quantity"] = 0.0
+    raw.loc[rng.choice(n, 200, replace=False), "trade price"] = np.nan
+    pq.write_table(pa.Table.from_pandas(raw, preserve_index=False), path, row_group_size=row_group_size)
+    return raw
+
+
+def _eager_reference(raw: pd.DataFrame, max_rows, sample_frac) -> pd.DataFrame:
+    df = raw.rename(columns={"timestamp": "ts", "quantity": "qty", "trade price": "price", "Exchange": "exchange"})
+    df = df[["ts", "side", "qty", "price", "exchange"]].copy()
+    df["side"] = df["side"].astype("string")
+    df["exchange"] = df["exchange"].astype("string")
+    df = df.dropna()
+    df = df[(df["qty"] > 0) & (df["price"] > 0)]
+    if max_rows:
+        df = df.iloc[:max_rows]
+    if sample_frac:
+        df = df.sample(frac=sample_frac, random_state=42)
+    return df.reset_index(drop=True)
+
+
+@pytest.mark.parametrize("max_rows,sample_frac", [(None, None), (1234, None), (1234, 0.5), (10**9, None)])
+def test_streaming_reader_matches_eager_read(tmp_path, max_rows, sample_frac):
+    path = tmp_path / "SOL_USDT_trades.parquet"
+    raw = _write_trades(path)
+    out = read_trades_parquet(path, max_rows=max_rows, sample_frac=sample_frac, batch_size=500)
+    pd.testing.assert_frame_equal(out, _eager_reference(raw, max_rows, sample_frac))
+
+
+def test_streaming_reader_reports_missing_columns(tmp_path):
+    path = tmp_path / "bad_trades.parquet"
+    pq.write_table(pa.table({"ts": [1, 2], "qty": [1.0, 2.0], "price": [1.0, 2.0]}), path)
+    with pytest.raises(ValueError, match=r"missing required standardized columns: \['side', 'exchange'\]"):
+        read_trades_parquet(path, max_rows=None, sample_frac=None)
+
+
+def test_load_trade_files_concatenates_in_file_order(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"ETH_USDT_trades_{i}.parquet"
+        _write_trades(path, n=800 + 100 * i)
+        paths.append(path)
+    loaded = load_trade_files(paths, max_rows_per_file=500, sample_frac=None, max_workers=3)
+    expected = pd.concat([read_trades_parquet(p, 500, None) for p in paths], ignore_index=True)
+    pd.testing.assert_frame_equal(loaded, expected, check_dtype=False)
+    assert str(loaded["ts"].dtype) == "datetime64[ns, UTC]"
+    assert loaded["side"].dtype == "string"
+
+
+def test_load_trade_files_names_bad_file(tmp_path):
+    good = tmp_path / "SOL_USDT_trades.parquet"
+    _write_trades(good, n=400)
+    bad = tmp_path / "bad_trades.parquet"
+    pq.write_table(pa.table({"ts": [1], "qty": [1.0], "price": [1.0]}), bad)
+    with pytest.raises(ValueError, match=r"Schema mismatch in file .*bad_trades\.parquet"):
+        load_trade_files([good, bad], max_rows_per_file=None, sample_frac=None)